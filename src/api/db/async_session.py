@@ -0,0 +1,21 @@
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from api.db.config import DATABASE_ECHO, DATABASE_POOL_CONFIG, get_async_db_url
+
+
+logger = logging.getLogger(__name__)
+
+# Only imported by the async routers, so the async driver is needed only with DB_ASYNC
+async_engine = create_async_engine(get_async_db_url(), echo=DATABASE_ECHO, **DATABASE_POOL_CONFIG)
+
+
+async def get_async_session() -> AsyncSession:
+    """ Get a new async database session, closed when the request ends.
+    Use it as a dependency (Depends(get_async_session)) in async handlers.
+    """
+    logger.debug("Creating a new async database session...")
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+        logger.debug("Async database session closed.")
@@ -12,10 +12,38 @@ DATABASE_CONFIG = {
     "database": config("MYSQL_DATABASE", default="market_minds_db"),
 }
 
-DATABASE_URL = (
+# Connection pool of the engine, per worker process
+DATABASE_POOL_CONFIG = {
+    # Connections kept open
+    "pool_size": config("DB_POOL_SIZE", default=10, cast=int),
+    # Extra connections opened under load, closed when returned
+    "max_overflow": config("DB_MAX_OVERFLOW", default=20, cast=int),
+    # Seconds to wait for a free connection before failing
+    "pool_timeout": config("DB_POOL_TIMEOUT", default=30, cast=int),
+    # Connections older than this are replaced, below MySQL wait_timeout
+    "pool_recycle": config("DB_POOL_RECYCLE", default=1800, cast=int),
+    # Check the connection before using it, to survive MySQL dropping idle connections
+    "pool_pre_ping": config("DB_POOL_PRE_PING", default=True, cast=bool),
+}
+
+# Log every SQL statement of the engines
+DATABASE_ECHO = config("DB_ECHO", default=False, cast=bool)
+
+# A full URL overrides the MySQL settings, e.g. sqlite:///market_minds.db
+DATABASE_URL = config("DATABASE_URL", default=(
     f"mysql+pymysql://{DATABASE_CONFIG['user']}:{DATABASE_CONFIG['password']}"
     f"@{DATABASE_CONFIG['host']}:{DATABASE_CONFIG['port']}/{DATABASE_CONFIG['database']}"
-)
+))
+
+# Serve the routes with async handlers on an async engine (aiomysql or asyncmy)
+DATABASE_ASYNC = config("DB_ASYNC", default=False, cast=bool)
+DATABASE_ASYNC_DRIVER = config("DB_ASYNC_DRIVER", default="aiomysql")
+
+# A full URL overrides the MySQL settings and the driver, e.g. sqlite+aiosqlite:///market_minds.db
+ASYNC_DATABASE_URL = config("ASYNC_DATABASE_URL", default=(
+    f"mysql+{DATABASE_ASYNC_DRIVER}://{DATABASE_CONFIG['user']}:{DATABASE_CONFIG['password']}"
+    f"@{DATABASE_CONFIG['host']}:{DATABASE_CONFIG['port']}/{DATABASE_CONFIG['database']}"
+))
 
 
 def get_db_url() -> str:
@@ -24,3 +52,11 @@ def get_db_url() -> str:
     if not DATABASE_URL:
         raise NotImplementedError("DATABASE_URL is not set")
     return DATABASE_URL
+
+
+def get_async_db_url() -> str:
+    """ Get the database URL of the async engine.
+    """
+    if not ASYNC_DATABASE_URL:
+        raise NotImplementedError("ASYNC_DATABASE_URL is not set")
+    return ASYNC_DATABASE_URL
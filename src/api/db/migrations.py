@@ -0,0 +1,111 @@
+"""
+Schema changes to existing tables, which create_all does not apply: it only creates the tables
+that are missing. init_db runs them after create_all. Each one reads the current schema first,
+so running them again on a migrated database does nothing.
+"""
+import logging
+
+import pandas as pd
+from sqlalchemy import Column, String, column, inspect, select, table, text, update
+from sqlalchemy.schema import AddConstraint
+
+from api.helpers.tools import get_numeric_series_from_str
+from api.marketminds.models import PDV
+
+
+logger = logging.getLogger(__name__)
+
+# PDV survey counts, VARCHAR (str() of the dataset value) before the import converted them to numbers
+PDV_FLOAT_COLUMNS = ["bandejas", "m2", "pasillos", "puertas_heladeras", "puntos_cobro"]
+
+# Suffix of the column that replaces one whose type changes
+NEW_COLUMN_SUFFIX = "__new"
+
+
+def get_table_columns(connection, table_name: str) -> dict:
+    """ Get the reflected columns of a table by name.
+    """
+    return {column_info["name"]: column_info for column_info in inspect(connection).get_columns(table_name)}
+
+
+def get_column_ddl(connection, model_column: Column, name: str | None = None) -> str:
+    """ Get the definition of a model column for ALTER TABLE ... ADD COLUMN.
+    """
+    column_type = model_column.type.compile(dialect=connection.dialect)
+    return f"{name or model_column.name} {column_type}{'' if model_column.nullable else ' NOT NULL'}"
+
+
+def convert_string_column_to_float(connection, model_column: Column):
+    """ Replace a VARCHAR column by a column of its model type with the values converted to numbers.
+    The values are converted once per distinct value, like the import (get_numeric_series_from_str);
+    the ones that are not numbers are left NULL, the import reports them as conversion errors.
+    The column is added, filled, dropped and renamed, which works on MySQL, PostgreSQL and SQLite.
+    """
+    table_name, name = model_column.table.name, model_column.name
+    new_name = f"{name}{NEW_COLUMN_SUFFIX}"
+    columns = get_table_columns(connection, table_name)
+    if new_name in columns:
+        # A previous run stopped halfway (MySQL does not roll back DDL)
+        if name in columns:
+            connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {new_name}"))
+        else:
+            connection.execute(text(f"ALTER TABLE {table_name} RENAME COLUMN {new_name} TO {name}"))
+            return
+
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {get_column_ddl(connection, model_column, new_name)}"))
+    old_table = table(table_name, column(name, String), column(new_name, model_column.type))
+    old_column = old_table.c[name]
+    values = pd.Series(
+        connection.execute(select(old_column).distinct().where(old_column.is_not(None))).scalars().all(),
+        dtype=object,
+    )
+    for value, number in zip(values, get_numeric_series_from_str(values)):
+        if number is not None:
+            connection.execute(update(old_table).where(old_column == value).values({new_name: float(number)}))
+    connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {name}"))
+    connection.execute(text(f"ALTER TABLE {table_name} RENAME COLUMN {new_name} TO {name}"))
+    logger.info(f"{table_name}.{name}: VARCHAR -> {model_column.type}, {len(values)} distinct values converted")
+
+
+def migrate_pdv_float_columns(connection):
+    """ Store the PDV survey counts as numbers in databases created when they were text.
+    """
+    columns = get_table_columns(connection, PDV.__tablename__)
+    for name in PDV_FLOAT_COLUMNS:
+        column_type = columns[name]["type"] if name in columns else None
+        if isinstance(column_type, String) or f"{name}{NEW_COLUMN_SUFFIX}" in columns:
+            convert_string_column_to_float(connection, PDV.__table__.c[name])
+
+
+def migrate_pdv_departamento_column(connection):
+    """ Add PDV.departamento_id, with its index and foreign key, to databases created before the PDVs
+    were linked to their departamento. Imports fill it for the existing PDVs of the chunks they read
+    (see get_backfill_departamentos).
+    """
+    if "departamento_id" in get_table_columns(connection, PDV.__tablename__):
+        return
+    model_column = PDV.__table__.c.departamento_id
+    connection.execute(text(f"ALTER TABLE {PDV.__tablename__} ADD COLUMN {get_column_ddl(connection, model_column)}"))
+    for index in PDV.__table__.indexes:
+        if model_column.name in index.columns:
+            index.create(connection)
+    # SQLite cannot add constraints to an existing table
+    if connection.dialect.name != "sqlite":
+        for foreign_key in model_column.foreign_keys:
+            connection.execute(AddConstraint(foreign_key.constraint))
+    logger.info(f"{PDV.__tablename__}.departamento_id added, the next import fills it")
+
+
+# In order, every one is applied on every start
+MIGRATIONS = [
+    migrate_pdv_float_columns,
+    migrate_pdv_departamento_column,
+]
+
+
+def run_migrations(engine):
+    """ Apply the schema changes that the database is missing, each one in its own transaction.
+    """
+    for migration in MIGRATIONS:
+        with engine.begin() as connection:
+            migration(connection)
@@ -1,7 +1,8 @@
 import logging
 from sqlmodel import Session, create_engine, SQLModel
 
-from api.db.config import get_db_url
+from api.db.config import DATABASE_ECHO, DATABASE_POOL_CONFIG, get_db_url
+from api.db.migrations import run_migrations
 
 
 logger = logging.getLogger(__name__)
@@ -12,7 +13,7 @@ data_base_url = get_db_url()
 if not data_base_url:
     raise ValueError("Database URL is not configured properly.")
 
-engine = create_engine(data_base_url, echo=True)
+engine = create_engine(data_base_url, echo=DATABASE_ECHO, **DATABASE_POOL_CONFIG)
 
 
 def init_db():
@@ -25,11 +26,14 @@ def init_db():
         raise
     logger.info("Initializing the database...")
     SQLModel.metadata.create_all(engine)
+    # create_all does not change existing tables
+    run_migrations(engine)
     logger.info("Database initialized.")
 
 
 def get_session() -> Session:
-    """ Get a new database session.
+    """ Get a new database session, closed when the request ends.
+    Use it as a dependency (Depends(get_session)) so every request has its own session.
     """
     logger.debug("Creating a new database session...")
     with Session(engine) as session:
@@ -0,0 +1,130 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+from api.helpers.serialization import dumps
+
+
+# Cached responses expire after this many seconds even without an import in this process
+# (e.g. when the dataset is imported from the command line)
+RESPONSE_CACHE_TTL = 600
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+# Bound of the cached bodies of a worker. Larger bodies (e.g. unpaginated full-table lists) are
+# built on every request, their ETag still saves the transfer
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE_MAX_BODY_BYTES = 4 * 1024 * 1024
+
+_cache_lock = threading.Lock()
+_data_version = 0
+# cache key -> (data version, expires at, body, etag), least recently used first
+_response_cache: OrderedDict = OrderedDict()
+_cache_bytes = 0
+
+
+def invalidate_response_cache():
+    """ Start a new data version and drop all cached responses. Called when an import commits.
+    """
+    global _data_version, _cache_bytes
+    with _cache_lock:
+        _data_version += 1
+        _response_cache.clear()
+        _cache_bytes = 0
+
+
+def _drop_cached_entry(key: str):
+    """ Drop a cache entry and its body from the cached bytes. The cache lock must be held.
+    """
+    global _cache_bytes
+    _cache_bytes -= len(_response_cache.pop(key)[2])
+
+
+def get_cache_key(request: Request) -> str:
+    """ Get the cache key of a request: path and sorted query parameters.
+    """
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def get_etag(data_version: int, body: bytes) -> str:
+    """ Get the strong ETag of a response body for a data version.
+    """
+    return f'"{data_version}-{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """ Check an If-None-Match header against an ETag.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def get_cached_entry(key: str) -> tuple[int, tuple | None]:
+    """ Get the current data version and the valid cache entry of a key, if any.
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _response_cache.get(key)
+        if entry and (entry[0] != _data_version or entry[1] <= now):
+            _drop_cached_entry(key)
+            entry = None
+        if entry:
+            _response_cache.move_to_end(key)
+        return _data_version, entry
+
+
+def cache_content(key: str, data_version: int, content) -> tuple:
+    """ Render JSON content and cache it, unless an import committed while it was built or the body
+    is too large. The least recently used entries are dropped over the entries or bytes bound.
+    :return: The cache entry.
+    """
+    global _cache_bytes
+    body = dumps(content)
+    entry = (data_version, time.monotonic() + RESPONSE_CACHE_TTL, body, get_etag(data_version, body))
+    with _cache_lock:
+        if data_version == _data_version and len(body) <= RESPONSE_CACHE_MAX_BODY_BYTES:
+            if key in _response_cache:
+                _drop_cached_entry(key)
+            _response_cache[key] = entry
+            _cache_bytes += len(body)
+            while len(_response_cache) > RESPONSE_CACHE_MAX_ENTRIES or _cache_bytes > RESPONSE_CACHE_MAX_BYTES:
+                _drop_cached_entry(next(iter(_response_cache)))
+    return entry
+
+
+def get_entry_response(request: Request, entry: tuple) -> Response:
+    """ Get the response of a cache entry: 304 if the client already has it.
+    """
+    body, etag = entry[2], entry[3]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, status_code=200, media_type="application/json", headers=headers)
+
+
+def cached_json_response(request: Request, get_content) -> Response:
+    """ Get a JSON response from the cache, or build it and cache it for the current data version.
+    Responses carry an ETag and clients that send it back in If-None-Match get a 304 without
+    touching the database.
+    :param request: The request, its path and query parameters are the cache key.
+    :param get_content: Function that returns the JSON content, called only on a cache miss.
+    """
+    key = get_cache_key(request)
+    data_version, entry = get_cached_entry(key)
+    if entry is None:
+        entry = cache_content(key, data_version, get_content())
+    return get_entry_response(request, entry)
+
+
+async def cached_json_response_async(request: Request, get_content) -> Response:
+    """ Same as cached_json_response, get_content is an async function.
+    """
+    key = get_cache_key(request)
+    data_version, entry = get_cached_entry(key)
+    if entry is None:
+        entry = cache_content(key, data_version, await get_content())
+    return get_entry_response(request, entry)
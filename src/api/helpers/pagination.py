@@ -0,0 +1,130 @@
+from datetime import datetime
+
+from fastapi import Query
+from sqlalchemy import Select
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def get_list_params(
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    limit: int | None = Query(
+        None,
+        ge=1,
+        le=MAX_PAGE_SIZE,
+        description=f"Page size, {DEFAULT_PAGE_SIZE} when only the cursor is given",
+    ),
+    client_id: str | None = Query(None, description="Only records of this client"),
+    updated_since: datetime | None = Query(None, description="Only records updated at or after this datetime"),
+    updated_before: datetime | None = Query(None, description="Only records updated before this datetime"),
+) -> dict:
+    """ Query parameters shared by the paginated list endpoints (use with Depends).
+    Without cursor and limit the endpoints return every record as a plain array, like before
+    the pagination; with either of them they return a page (see get_page).
+    """
+    return {
+        "cursor": cursor,
+        "limit": limit,
+        "client_id": client_id,
+        "updated_since": updated_since,
+        "updated_before": updated_before,
+    }
+
+
+def filter_list_query(
+    stmt: Select,
+    model_class,
+    client_column=None,
+    client_id: str | None = None,
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+) -> Select:
+    """ Add the common list filters to a select statement.
+    :param stmt: The select statement.
+    :param model_class: The model being listed.
+    :param client_column: The column with the client id, None if the model has no client.
+    :param client_id: Only records of this client.
+    :param updated_since: Only records updated at or after this datetime.
+    :param updated_before: Only records updated before this datetime.
+    """
+    if client_id is not None and client_column is not None:
+        stmt = stmt.where(client_column == client_id)
+    if updated_since is not None:
+        stmt = stmt.where(model_class.updated_at >= updated_since)
+    if updated_before is not None:
+        stmt = stmt.where(model_class.updated_at < updated_before)
+    return stmt
+
+
+def get_page_limit(cursor=None, limit: int | None = None) -> int | None:
+    """ Get the page size of a list request.
+    :param cursor: The cursor of the request.
+    :param limit: The limit of the request.
+    :return: None when neither is given (every record, as a plain array), else the page size.
+    """
+    if limit is None and cursor is not None:
+        return DEFAULT_PAGE_SIZE
+    return limit
+
+
+def get_page_stmt(stmt: Select, id_column, cursor=None, limit: int | None = DEFAULT_PAGE_SIZE) -> Select:
+    """ Limit a select statement to one page, with keyset pagination on the primary key.
+    The page starts right after the cursor (the last id of the previous page) instead of using
+    OFFSET, so the database seeks the primary key index and every page costs the same.
+    One extra row is selected to tell whether there is a next page without a COUNT query.
+    :param stmt: The select statement, already filtered.
+    :param id_column: The primary key column the pages are ordered by.
+    :param cursor: The next_cursor of the previous page, None for the first page.
+    :param limit: The page size, None to select every row.
+    """
+    if cursor is not None:
+        stmt = stmt.where(id_column > cursor)
+    stmt = stmt.order_by(id_column)
+    if limit is None:
+        return stmt
+    return stmt.limit(limit + 1)
+
+
+def build_page(rows: list, limit: int | None, serialize) -> dict | list:
+    """ Build a page from the rows of get_page_stmt.
+    :param rows: The result rows, up to limit + 1.
+    :param limit: The page size, None for every row.
+    :param serialize: Function that turns a result row into a dict with an "id" key.
+    :return: A dict with the page results and the next_cursor, None on the last page.
+        Without limit, the plain list of every result.
+    """
+    if limit is None:
+        return [serialize(row) for row in rows]
+
+    has_next = len(rows) > limit
+    results = [serialize(row) for row in rows[:limit]]
+
+    return {
+        "results": results,
+        "next_cursor": results[-1]["id"] if has_next else None,
+    }
+
+
+def get_page(session, stmt: Select, id_column, cursor=None, limit: int | None = None, serialize=None) -> dict | list:
+    """ Get one page of a select statement (see get_page_limit, get_page_stmt and build_page).
+    """
+    limit = get_page_limit(cursor, limit)
+    rows = session.execute(get_page_stmt(stmt, id_column, cursor, limit)).all()
+    return build_page(rows, limit, serialize)
+
+
+async def get_page_async(
+    session,
+    stmt: Select,
+    id_column,
+    cursor=None,
+    limit: int | None = None,
+    serialize=None,
+) -> dict | list:
+    """ Get one page of a select statement with an AsyncSession (see get_page).
+    """
+    limit = get_page_limit(cursor, limit)
+    rows = (await session.execute(get_page_stmt(stmt, id_column, cursor, limit))).all()
+    return build_page(rows, limit, serialize)
@@ -0,0 +1,97 @@
+from typing import AsyncIterator, Iterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from api.helpers.serialization import dumps
+
+
+NDJSON = "ndjson"
+JSON_ARRAY = "json"
+STREAM_MEDIA_TYPES = {
+    NDJSON: "application/x-ndjson",
+    JSON_ARRAY: "application/json",
+}
+
+# Rows fetched from the server-side cursor and sent per chunk
+STREAM_YIELD_PER = 1000
+
+
+def encode_batch(rows, serialize, stream_format: str, first_batch: bool) -> bytes:
+    """ Serialize a batch of rows: one record per line, or the records of a JSON array with the
+    separator from the previous batch.
+    """
+    if stream_format == NDJSON:
+        return b"\n".join(dumps(serialize(row)) for row in rows) + b"\n"
+    chunk = b",".join(dumps(serialize(row)) for row in rows)
+    return chunk if first_batch else b"," + chunk
+
+
+def iter_json_records(
+    engine,
+    stmt: Select,
+    serialize,
+    stream_format: str = NDJSON,
+    yield_per: int = STREAM_YIELD_PER,
+) -> Iterator[bytes]:
+    """ Run a select statement with a server-side cursor and yield the rows as JSON chunks.
+    Only yield_per rows are in memory at a time, and the first chunk is sent as soon as the
+    first batch arrives, whatever the size of the table.
+    The generator uses its own connection: the response is streamed after the endpoint returns.
+    :param engine: The database engine.
+    :param stmt: The select statement, already filtered and ordered.
+    :param serialize: Function that turns a result row into a dict.
+    :param stream_format: NDJSON (one record per line) or JSON_ARRAY (a single JSON array).
+    :param yield_per: Rows per batch.
+    """
+    if stream_format == JSON_ARRAY:
+        yield b"["
+
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=yield_per).execute(stmt)
+        for index, rows in enumerate(result.partitions()):
+            yield encode_batch(rows, serialize, stream_format, index == 0)
+
+    if stream_format == JSON_ARRAY:
+        yield b"]"
+
+
+async def aiter_json_records(
+    async_engine,
+    stmt: Select,
+    serialize,
+    stream_format: str = NDJSON,
+    yield_per: int = STREAM_YIELD_PER,
+) -> AsyncIterator[bytes]:
+    """ Same as iter_json_records with an async engine.
+    """
+    if stream_format == JSON_ARRAY:
+        yield b"["
+
+    async with async_engine.connect() as connection:
+        result = await connection.stream(stmt)
+        index = 0
+        async for rows in result.partitions(yield_per):
+            yield encode_batch(rows, serialize, stream_format, index == 0)
+            index += 1
+
+    if stream_format == JSON_ARRAY:
+        yield b"]"
+
+
+def get_streaming_response(engine, stmt: Select, serialize, stream_format: str = NDJSON) -> StreamingResponse:
+    """ Get a chunked response with all the rows of a select statement (see iter_json_records).
+    """
+    return StreamingResponse(
+        iter_json_records(engine, stmt, serialize, stream_format),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+    )
+
+
+def get_async_streaming_response(async_engine, stmt: Select, serialize, stream_format: str = NDJSON) -> StreamingResponse:
+    """ Same as get_streaming_response with an async engine.
+    """
+    return StreamingResponse(
+        aiter_json_records(async_engine, stmt, serialize, stream_format),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+    )
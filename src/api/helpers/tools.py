@@ -1,33 +1,124 @@
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 
+SI_NO_VALUES = {"si": True, "no": False}
+
+# Cantidad de valores inválidos de ejemplo en el reporte de errores de conversión
+CONVERSION_ERROR_EXAMPLES = 5
+
+
 def get_datetime_from_str(date_str: str, format_str: str = '%Y-%m-%dT%H:%M:%S.%fZ') -> datetime | None:
     """ Convertir un valor de tipo str a datetime.
     :param date_str: La fecha en formato string en un formato como "2006-10-19T00:00:00.000Z"
     """
-    if date_str:
-        # Convertir la cadena a un objeto datetime
-        date_obj = pd.to_datetime(date_str, format=format_str, errors='coerce')
-        if pd.isna(date_obj):
-            return None
-        else:
-            dt_with_tz = date_obj.to_pydatetime()
-            return dt_with_tz
-    else:
+    if not date_str:
         return None
+    date_obj = get_datetime_series_from_str(pd.Series([date_str]), format_str)[0]
+    return date_obj.to_pydatetime() if date_obj is not None else None
 
 
 def si_no_a_bool(value: str) -> bool:
     """ Convertir un valor de tipo str a bool.
     """
-    if value.lower() == "si":
-        return True
-    elif value.lower() == "no":
-        return False
-    else:
+    return si_no_series_a_bool(pd.Series([value]))[0]
+
+
+def convert_distinct_values(values: pd.Series, convert) -> pd.Series:
+    """ Aplicar una conversión sólo a los valores distintos de la serie y expandir el resultado.
+    Las columnas del dataset repiten pocos valores, así se convierte cada uno una sola vez.
+    :param values: La serie a convertir.
+    :param convert: Función que recibe una serie con los valores distintos (sin nulos) y devuelve
+        la serie convertida, con None donde el valor no se puede convertir.
+    :return: Una serie de tipo object, con None en los nulos y en los valores no convertibles.
+    """
+    codes, uniques = pd.factorize(values)
+    # El código -1 de factorize (nulos) toma el None agregado al final
+    converted = np.append(convert(pd.Series(uniques)).to_numpy(dtype=object), None)
+    return pd.Series(converted[codes], index=values.index, dtype=object)
+
+
+def get_datetime_series_from_str(
+    dates: pd.Series,
+    format_str: str = '%Y-%m-%dT%H:%M:%S.%fZ',
+) -> pd.Series:
+    """ Convertir una serie completa de str a datetime.
+    Valores vacíos o inválidos quedan en None.
+    :param dates: La serie con fechas en formato string como "2006-10-19T00:00:00.000Z"
+    """
+    def convert(uniques: pd.Series) -> pd.Series:
+        dates_obj = pd.to_datetime(uniques, format=format_str, errors='coerce')
+        return dates_obj.astype(object).where(dates_obj.notna(), None)
+
+    return convert_distinct_values(dates, convert)
+
+
+def si_no_series_a_bool(values: pd.Series) -> pd.Series:
+    """ Convertir una serie completa de str a bool.
+    "si" -> True, "no" -> False (sin importar mayúsculas), cualquier otro valor -> None.
+    """
+    def convert(uniques: pd.Series) -> pd.Series:
+        bools = uniques.astype(str).str.lower().map(SI_NO_VALUES)
+        return bools.astype(object).where(bools.notna(), None)
+
+    return convert_distinct_values(values, convert)
+
+
+def get_numeric_series_from_str(values: pd.Series) -> pd.Series:
+    """ Convertir una serie completa de str a float.
+    Acepta coma decimal ("3,5"). Valores vacíos, no numéricos o infinitos quedan en None.
+    """
+    def convert(uniques: pd.Series) -> pd.Series:
+        numbers = pd.to_numeric(
+            uniques.astype(str).str.strip().str.replace(",", ".", regex=False),
+            errors='coerce',
+        )
+        numbers = numbers.where(np.isfinite(numbers))
+        return numbers.astype(object).where(numbers.notna(), None)
+
+    return convert_distinct_values(values, convert)
+
+
+def get_conversion_errors(values: pd.Series, converted: pd.Series, ids: pd.Series | None = None) -> dict | None:
+    """ Reporte de errores de una conversión: los valores no nulos que quedaron en None.
+    :param values: La serie original.
+    :param converted: La serie convertida.
+    :param ids: Los ids de cada fila, para poder contar después sólo los registros que se graban.
+    :return: Un diccionario con la cantidad de valores inválidos, algunos de ejemplo y los ids
+        de las filas inválidas (si se pasaron), o None si no hubo errores.
+    """
+    invalid = values.notna().to_numpy() & converted.isna().to_numpy()
+    if not invalid.any():
         return None
+    errors = {
+        "invalid": int(invalid.sum()),
+        "examples": [str(value) for value in pd.unique(values[invalid])[:CONVERSION_ERROR_EXAMPLES]],
+    }
+    if ids is not None:
+        errors["ids"] = ids[invalid].tolist()
+    return errors
+
+
+def add_conversion_errors(total_errors: dict, errors: dict, only_ids: set | None = None):
+    """ Acumular reportes de errores de conversión por columna (ver get_conversion_errors).
+    :param total_errors: El reporte acumulado, se actualiza.
+    :param errors: El reporte a agregar.
+    :param only_ids: Si se pasa, sólo se cuentan las filas inválidas con esos ids.
+    """
+    for column, column_errors in errors.items():
+        invalid = column_errors["invalid"]
+        if only_ids is not None:
+            invalid = sum(1 for row_id in column_errors.get("ids", []) if row_id in only_ids)
+        if not invalid:
+            continue
+
+        total = total_errors.setdefault(column, {"invalid": 0, "examples": []})
+        total["invalid"] += invalid
+        for example in column_errors["examples"]:
+            if len(total["examples"]) < CONVERSION_ERROR_EXAMPLES and example not in total["examples"]:
+                total["examples"].append(example)
 
 
 def serialize_specific_value(value):
@@ -0,0 +1,111 @@
+"""
+Import del dataset por línea de comandos, sin pasar por el worker web:
+
+    python -m api.import_dataset api/datasets/mdt_negocio_import.csv --chunksize 50000 --bulk
+
+Graba un checkpoint con cada chunk: si el import se corta, volver a correr el mismo comando retoma
+desde el último chunk grabado.
+"""
+import argparse
+import json
+import logging
+import sys
+
+from api.db.session import engine, init_db
+from api.import_dataset.progress import ImportProgress
+from api.import_dataset.tools import DATASET_PATH, import_dataset
+
+# Tamaño de chunk por defecto, cada chunk es un checkpoint
+DEFAULT_CLI_CHUNKSIZE = 50000
+
+PROGRESS_BAR_WIDTH = 30
+
+
+class ConsoleProgress(ImportProgress):
+    """ Avance del import que se muestra como una barra en stderr. """
+
+    def set_stage(self, stage: str):
+        super().set_stage(stage)
+        self.render()
+
+    def add_rows(self, rows: int):
+        super().add_rows(rows)
+        self.render()
+
+    def skip_rows(self, rows: int):
+        super().skip_rows(rows)
+        self.render()
+
+    def render(self):
+        total_rows = self.total_rows or 0
+        ratio = min(self.rows_processed / total_rows, 1) if total_rows else 0
+        filled = int(ratio * PROGRESS_BAR_WIDTH)
+        bar = "#" * filled + "-" * (PROGRESS_BAR_WIDTH - filled)
+        eta_seconds = self.eta_seconds
+        eta = f"{eta_seconds:.0f}s" if eta_seconds is not None else "?"
+        sys.stderr.write(
+            f"\r{self.stage or '':<10} [{bar}] {ratio:6.1%} "
+            f"{self.rows_processed}/{total_rows} filas  {self.rows_per_second:,.0f} filas/s  ETA {eta}   "
+        )
+        sys.stderr.flush()
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m api.import_dataset",
+        description="Importa el dataset de PDVs y POIs (CSV, CSV con gzip o Parquet).",
+    )
+    parser.add_argument("file_path", nargs="?", default=DATASET_PATH, help="Archivo a importar")
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=DEFAULT_CLI_CHUNKSIZE,
+        help="Filas por chunk, cada chunk se graba como checkpoint",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Procesos para transformar el archivo (sólo CSV, sin checkpoints: todo se graba al final)",
+    )
+    parser.add_argument("--bulk", action="store_true", help="Grabar con INSERTs multi-fila en lugar del ORM")
+    parser.add_argument("--incremental", action="store_true", help="Sólo PDVs nuevos o modificados")
+    parser.add_argument("--no-resume", action="store_true", help="No usar checkpoints")
+    parser.add_argument("--trace-memory", action="store_true", help="Medir el pico de memoria por etapa (más lento)")
+    parser.add_argument("--echo-sql", action="store_true", help="Loguear las queries")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = get_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    engine.echo = args.echo_sql
+    # Tablas y migraciones pendientes, por si la API todavía no arrancó con esta versión
+    init_db()
+
+    progress = ConsoleProgress()
+    try:
+        result = import_dataset(
+            file_path=args.file_path,
+            chunksize=args.chunksize,
+            bulk=args.bulk,
+            progress=progress,
+            incremental=args.incremental,
+            workers=args.workers,
+            checkpoint=not args.no_resume,
+            trace_memory=args.trace_memory,
+        )
+    except KeyboardInterrupt:
+        sys.stderr.write("\nImport interrumpido, se retoma desde el último chunk grabado\n")
+        return 130
+    except Exception as e:
+        sys.stderr.write(f"\nError en el import: {e}\n")
+        return 1
+
+    sys.stderr.write("\n")
+    print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Benchmark del import con datasets sintéticos (ver synthetic.py) sobre una base SQLite en archivo:
+
+    python -m api.import_dataset.benchmark --rows 10k 100k --bulk --output bench.json
+    python -m api.import_dataset.benchmark --rows 10k 100k --bulk --baseline bench.json
+
+Por cada tamaño se genera el dataset, se importa en una base nueva y se registran las filas por
+segundo, las queries y (con --trace-memory) el pico de memoria de cada etapa. Con --baseline se
+comparan los resultados contra una corrida anterior y se sale con código 1 si alguna etapa es más
+lenta, hace más queries o usa más memoria que lo tolerado.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from api.import_dataset.synthetic import generate_dataset, parse_rows
+from api.import_dataset.tools import import_dataset
+
+# Tolerancia por defecto contra el baseline (20% más lento o con más memoria)
+DEFAULT_TOLERANCE = 0.2
+
+# Etapas más rápidas que esto no se comparan: el ruido de la medición es mayor que la etapa
+MIN_COMPARED_SECONDS = 0.05
+
+
+def get_size_label(rows: int) -> str:
+    """ Devuelve la etiqueta de un tamaño: 10000 -> "10k". """
+    if rows >= 1000000 and rows % 1000000 == 0:
+        return f"{rows // 1000000}M"
+    if rows >= 1000 and rows % 1000 == 0:
+        return f"{rows // 1000}k"
+    return str(rows)
+
+
+def run_import(file_path: str, db_path: str, trace_memory: bool, **import_kwargs) -> dict:
+    """
+    Importa un archivo en una base SQLite nueva.
+    :param file_path: El dataset a importar.
+    :param db_path: El archivo de la base, se pisa si existe.
+    :param trace_memory: Si es True se mide el pico de memoria por etapa.
+    :param import_kwargs: Los parámetros de import_dataset (chunksize, bulk, workers).
+    :return: Las estadísticas del import (ver ImportStats.as_dict).
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+
+    try:
+        resp = import_dataset(
+            file_path=file_path,
+            key_index_path=None,
+            trace_memory=trace_memory,
+            session=Session(engine),
+            **import_kwargs,
+        )
+    finally:
+        engine.dispose()
+    return resp["stats"]
+
+
+def run_benchmark(
+    rows: int,
+    work_dir: str,
+    duplicate_ratio: float = 0.2,
+    trace_memory: bool = False,
+    seed: int = 0,
+    **import_kwargs,
+) -> dict:
+    """
+    Genera un dataset sintético y mide su import.
+    Con trace_memory se hace una segunda corrida sólo para la memoria, porque tracemalloc hace más
+    lento el import y distorsionaría las filas por segundo.
+    :param rows: Las filas del dataset.
+    :param work_dir: El directorio del dataset y de la base.
+    :param duplicate_ratio: La proporción de filas de PDVs repetidos.
+    :param trace_memory: Si es True se mide también el pico de memoria por etapa.
+    :param seed: La semilla del dataset.
+    :param import_kwargs: Los parámetros de import_dataset (chunksize, bulk, workers).
+    :return: El resultado con el total y las etapas del import.
+    """
+    label = get_size_label(rows)
+    file_path = os.path.join(work_dir, f"mdt_{label}.csv")
+    db_path = os.path.join(work_dir, f"benchmark_{label}.db")
+    generate_dataset(file_path, rows, duplicate_ratio=duplicate_ratio, seed=seed)
+
+    stats = run_import(file_path, db_path, trace_memory=False, **import_kwargs)
+    stages = {
+        name: {
+            "seconds": stage["seconds"],
+            "rows_per_second": stage["rows_per_second"],
+            "queries": stage["queries"],
+            "peak_memory_mb": None,
+        }
+        for name, stage in stats["stages"].items()
+    }
+    if trace_memory:
+        memory_stats = run_import(file_path, db_path, trace_memory=True, **import_kwargs)
+        for name, stage in memory_stats["stages"].items():
+            if name in stages:
+                stages[name]["peak_memory_mb"] = stage["peak_memory_mb"]
+
+    return {
+        "rows": rows,
+        "duplicate_ratio": duplicate_ratio,
+        "total_seconds": stats["total_seconds"],
+        "rows_per_second": round(rows / stats["total_seconds"], 2) if stats["total_seconds"] else None,
+        "queries": stats["queries"],
+        "stages": stages,
+    }
+
+
+def check_regressions(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Compara resultados contra un baseline del mismo tamaño de dataset.
+    :param results: Los resultados por tamaño (ver run_benchmark).
+    :param baseline: Los resultados de una corrida anterior.
+    :param tolerance: La proporción tolerada de empeoramiento (0.2 = 20%).
+    :return: Las regresiones encontradas, vacía si no hay.
+    """
+    regressions = []
+    for label, result in results.items():
+        expected = baseline.get(label)
+        if expected is None:
+            continue
+        if result["rows_per_second"] and expected["rows_per_second"]:
+            if result["rows_per_second"] < expected["rows_per_second"] * (1 - tolerance):
+                regressions.append(
+                    f"{label} total: {result['rows_per_second']} filas/s, baseline {expected['rows_per_second']}"
+                )
+        for name, stage in result["stages"].items():
+            expected_stage = expected["stages"].get(name)
+            if expected_stage is None:
+                continue
+            # Las queries no dependen de la máquina, cualquier aumento es una regresión
+            if stage["queries"] > expected_stage["queries"]:
+                regressions.append(
+                    f"{label} {name}: {stage['queries']} queries, baseline {expected_stage['queries']}"
+                )
+            rows_per_second = stage["rows_per_second"]
+            expected_rows_per_second = expected_stage["rows_per_second"]
+            if (
+                rows_per_second and expected_rows_per_second
+                and expected_stage["seconds"] >= MIN_COMPARED_SECONDS
+                and rows_per_second < expected_rows_per_second * (1 - tolerance)
+            ):
+                regressions.append(
+                    f"{label} {name}: {rows_per_second} filas/s, baseline {expected_rows_per_second}"
+                )
+            peak = stage["peak_memory_mb"]
+            expected_peak = expected_stage["peak_memory_mb"]
+            if peak is not None and expected_peak and peak > expected_peak * (1 + tolerance):
+                regressions.append(f"{label} {name}: {peak} MB de pico, baseline {expected_peak} MB")
+    return regressions
+
+
+def format_results(results: dict) -> str:
+    """ Devuelve una tabla de texto con las etapas de cada tamaño. """
+    lines = []
+    for label, result in results.items():
+        lines.append(
+            f"{label}: {result['total_seconds']}s, {result['rows_per_second']} filas/s, "
+            f"{result['queries']} queries"
+        )
+        lines.append(f"  {'etapa':<12}{'segundos':>10}{'filas/s':>14}{'queries':>10}{'pico MB':>10}")
+        for name, stage in result["stages"].items():
+            rows_per_second = stage["rows_per_second"] if stage["rows_per_second"] is not None else "-"
+            peak = stage["peak_memory_mb"] if stage["peak_memory_mb"] is not None else "-"
+            lines.append(f"  {name:<12}{stage['seconds']:>10}{rows_per_second:>14}{stage['queries']:>10}{peak:>10}")
+    return "\n".join(lines)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m api.import_dataset.benchmark",
+        description="Mide el import con datasets sintéticos sobre SQLite.",
+    )
+    parser.add_argument("--rows", type=parse_rows, nargs="+", default=[parse_rows("10k")],
+                        help="Tamaños a medir, ej: 10k 100k 1M")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="Proporción de filas de PDVs repetidos")
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--bulk", action="store_true")
+    parser.add_argument("--trace-memory", action="store_true", help="Medir también el pico de memoria por etapa")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=None, help="Directorio para datasets y bases (por defecto uno temporal)")
+    parser.add_argument("--output", default=None, help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--baseline", default=None, help="Resultados JSON de una corrida anterior a comparar")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Empeoramiento tolerado contra el baseline (0.2 = 20%%)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = get_parser().parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = args.work_dir or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        results = {}
+        for rows in args.rows:
+            results[get_size_label(rows)] = run_benchmark(
+                rows,
+                work_dir,
+                duplicate_ratio=args.duplicate_ratio,
+                trace_memory=args.trace_memory,
+                seed=args.seed,
+                chunksize=args.chunksize,
+                bulk=args.bulk,
+                workers=args.workers,
+            )
+
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = check_regressions(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print("Regresiones contra el baseline:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            return 1
+        print("Sin regresiones contra el baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Carga masiva del import con INSERTs de SQLAlchemy Core, sin pasar por el unit-of-work del ORM.
+Cada tabla usa un único statement ejecutado como executemany: así se compila una sola vez y el
+driver lo envía como INSERT multi-fila (PyMySQL reescribe el VALUES, SQLite usa executemany nativo).
+"""
+import logging
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from api.marketminds.models import get_utc_now
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de filas por executemany
+BULK_BATCH_SIZE = 5000
+
+
+def get_insert_statement(table, dialect_name: str, records: list[dict]):
+    """
+    Devuelve el INSERT para el dialecto de la base.
+    Si los registros traen la primary key se hace upsert:
+    ON DUPLICATE KEY UPDATE en MySQL y ON CONFLICT DO UPDATE en SQLite / PostgreSQL.
+    :param table: La tabla donde insertar.
+    :param dialect_name: El nombre del dialecto de la conexión.
+    :param records: Los registros a insertar, las columnas se toman del primero.
+    :return: El statement a ejecutar.
+    """
+    pk_columns = [column.name for column in table.primary_key.columns]
+    has_pk = all(pk_column in records[0] for pk_column in pk_columns)
+    update_columns = [
+        key for key in records[0].keys()
+        if key not in pk_columns and key != "created_at"
+    ]
+
+    if has_pk and dialect_name == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in update_columns}
+        )
+
+    if has_pk and dialect_name in ("sqlite", "postgresql"):
+        dialect_module = sqlite if dialect_name == "sqlite" else postgresql
+        stmt = dialect_module.insert(table)
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=pk_columns)
+        return stmt.on_conflict_do_update(
+            index_elements=pk_columns,
+            set_={column: stmt.excluded[column] for column in update_columns},
+        )
+
+    return insert(table)
+
+
+def bulk_upsert(session, model_class, records: list[dict]) -> int:
+    """
+    Inserta (o actualiza si ya existen) los registros de un modelo en batches.
+    Completa created_at / updated_at, que en el ORM los pone el default_factory del modelo, y
+    como hace el ORM usa el default de la columna cuando el valor es None.
+    :param session: La sesión de base de datos.
+    :param model_class: El modelo de la tabla a cargar.
+    :param records: Los datos de los registros.
+    :return: La cantidad de registros enviados a la base.
+    """
+    if not records:
+        return 0
+
+    table = model_class.__table__
+    dialect_name = session.get_bind().dialect.name
+    now = get_utc_now()
+    column_defaults = {
+        column.name: column.default.arg
+        for column in table.columns
+        if column.default is not None and column.default.is_scalar
+    }
+    for record in records:
+        record.setdefault("created_at", now)
+        record.setdefault("updated_at", now)
+        for key, default in column_defaults.items():
+            if record.get(key, default) is None:
+                record[key] = default
+
+    stmt = get_insert_statement(table, dialect_name, records)
+    for start in range(0, len(records), BULK_BATCH_SIZE):
+        session.execute(stmt, records[start:start + BULK_BATCH_SIZE])
+
+    logger.debug(f"Bulk upsert de {len(records)} registros en {table.name}")
+    return len(records)
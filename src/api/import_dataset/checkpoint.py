@@ -0,0 +1,49 @@
+"""
+Checkpoints del import por chunks: con cada chunk se graba, en la misma transacción, cuántas filas
+del archivo ya quedaron en la base. Si el import se corta, el siguiente import del mismo archivo
+retoma desde ahí.
+"""
+import os
+
+import pandas as pd
+from sqlmodel import delete
+
+from api.marketminds.models import ImportCheckpoint
+
+
+def get_checkpoint_rows(session, checksum: str) -> int:
+    """
+    Devuelve las filas ya grabadas de un import anterior del archivo que no terminó.
+    :param session: La sesión de base de datos.
+    :param checksum: El checksum del archivo.
+    :return: La cantidad de filas, 0 si no hay checkpoint.
+    """
+    checkpoint = session.get(ImportCheckpoint, checksum)
+    return checkpoint.rows if checkpoint else 0
+
+
+def get_checkpoint_record(checksum: str, file_path: str, rows: int) -> dict:
+    """ Devuelve el registro de checkpoint a grabar junto con un chunk. """
+    return {"id": checksum, "name": os.path.basename(file_path), "rows": rows}
+
+
+def delete_checkpoint(session, checksum: str):
+    """ Borra el checkpoint del archivo al terminar el import. """
+    session.execute(delete(ImportCheckpoint).where(ImportCheckpoint.id == checksum))
+    session.commit()
+
+
+def split_imported_rows(
+    df_rows: pd.DataFrame,
+    rows_read: int,
+    start_row: int,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Separa de un chunk las filas que ya se grabaron antes del checkpoint.
+    :param df_rows: El chunk del dataset.
+    :param rows_read: Las filas del archivo leídas antes de este chunk.
+    :param start_row: Las filas grabadas según el checkpoint.
+    :return: Las filas ya grabadas y las filas a procesar.
+    """
+    skip = min(max(start_row - rows_read, 0), len(df_rows))
+    return df_rows.iloc[:skip], df_rows.iloc[skip:]
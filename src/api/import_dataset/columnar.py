@@ -0,0 +1,246 @@
+"""
+Motor columnar del import: arma los registros a crear trabajando sobre columnas completas del
+DataFrame (drop_duplicates / anti-join contra las claves existentes) en lugar de fila por fila.
+"""
+import pandas as pd
+
+from api.helpers.tools import (
+    get_conversion_errors,
+    get_datetime_series_from_str,
+    get_numeric_series_from_str,
+    si_no_series_a_bool,
+)
+from api.import_dataset.dataset_keys import pdv_keys_dict, pois_types
+from api.marketminds.models import (
+    CanalDistribucion,
+    Categoria,
+    Client,
+    GerenteNacional,
+    GerenteRegional,
+    PDV,
+    SubcanalAdicional,
+    Sucursal,
+    Vendedor,
+)
+
+SIN_NOMBRE = "(Sin nombre)"
+
+# Conversores por columna según el "type" de pdv_keys_dict
+TYPE_CONVERTERS = {
+    "bool": si_no_series_a_bool,
+    "datetime": get_datetime_series_from_str,
+    "float": get_numeric_series_from_str,
+}
+CLIENT_KEY = "id_cli_suc_cuenta"
+PDV_KEY = "id_pdv_unique"
+# Provincia y departamento del PDV (ver geo.py)
+GEO_COLUMNS = ["pv_pcia", "pv_departamento"]
+
+# Modelos (id, name) del dataset con sus columnas de id y name.
+# Por ahora tomo a cliente como id_cli_suc_cuenta y desc_cli_suc_cuenta, el resto se vincula al cliente de la fila
+ID_NAME_MODELS = [
+    (Client, CLIENT_KEY, "desc_cli_suc_cuenta"),
+    (CanalDistribucion, "id_cli_canal_dist", "desc_cli_canal_dist"),
+    (Categoria, "id_cli_categoria_dist", SIN_NOMBRE),
+    (GerenteNacional, "id_cli_gte_nacional", "desc_cli_gte_nacional"),
+    (GerenteRegional, "id_cli_gte_regional", "desc_cli_gte_regional"),
+    (Sucursal, CLIENT_KEY, "desc_cli_suc_cuenta"),
+    (SubcanalAdicional, "id_cli_subcanal_adic_dist", "desc_cli_subcanal_dist"),
+    (Vendedor, "id_cli_vendedor", "desc_cli_vendedor"),
+]
+
+
+def get_new_id_name_records(
+    df: pd.DataFrame,
+    id_key: str,
+    name_key: str,
+    existing_ids: set,
+    with_client: bool = True,
+) -> list[dict]:
+    """
+    Devuelve los registros (id, name[, client_id]) de un modelo que todavía no existen.
+    Se conserva la primera aparición de cada id, igual que el recorrido fila por fila.
+    :param df: El DataFrame del dataset.
+    :param id_key: La clave del id en el DataFrame.
+    :param name_key: La clave del nombre en el DataFrame o "(Sin nombre)".
+    :param existing_ids: El set de ids ya existentes.
+    :param with_client: Si se agrega el client_id de la fila.
+    :return: Una lista de diccionarios con los datos de los registros nuevos.
+    """
+    records = pd.DataFrame({"id": df[id_key].astype(str)}, index=df.index)
+    if name_key == SIN_NOMBRE:
+        records["name"] = SIN_NOMBRE
+    else:
+        records["name"] = df[name_key].astype(str)
+    if with_client:
+        records["client_id"] = df[CLIENT_KEY].astype(str)
+
+    records = records.drop_duplicates(subset="id", keep="first")
+    records = records[~records["id"].isin(existing_ids)]
+
+    return records.to_dict("records")
+
+
+def get_new_pdv_records(
+    df: pd.DataFrame,
+    existing_ids: set,
+    conversion_errors: dict | None = None,
+    geo_lookup: dict | None = None,
+) -> list[dict]:
+    """
+    Devuelve los registros de PDV que todavía no existen, con los campos de pdv_keys_dict
+    convertidos por columna.
+    :param df: El DataFrame del dataset.
+    :param existing_ids: El set de ids de PDV ya existentes.
+    :param conversion_errors: Donde se dejan los errores de conversión por campo.
+    :param geo_lookup: El lookup de provincias y departamentos (ver geo.resolve_geo).
+    :return: Una lista de diccionarios con los datos de los PDV nuevos.
+    """
+    ids = df[PDV_KEY].astype(str)
+    return get_pdv_records(
+        df[~ids.duplicated(keep="first") & ~ids.isin(existing_ids)],
+        conversion_errors,
+        geo_lookup,
+    )
+
+
+def get_existing_pdv_records(
+    df: pd.DataFrame,
+    existing_ids: set,
+    conversion_errors: dict | None = None,
+    geo_lookup: dict | None = None,
+) -> list[dict]:
+    """
+    Devuelve los registros de PDV que ya existen, para actualizarlos.
+    :param df: El DataFrame del dataset.
+    :param existing_ids: El set de ids de PDV ya existentes.
+    :param conversion_errors: Donde se dejan los errores de conversión por campo.
+    :param geo_lookup: El lookup de provincias y departamentos (ver geo.resolve_geo).
+    :return: Una lista de diccionarios con los datos de los PDV a actualizar.
+    """
+    ids = df[PDV_KEY].astype(str)
+    return get_pdv_records(
+        df[~ids.duplicated(keep="first") & ids.isin(existing_ids)],
+        conversion_errors,
+        geo_lookup,
+    )
+
+
+def get_departamento_ids(rows: pd.DataFrame, geo_lookup: dict | None) -> pd.Series:
+    """
+    Devuelve el id de departamento de cada fila según su provincia y departamento.
+    :param rows: Las filas del dataset.
+    :param geo_lookup: El lookup (pv_pcia, pv_departamento) -> (provincia_id, departamento_id).
+    :return: Una serie con los ids, None si la fila no tiene departamento o no hay lookup.
+    """
+    if not geo_lookup or any(column not in rows for column in GEO_COLUMNS):
+        return pd.Series(None, index=rows.index, dtype=object)
+    departamento_ids = [
+        geo_lookup.get(geo_pair, (None, None))[1]
+        for geo_pair in zip(*(rows[column] for column in GEO_COLUMNS))
+    ]
+    # dtype object para que los faltantes queden como None y no como NaN
+    return pd.Series(departamento_ids, index=rows.index, dtype=object)
+
+
+def get_pdv_records(
+    rows: pd.DataFrame,
+    conversion_errors: dict | None = None,
+    geo_lookup: dict | None = None,
+) -> list[dict]:
+    """
+    Convierte por columna las filas del dataset en registros de PDV.
+    :param rows: Las filas del dataset, una por PDV.
+    :param conversion_errors: Diccionario donde se dejan los valores que no se pudieron convertir,
+        por campo, con los ids de los PDV (ver get_conversion_errors).
+    :param geo_lookup: El lookup de provincias y departamentos, para vincular el PDV a su departamento.
+    :return: Una lista de diccionarios con los datos de los PDV.
+    """
+    pdv_data = {
+        "client_id": rows[CLIENT_KEY].astype(str),
+        "departamento_id": get_departamento_ids(rows, geo_lookup),
+    }
+    pdv_data_ids = rows[PDV_KEY].astype(str)
+    for key, value in pdv_keys_dict.items():
+        dataset_key = value["name"]
+        if dataset_key not in rows:
+            pdv_data[key] = None
+            continue
+
+        converter = TYPE_CONVERTERS.get(value.get("type"))
+        if converter is not None:
+            pdv_data[key] = converter(rows[dataset_key])
+            errors = get_conversion_errors(rows[dataset_key], pdv_data[key], ids=pdv_data_ids)
+            if errors and conversion_errors is not None:
+                conversion_errors[key] = errors
+        elif value.get("type") == "int":
+            pdv_data[key] = rows[dataset_key].fillna(0).astype(int)
+        else:
+            pdv_data[key] = rows[dataset_key].astype(str)
+
+    return pd.DataFrame(pdv_data, index=rows.index).to_dict("records")
+
+
+def get_poi_candidates(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pasa las columnas de pois_types a formato largo (una fila por PDV y tipo) y devuelve los POIs
+    con cantidad > 0, en el mismo orden que el recorrido fila por fila (filas y dentro de cada fila
+    los tipos de pois_types). Se conserva la primera aparición de cada par (tipo, PDV).
+    :param df: El DataFrame del dataset.
+    :return: Un DataFrame con las columnas pois_type, pdv_id y quantity.
+    """
+    poi_columns = [poi_type for poi_type in pois_types if poi_type in df]
+    wide_df = df[poi_columns].assign(
+        position=range(len(df)),
+        pdv_id=df[PDV_KEY].astype(str).to_numpy(),
+    )
+    long_df = wide_df.melt(
+        id_vars=["position", "pdv_id"],
+        value_vars=poi_columns,
+        var_name="pois_type",
+        value_name="quantity",
+    )
+    # NaN > 0 es False, así también se descartan las cantidades vacías
+    long_df = long_df[long_df["quantity"] > 0]
+
+    # melt deja los tipos en bloques, el orden estable por fila los devuelve al orden de pois_types
+    long_df = long_df.sort_values("position", kind="stable")
+    long_df = long_df.drop_duplicates(subset=["pois_type", "pdv_id"], keep="first")
+    return long_df[["pois_type", "pdv_id", "quantity"]].astype({"quantity": "int64"})
+
+
+def transform_chunk(df_rows: pd.DataFrame, ids_sets: dict | None = None, geo_lookup: dict | None = None) -> dict:
+    """
+    Transforma un chunk del dataset en los registros a importar.
+    No usa la base, así puede correr en otro proceso (ver parallel.py).
+    :param df_rows: El chunk del dataset.
+    :param ids_sets: Sets de ids existentes por modelo, para descartar antes de transformar.
+    :param geo_lookup: El lookup de provincias y departamentos (ver geo.resolve_geo).
+    :return: Un diccionario con la cantidad de filas, los registros por modelo (primera aparición
+        de cada id en el chunk), los candidatos a POI (ver get_poi_candidates) y los errores de
+        conversión de los PDVs nuevos, con sus ids.
+    """
+    ids_sets = ids_sets or {}
+    records = {}
+    for model_class, id_key, name_key in ID_NAME_MODELS:
+        records[model_class] = get_new_id_name_records(
+            df_rows,
+            id_key=id_key,
+            name_key=name_key,
+            existing_ids=ids_sets.get(model_class, set()),
+            with_client=model_class is not Client,
+        )
+    conversion_errors = {}
+    records[PDV] = get_new_pdv_records(
+        df_rows,
+        existing_ids=ids_sets.get(PDV, set()),
+        conversion_errors=conversion_errors,
+        geo_lookup=geo_lookup,
+    )
+
+    return {
+        "rows": len(df_rows),
+        "records": records,
+        "conversion_errors": conversion_errors,
+        "pois": get_poi_candidates(df_rows),
+    }
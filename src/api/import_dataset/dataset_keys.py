@@ -0,0 +1,89 @@
+"""
+Mapeo de columnas del dataset de import (mdt_negocio_import.csv) a los campos de los modelos.
+"""
+
+pdv_keys_dict = {
+    'id': {'name': 'id_pdv_unique'},
+    'cod_pdv': {'name': 'id_cod_pdv'},
+    'fecha_alta': {'name': 'id_tie_fecha_alta', 'type': 'datetime'},
+    'lat': {'name': 'pv_y'},
+    'lon': {'name': 'pv_x'},
+    'geohash': {'name': 'geohash'},
+    'bandejas': {'name': 'indicar_cantidad_de_bandejas', 'type': 'float'},
+    'm2': {'name': 'indique_la_cantidad_de_m2_de_la_tienda', 'type': 'float'},
+    'pasillos': {'name': 'indique_la_cantidad_de_pasillos', 'type': 'float'},
+    'puertas_heladeras': {'name': 'indique_la_cantidad_de_puertas_de_heladeras', 'type': 'float'},
+    'puntos_cobro': {
+        'name': 'indique_la_cantidad_de_puntos_de_cobro_cajas_del_pdv',
+        'type': 'float',
+    },
+    'tiene_ingreso': {'name': 'se_puede_ingresar_al_interior_del_local', 'type': 'bool'},
+    'compra_en_plataformas': {
+        'name': 'compra_en_plataformas_web_ej_bees_compre_ahora_coca_tokin',
+        'type': 'bool',
+    },
+    'cuenta_con_apps_delivery': {
+        'name': 'cuenta_con_apps_de_delivery_ej_pedidos_ya_rappi_propia',
+        'type': 'bool',
+    },
+    'cuenta_con_deposito': {
+        'name': 'cuenta_con_deposito_de_mercaderia',
+        'type': 'bool',
+    },
+    'cuenta_con_medios_cobro_digital': {
+        'name': 'cuenta_con_medios_de_cobro_digital_o_electronico_ej_posnet_apps_de_pago_qr',
+        'type': 'bool',
+    },
+    'otros_servicios': {
+        'name': 'cuenta_con_otros_servicios_ej_tarjeta_colectivos_carga_celular_cospeles_rapipago_pago_facil',
+        'type': 'bool',
+    },
+    'ubicacion': {'name': 'donde_se_encuentra_ubicado'},
+    'abierto_24h': {'name': 'la_tienda_se_encuentra_abierta_las_24_hs_del_dia', 'type': 'bool'},
+    'abierto_7d': {'name': 'la_tienda_se_encuentra_abierta_los_7_dias_de_la_semana', 'type': 'bool'},
+    'bebidas_alcoholicas': {'name': 'ofrece_bebidas_alcoholicas', 'type': 'bool'},
+    'medicamentos_venta_libre': {
+        'name': 'ofrece_medicamentos_de_venta_libre_ej_ibuprofeno_sertal_otros',
+        'type': 'bool'
+    },
+    'cuidados_personales': {
+        'name': 'ofrece_producto_de_cuidado_personal_ej_shampoo_maquinita_de_afeitar_toallitas_femeninas',
+        'type': 'bool'
+    },
+    'productos_lacteos': {'name': 'ofrece_productos_lacteos', 'type': 'bool'},
+    'productos_varios': {'name': 'ofrece_productos_varios_ej_pilas_encendedroes_preservativos', 'type': 'bool'},
+    'viandas': {'name': 'ofrece_viandas_ej_menues_tartas_sandwiches_ensaladas', 'type': 'bool'},
+    'freezer': {'name': 'tiene_freezer_cual_es'},
+    'imagen_frente': {'name': 'tiene_imagen_en_el_frente_del_local', 'type': 'bool'},
+    'presencia_redes_sociales': {
+        'name': 'tiene_presencia_en_redes_sociales_ej_instagram_facebook_tik_tok',
+        'type': 'bool'
+    },
+    'eventos_tematicos': {
+        'name': 'trabaja_los_eventos_tematicos_navidad_pascuas_halloween_seleccion_argentina',
+        'type': 'bool'
+    },
+}
+
+pois_types = [
+    'pois_agencias_de_viajes',
+    'pois_alimentacion',
+    'pois_alojamientos',
+    'pois_atracciones_turisticas',
+    'pois_bares_bodegas',
+    'pois_centros_de_salud',
+    'pois_clubes_deportivos',
+    'pois_clubes_nocturnos',
+    'pois_escuelas',
+    'pois_heladerias',
+    'pois_hoteles',
+    'pois_instituciones_educativas',
+    'pois_otras_instituciones',
+    'pois_servicios_de_transporte',
+    'pois_bus_stop',
+]
+
+# Columnas numéricas del dataset, el resto se lee como texto para que los valores
+# no dependan del tipo que pandas infiera en cada chunk
+numeric_columns = ['pv_x', 'pv_y', 'total_pois']
+numeric_columns_prefix = 'pois_'
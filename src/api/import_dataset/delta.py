@@ -0,0 +1,161 @@
+"""
+Import incremental: checksum del archivo y hash de las filas de cada PDV, para grabar sólo
+las filas nuevas o modificadas desde el último import.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+from sqlmodel import select
+
+from api.import_dataset.columnar import PDV_KEY
+from api.import_dataset.dataset_keys import numeric_columns, numeric_columns_prefix
+from api.import_dataset.formats import get_import_columns
+from api.marketminds.models import ImportedFile, PDVHash
+
+# Base del hash polinomial de las filas de un PDV (primo de FNV-1a 64), módulo 2 ** 64
+HASH_BASE = 0x100000001B3
+HASH_MODULUS = 2 ** 64
+
+
+def get_file_checksum(file_path: str) -> str:
+    """
+    Devuelve el sha256 del archivo, leyéndolo por bloques.
+    :param file_path: La ruta del archivo.
+    :return: El checksum en hexadecimal.
+    """
+    checksum = hashlib.sha256()
+    with open(file_path, "rb") as dataset_file:
+        for block in iter(lambda: dataset_file.read(1024 * 1024), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def is_file_imported(session, checksum: str) -> bool:
+    return session.get(ImportedFile, checksum) is not None
+
+
+def register_imported_file(session, checksum: str, file_path: str, rows: int):
+    session.add(ImportedFile(id=checksum, name=os.path.basename(file_path), rows=rows))
+    session.commit()
+
+
+def get_pdv_hashes(session) -> dict[str, str]:
+    """
+    Devuelve los hashes guardados por PDV, sin cargar las instancias.
+    :return: Un diccionario pdv_id -> hash.
+    """
+    return dict(session.execute(select(PDVHash.id, PDVHash.row_hash)).all())
+
+
+def hash_rows(df: pd.DataFrame) -> pd.Series:
+    """
+    Calcula un hash del contenido de cada fila, con las columnas que usa el import (las mismas en
+    CSV y Parquet). Las columnas numéricas se pasan a float para que el hash no dependa del tipo
+    inferido por chunk.
+    :param df: El DataFrame del dataset.
+    :return: Una serie con el hash (uint64) de cada fila.
+    """
+    df = df[get_import_columns(list(df.columns))]
+    numeric = {
+        column: "float64"
+        for column in df.columns
+        if column in numeric_columns or column.startswith(numeric_columns_prefix)
+    }
+    return pd.util.hash_pandas_object(df.astype(numeric), index=False)
+
+
+def get_hash_powers(count: int) -> np.ndarray:
+    """ Devuelve HASH_BASE ** k módulo 2 ** 64, para k de 0 a count - 1. """
+    return np.concatenate([
+        np.ones(1, dtype=np.uint64),
+        np.cumprod(np.full(count - 1, HASH_BASE, dtype=np.uint64)),
+    ])
+
+
+def hash_pdv_rows(df_rows: pd.DataFrame) -> dict[str, tuple[int, int]]:
+    """
+    Calcula por PDV el hash de todas sus filas de un chunk, en orden: la suma de hash_fila_k *
+    HASH_BASE ** k módulo 2 ** 64. Así un cambio en cualquier fila (por ejemplo un POI de una fila
+    que no es la primera) cambia el hash, y los de chunks consecutivos se combinan (ver PDVHasher).
+    :param df_rows: El chunk del dataset.
+    :return: Un diccionario pdv_id -> (cantidad de filas, hash).
+    """
+    if df_rows.empty:
+        return {}
+    pdv_ids = df_rows[PDV_KEY].astype(str)
+    positions = pdv_ids.groupby(pdv_ids, sort=False).cumcount().to_numpy()
+    weighted = hash_rows(df_rows).to_numpy() * get_hash_powers(positions.max() + 1)[positions]
+    pdv_hashes = pd.Series(weighted, index=pdv_ids.to_numpy()).groupby(level=0, sort=False).agg(["size", "sum"])
+    return dict(zip(pdv_hashes.index, zip(pdv_hashes["size"].tolist(), pdv_hashes["sum"].tolist())))
+
+
+class PDVHasher:
+    """
+    Acumula el hash de todas las filas de cada PDV a partir de los hashes de chunks (o shards)
+    consecutivos del archivo (ver hash_pdv_rows).
+    """
+
+    def __init__(self):
+        # pdv_id -> (cantidad de filas, hash)
+        self.pdv_hashes = {}
+
+    def add_chunk(self, chunk_hashes: dict[str, tuple[int, int]]):
+        """ Suma los hashes del chunk siguiente, corridos por las filas anteriores de cada PDV. """
+        for pdv_id, (rows, row_hash) in chunk_hashes.items():
+            previous_rows, previous_hash = self.pdv_hashes.get(pdv_id, (0, 0))
+            self.pdv_hashes[pdv_id] = (
+                previous_rows + rows,
+                (previous_hash + pow(HASH_BASE, previous_rows, HASH_MODULUS) * row_hash) % HASH_MODULUS,
+            )
+
+    def get_hashes(self) -> dict[str, str]:
+        """ Devuelve el hash (hexadecimal) de cada PDV. """
+        return {pdv_id: f"{row_hash:016x}" for pdv_id, (_, row_hash) in self.pdv_hashes.items()}
+
+    def get_hash_records(self, stored_hashes: dict[str, str]) -> list[dict]:
+        """ Devuelve los registros de PDVHash que cambiaron respecto de los guardados. """
+        return [
+            {"id": pdv_id, "row_hash": row_hash}
+            for pdv_id, row_hash in self.get_hashes().items()
+            if stored_hashes.get(pdv_id) != row_hash
+        ]
+
+
+class DeltaFilter:
+    """
+    Filtra los chunks del dataset dejando sólo las filas de PDVs nuevos o modificados.
+    El hash de un PDV cubre todas sus filas del archivo, así que se calcula en una pasada previa
+    (ver PDVHasher); de un PDV modificado se conservan todas sus filas.
+    """
+
+    def __init__(self, stored_hashes: dict[str, str], file_hashes: dict[str, str]):
+        self.seen_pdv_ids = set()
+        self.delta_pdv_ids = {
+            pdv_id
+            for pdv_id, row_hash in file_hashes.items()
+            if stored_hashes.get(pdv_id) != row_hash
+        }
+
+    def filter_chunk(self, df_rows: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Filtra un chunk.
+        :param df_rows: El chunk del dataset.
+        :return: Las filas de PDVs modificados y las primeras filas de cada PDV modificado.
+        """
+        pdv_ids = df_rows[PDV_KEY].astype(str)
+        first_rows = ~pdv_ids.duplicated(keep="first") & ~pdv_ids.isin(self.seen_pdv_ids)
+        self.seen_pdv_ids.update(pdv_ids[first_rows])
+
+        delta_rows = pdv_ids.isin(self.delta_pdv_ids)
+        return df_rows[delta_rows], df_rows[first_rows & delta_rows]
+
+    def skip_rows(self, df_rows: pd.DataFrame):
+        """
+        Registra filas ya grabadas antes de un checkpoint. Los hashes se graban al final del import,
+        así que un PDV modificado sigue en el delta y se conservan sus filas siguientes para los
+        POIs (el anti-join contra los POIs existentes evita duplicados), pero no se vuelve a
+        actualizar ni se borran sus POIs ya cargados.
+        """
+        self.seen_pdv_ids.update(df_rows[PDV_KEY].astype(str))
@@ -0,0 +1,135 @@
+"""
+Formatos de archivo del dataset de import: CSV, CSV comprimido con gzip y Parquet.
+El formato se detecta por el contenido (magic bytes), no por la extensión.
+"""
+import gzip
+
+import numpy as np
+import pandas as pd
+
+from api.import_dataset.columnar import GEO_COLUMNS, ID_NAME_MODELS, SIN_NOMBRE
+from api.import_dataset.dataset_keys import pdv_keys_dict, pois_types
+
+DATASET_CSV = "csv"
+DATASET_GZIP = "gzip"
+DATASET_PARQUET = "parquet"
+
+DATASET_SUFFIXES = {
+    DATASET_CSV: ".csv",
+    DATASET_GZIP: ".csv.gz",
+    DATASET_PARQUET: ".parquet",
+}
+
+GZIP_MAGIC = b"\x1f\x8b"
+PARQUET_MAGIC = b"PAR1"
+
+
+class UnsupportedDatasetFormat(ValueError):
+    """ El formato del archivo se reconoce pero no se puede leer con las dependencias instaladas. """
+
+
+def get_parquet_module():
+    """
+    Importa pyarrow.parquet sólo cuando hay que leer un Parquet. pyarrow es opcional: no publica
+    wheels para musl (imagen alpine) y los CSV no lo necesitan.
+    :return: El módulo pyarrow.parquet.
+    :raises UnsupportedDatasetFormat: Si pyarrow no está instalado.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise UnsupportedDatasetFormat("Para importar archivos Parquet hay que instalar pyarrow")
+    return pq
+
+
+def detect_dataset_format(file_path: str) -> str:
+    """
+    Detecta el formato del archivo por sus primeros bytes.
+    :param file_path: La ruta del archivo.
+    :return: DATASET_GZIP, DATASET_PARQUET o DATASET_CSV.
+    """
+    with open(file_path, "rb") as dataset_file:
+        magic = dataset_file.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return DATASET_GZIP
+    if magic == PARQUET_MAGIC:
+        return DATASET_PARQUET
+    return DATASET_CSV
+
+
+def get_dataset_columns(file_path: str) -> list[str]:
+    """
+    Devuelve las columnas del archivo sin leer los datos (header del CSV o schema del Parquet).
+    :param file_path: La ruta del archivo.
+    :return: La lista de columnas.
+    """
+    dataset_format = detect_dataset_format(file_path)
+    if dataset_format == DATASET_PARQUET:
+        return get_parquet_module().ParquetFile(file_path).schema_arrow.names
+    header = pd.read_csv(file_path, encoding="utf-8", nrows=0, compression=get_compression(dataset_format))
+    return list(header.columns)
+
+
+def get_compression(dataset_format: str) -> str | None:
+    """ Devuelve la compresión para pd.read_csv según el formato. """
+    return "gzip" if dataset_format == DATASET_GZIP else None
+
+
+def get_import_columns(columns: list[str]) -> list[str]:
+    """
+    Devuelve, en el orden del archivo, las columnas que usa el import: las de pdv_keys_dict,
+    pois_types, los modelos (id, name) y provincia / departamento.
+    :param columns: Las columnas del archivo.
+    :return: La lista de columnas a leer.
+    """
+    import_columns = {value["name"] for value in pdv_keys_dict.values()}
+    import_columns.update(pois_types)
+    for _, id_key, name_key in ID_NAME_MODELS:
+        import_columns.add(id_key)
+        if name_key != SIN_NOMBRE:
+            import_columns.add(name_key)
+    import_columns.update(GEO_COLUMNS)
+    return [column for column in columns if column in import_columns]
+
+
+def count_data_rows(file_path: str) -> int:
+    """
+    Cuenta las filas de datos del archivo (sin el header) sin parsearlo.
+    :param file_path: La ruta del archivo.
+    :return: La cantidad de filas.
+    """
+    dataset_format = detect_dataset_format(file_path)
+    if dataset_format == DATASET_PARQUET:
+        return get_parquet_module().ParquetFile(file_path).metadata.num_rows
+
+    lines = 0
+    opener = gzip.open if dataset_format == DATASET_GZIP else open
+    with opener(file_path, "rb") as dataset_file:
+        for block in iter(lambda: dataset_file.read(1024 * 1024), b""):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0)
+
+
+def read_parquet_chunks(file_path: str, chunksize: int | None, columns: list[str], dtypes: dict):
+    """
+    Lee un Parquet por row groups / batches, sólo con las columnas pedidas.
+    Las columnas de texto quedan como en el CSV: str con NaN en los vacíos.
+    :param file_path: La ruta del archivo.
+    :param chunksize: Cantidad de filas por chunk. None para leer todo el archivo de una vez.
+    :param columns: Las columnas a leer.
+    :param dtypes: Los tipos de las columnas (ver get_dataset_dtypes).
+    :return: Un iterador de DataFrames.
+    """
+    parquet_file = get_parquet_module().ParquetFile(file_path)
+    if chunksize:
+        tables = parquet_file.iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        tables = [parquet_file.read(columns=columns)]
+
+    for table in tables:
+        df = table.to_pandas()
+        for column in df.columns:
+            if dtypes.get(column) is str:
+                values = df[column]
+                df[column] = values.astype(str).where(values.notna(), np.nan)
+        yield df
@@ -0,0 +1,102 @@
+"""
+Resolución de provincias y departamentos del import en una sola pasada previa: se insertan las
+provincias y los departamentos faltantes en dos statements y se arma un lookup en memoria.
+"""
+import pandas as pd
+from sqlalchemy import bindparam, update
+from sqlmodel import select
+
+from api.import_dataset.bulk import bulk_upsert
+from api.marketminds.models import PDV, Departamento, Provincia, get_utc_now
+
+
+def get_provincias_lookup(session) -> dict[str, int]:
+    """ Devuelve las provincias por nombre: name -> id. """
+    return {name: provincia_id for provincia_id, name in session.execute(select(Provincia.id, Provincia.name))}
+
+
+def get_departamentos_lookup(session) -> dict[tuple[int, str], int]:
+    """ Devuelve los departamentos por provincia y nombre: (provincia_id, name) -> id. """
+    rows = session.execute(select(Departamento.id, Departamento.provincia_id, Departamento.name))
+    return {(provincia_id, name): departamento_id for departamento_id, provincia_id, name in rows}
+
+
+def resolve_geo(session, geo_pairs: pd.DataFrame) -> tuple[dict, dict]:
+    """
+    Inserta las provincias y departamentos que faltan y devuelve el lookup para el resto del import.
+    :param session: La sesión de base de datos.
+    :param geo_pairs: Los pares (pv_pcia, pv_departamento) distintos, en el orden del archivo.
+    :return: El lookup (pv_pcia, pv_departamento) -> (provincia_id, departamento_id) y la cantidad
+        de provincias y departamentos agregados.
+    """
+    geo_pairs = geo_pairs.dropna(subset=["pv_pcia"])
+
+    # Provincias ----------------------------------------------------------
+    provincias = get_provincias_lookup(session)
+    new_provincias = [
+        {"name": name}
+        for name in geo_pairs["pv_pcia"].drop_duplicates()
+        if name not in provincias
+    ]
+    bulk_upsert(session, Provincia, new_provincias)
+    if new_provincias:
+        provincias = get_provincias_lookup(session)
+
+    # Departamentos -------------------------------------------------------
+    geo_pairs = geo_pairs.dropna(subset=["pv_departamento"])
+    departamentos = get_departamentos_lookup(session)
+    new_departamentos = []
+    seen_departamentos = set(departamentos)
+    for provincia_name, departamento_name in geo_pairs.itertuples(index=False):
+        key = (provincias[provincia_name], departamento_name)
+        if key not in seen_departamentos:
+            seen_departamentos.add(key)
+            new_departamentos.append({"name": departamento_name, "provincia_id": key[0]})
+    bulk_upsert(session, Departamento, new_departamentos)
+    if new_departamentos:
+        departamentos = get_departamentos_lookup(session)
+    session.commit()
+
+    geo_lookup = {
+        (provincia_name, departamento_name): (
+            provincias[provincia_name],
+            departamentos[(provincias[provincia_name], departamento_name)],
+        )
+        for provincia_name, departamento_name in geo_pairs.itertuples(index=False)
+    }
+    geo_added = {
+        "provincia": len(new_provincias),
+        "departamento": len(new_departamentos),
+    }
+    return geo_lookup, geo_added
+
+
+def get_pdv_ids_without_departamento(session) -> set[str]:
+    """ Devuelve los ids de los PDVs que no tienen departamento. """
+    return set(session.execute(select(PDV.id).where(PDV.departamento_id.is_(None))).scalars())
+
+
+def update_pdv_departamentos(session, departamento_ids: dict[str, int]) -> int:
+    """
+    Completa el departamento de PDVs existentes con un solo UPDATE (executemany). También se
+    actualiza updated_at, así los índices en memoria vuelven a cargar esos PDVs. No hace commit: se
+    graba en la transacción del chunk.
+    :param session: La sesión de base de datos.
+    :param departamento_ids: El departamento de cada PDV: pdv_id -> departamento_id.
+    :return: La cantidad de PDVs actualizados.
+    """
+    if not departamento_ids:
+        return 0
+    pdv_table = PDV.__table__
+    # Los nombres de los parámetros no pueden coincidir con los de las columnas del UPDATE
+    stmt = (
+        update(pdv_table)
+        .where(pdv_table.c.id == bindparam("pdv_id"))
+        .values(departamento_id=bindparam("new_departamento_id"), updated_at=bindparam("new_updated_at"))
+    )
+    updated_at = get_utc_now()
+    session.execute(stmt, [
+        {"pdv_id": pdv_id, "new_departamento_id": departamento_id, "new_updated_at": updated_at}
+        for pdv_id, departamento_id in departamento_ids.items()
+    ])
+    return len(departamento_ids)
@@ -0,0 +1,147 @@
+"""
+Imports en segundo plano. Cada import corre como un job en un executor propio del proceso,
+identificado por un job id para consultar el avance o cancelarlo.
+
+Los jobs viven en memoria del worker que los crea. El executor tiene un único thread, así los
+imports nunca corren en paralelo sobre la misma sesión y los sets de ids.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from uuid import uuid4
+
+from api.import_dataset.progress import ImportCancelled, ImportProgress
+from api.import_dataset.tools import import_dataset
+from api.import_dataset.upload import delete_uploaded_dataset
+from api.marketminds.models import get_utc_now
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de chunk por defecto de los jobs, para informar avance y poder cancelar entre chunks
+DEFAULT_JOB_CHUNKSIZE = 50000
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# Los jobs terminados se descartan pasado este tiempo, o los más viejos si hay más de
+# MAX_FINISHED_JOBS, así import_jobs no crece durante toda la vida del proceso
+FINISHED_JOB_TTL = timedelta(hours=24)
+MAX_FINISHED_JOBS = 100
+
+import_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import-job")
+import_jobs: dict[str, "ImportJob"] = {}
+
+
+class ImportJob:
+    """ Un import en segundo plano. """
+
+    def __init__(self, import_kwargs: dict, delete_file: bool = False):
+        self.id = uuid4().hex
+        self.status = JOB_PENDING
+        self.import_kwargs = import_kwargs
+        self.progress = ImportProgress()
+        self.result = None
+        self.error = None
+        self.created_at = get_utc_now()
+        self.finished_at = None
+        self.future = None
+        # Los datasets subidos se borran al terminar el job
+        self.delete_file = delete_file
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+    def run(self):
+        """ Corre el import. Se ejecuta en el thread del executor. """
+        if self.progress.cancelled:
+            # Cancelado antes de empezar
+            self._finish(JOB_CANCELLED)
+            return
+
+        self.status = JOB_RUNNING
+        try:
+            self.result = import_dataset(progress=self.progress, **self.import_kwargs)
+        except ImportCancelled:
+            logger.info(f"Import job {self.id} cancelado")
+            self._finish(JOB_CANCELLED)
+        except Exception as e:
+            logger.exception(f"Import job {self.id} falló")
+            self.error = str(e)
+            self._finish(JOB_FAILED)
+        else:
+            self._finish(JOB_COMPLETED)
+
+    def _finish(self, status: str):
+        if self.delete_file:
+            delete_uploaded_dataset(self.import_kwargs["file_path"])
+        # finished_at antes que status: un job terminado siempre tiene finished_at
+        self.finished_at = get_utc_now()
+        self.status = status
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "progress": self.progress.as_dict(),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def start_import_job(delete_file: bool = False, **import_kwargs) -> ImportJob:
+    """
+    Encola un import en el executor.
+    :param delete_file: Si es True se borra el archivo (file_path) al terminar, para datasets subidos.
+    :param import_kwargs: Los parámetros de import_dataset.
+    :return: El job creado.
+    """
+    import_kwargs.setdefault("chunksize", DEFAULT_JOB_CHUNKSIZE)
+    evict_finished_jobs()
+    job = ImportJob(import_kwargs, delete_file)
+    import_jobs[job.id] = job
+    job.future = import_executor.submit(job.run)
+    logger.info(f"Import job {job.id} encolado")
+    return job
+
+
+def evict_finished_jobs():
+    """
+    Descarta los jobs terminados hace más de FINISHED_JOB_TTL y, si quedan más de
+    MAX_FINISHED_JOBS terminados, los más viejos. Los jobs pendientes o en curso no se descartan.
+    """
+    now = get_utc_now()
+    finished_jobs = sorted(
+        (job for job in list(import_jobs.values()) if job.finished),
+        key=lambda job: job.finished_at,
+    )
+    for index, job in enumerate(finished_jobs):
+        if now - job.finished_at > FINISHED_JOB_TTL or index < len(finished_jobs) - MAX_FINISHED_JOBS:
+            import_jobs.pop(job.id, None)
+
+
+def list_import_jobs() -> list[ImportJob]:
+    """ Devuelve los jobs del proceso, sin los terminados ya descartados. """
+    evict_finished_jobs()
+    return list(import_jobs.values())
+
+
+def get_import_job(job_id: str) -> ImportJob | None:
+    return import_jobs.get(job_id)
+
+
+def cancel_import_job(job_id: str) -> ImportJob | None:
+    """
+    Pide cancelar un job. El import se detiene antes de grabar el chunk en curso.
+    :param job_id: El id del job.
+    :return: El job, o None si no existe.
+    """
+    job = import_jobs.get(job_id)
+    if job and not job.finished:
+        job.progress.cancel()
+    return job
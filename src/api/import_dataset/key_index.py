@@ -0,0 +1,122 @@
+"""
+Índice de claves del import: los sets de ids que se usan para no duplicar registros.
+Se arman leyendo sólo las columnas clave con cursores del lado del servidor (yield_per) y se
+pueden guardar en disco entre imports. Cada set guardado lleva la huella de su tabla (url de la
+base, cantidad de filas y último updated_at); si la tabla cambió desde entonces se vuelve a leer.
+"""
+import logging
+import os
+import pickle
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from api.marketminds.models import POIAndPDV, POISType
+
+logger = logging.getLogger(__name__)
+
+KEY_INDEX_PATH = "api/datasets/.key_index.pickle"
+
+# Filas por fetch del cursor del lado del servidor
+KEY_INDEX_YIELD_PER = 50000
+
+
+def get_key_set(session, *key_columns) -> set:
+    """
+    Devuelve el set de claves de una o más columnas, sin hidratar instancias del ORM.
+    :param session: La sesión de base de datos.
+    :param key_columns: Las columnas de la clave. Con una sola columna el set es de valores,
+        con varias es de tuplas.
+    :return: Un set con las claves.
+    """
+    stmt = select(*key_columns).execution_options(yield_per=KEY_INDEX_YIELD_PER)
+    if len(key_columns) == 1:
+        return set(session.scalars(stmt))
+    return {tuple(row) for row in session.execute(stmt)}
+
+
+def get_poi_key_set(session) -> set:
+    """
+    Devuelve las claves "pois_type - pdv_id" de POIAndPDV con un join al tipo de POI.
+    :param session: La sesión de base de datos.
+    :return: Un set con las claves de los POIs.
+    """
+    stmt = (
+        select(POISType.name, POIAndPDV.pdv_id)
+        .join(POISType, POIAndPDV.pois_type_id == POISType.id)
+        .execution_options(yield_per=KEY_INDEX_YIELD_PER)
+    )
+    return {f"{poi_type} - {pdv_id}" for poi_type, pdv_id in session.execute(stmt)}
+
+
+def get_table_fingerprint(session, model_class) -> tuple:
+    """
+    Devuelve la huella de una tabla: cambia si se agregan, borran o actualizan filas.
+    :param session: La sesión de base de datos.
+    :param model_class: El modelo de la tabla.
+    :return: Una tupla (url de la base, cantidad de filas, último updated_at).
+    """
+    url = session.get_bind().url.render_as_string(hide_password=True)
+    count, last_updated_at = session.execute(
+        select(func.count(), func.max(model_class.updated_at)).select_from(model_class)
+    ).one()
+    return url, count, str(last_updated_at)
+
+
+def read_key_set(session, model_class) -> set:
+    """ Lee de la base el set de claves de un modelo. """
+    if model_class is POIAndPDV:
+        return get_poi_key_set(session)
+    return get_key_set(session, model_class.id)
+
+
+def load_key_index(session, model_classes: list, path: str | None = KEY_INDEX_PATH) -> dict:
+    """
+    Devuelve los sets de claves por modelo, reusando los guardados en disco que siguen vigentes.
+    :param session: La sesión de base de datos.
+    :param model_classes: Los modelos a indexar (POIAndPDV usa la clave "pois_type - pdv_id").
+    :param path: El archivo del índice guardado. None para leer siempre de la base.
+    :return: Un diccionario modelo -> set de claves.
+    """
+    stored = {}
+    if path and os.path.exists(path):
+        try:
+            with open(path, "rb") as index_file:
+                stored = pickle.load(index_file)
+        except Exception:
+            logger.warning(f"No se pudo leer el índice de claves {path}, se arma desde la base")
+
+    key_index = {}
+    for model_class in model_classes:
+        fingerprint = get_table_fingerprint(session, model_class)
+        stored_entry = stored.get(model_class.__tablename__)
+        if stored_entry and stored_entry["fingerprint"] == fingerprint:
+            key_index[model_class] = stored_entry["keys"]
+        else:
+            key_index[model_class] = read_key_set(session, model_class)
+    return key_index
+
+
+def save_key_index(session, key_index: dict, path: str | None = KEY_INDEX_PATH):
+    """
+    Guarda en disco los sets de claves con la huella actual de cada tabla.
+    Se llama después de commitear, así la huella corresponde a las claves guardadas.
+    :param session: La sesión de base de datos.
+    :param key_index: El diccionario modelo -> set de claves.
+    :param path: El archivo del índice. None para no guardarlo.
+    :return: None
+    """
+    if not path:
+        return
+
+    stored = {
+        model_class.__tablename__: {
+            "fingerprint": get_table_fingerprint(session, model_class),
+            "keys": keys,
+        }
+        for model_class, keys in key_index.items()
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as index_file:
+        pickle.dump(stored, index_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
@@ -0,0 +1,113 @@
+"""
+Import paralelo: divide el CSV en shards por rangos de bytes (cortados en fin de línea) y los
+transforma en un pool de procesos. Los resultados se devuelven en el orden del archivo, así la
+deduplicación posterior da lo mismo que el recorrido serial.
+
+Supone que los valores del CSV no tienen saltos de línea embebidos.
+"""
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from api.import_dataset.columnar import transform_chunk
+from api.import_dataset.delta import hash_pdv_rows
+
+logger = logging.getLogger(__name__)
+
+
+def get_shard_ranges(file_path: str, shards: int) -> list[tuple[int, int]]:
+    """
+    Divide los datos del archivo (sin el header) en rangos de bytes que empiezan y terminan en
+    inicio de línea.
+    :param file_path: La ruta del archivo.
+    :param shards: La cantidad de shards buscada.
+    :return: Una lista de rangos (inicio, fin) de bytes.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as dataset_file:
+        dataset_file.readline()
+        data_start = dataset_file.tell()
+        boundaries = [data_start]
+        for shard in range(1, shards):
+            dataset_file.seek(data_start + (size - data_start) * shard // shards)
+            dataset_file.readline()
+            boundaries.append(min(dataset_file.tell(), size))
+    boundaries.append(size)
+
+    return [
+        (start, end)
+        for start, end in zip(boundaries, boundaries[1:])
+        if end > start
+    ]
+
+
+def read_shard(file_path: str, start: int, end: int, columns: list, dtypes: dict) -> pd.DataFrame:
+    """
+    Lee un rango de bytes del archivo como DataFrame.
+    :param file_path: La ruta del archivo.
+    :param start: Byte de inicio del shard.
+    :param end: Byte de fin del shard.
+    :param columns: Las columnas del header del archivo.
+    :param dtypes: Los tipos de las columnas.
+    :return: El DataFrame del shard.
+    """
+    with open(file_path, "rb") as dataset_file:
+        dataset_file.seek(start)
+        data = dataset_file.read(end - start)
+    return pd.read_csv(io.BytesIO(data), encoding="utf-8", header=None, names=columns, dtype=dtypes)
+
+
+def transform_shard(
+    file_path: str,
+    start: int,
+    end: int,
+    columns: list,
+    dtypes: dict,
+    skip_first_row: bool,
+    geo_lookup: dict | None = None,
+) -> dict:
+    """
+    Lee y transforma un shard. Corre en un proceso del pool.
+    :return: El chunk transformado (ver transform_chunk), con el hash de las filas de cada PDV
+        en pdv_hashes (ver delta.hash_pdv_rows).
+    """
+    df_rows = read_shard(file_path, start, end, columns, dtypes)
+    if skip_first_row:
+        # Skip the first row if it contains headers or unwanted data
+        df_rows = df_rows.iloc[1:]
+
+    transformed = transform_chunk(df_rows, geo_lookup=geo_lookup)
+    transformed["pdv_hashes"] = hash_pdv_rows(df_rows)
+    return transformed
+
+
+def transform_dataset_parallel(file_path: str, dtypes: dict, workers: int, geo_lookup: dict | None = None):
+    """
+    Transforma el dataset en un pool de procesos.
+    :param file_path: La ruta del archivo.
+    :param dtypes: Los tipos de las columnas.
+    :param workers: La cantidad de procesos.
+    :param geo_lookup: El lookup de provincias y departamentos (ver geo.resolve_geo).
+    :return: Un iterador de chunks transformados, en el orden del archivo.
+    """
+    columns = list(pd.read_csv(file_path, encoding="utf-8", nrows=0).columns)
+    shard_ranges = get_shard_ranges(file_path, workers)
+    logger.info(f"Import paralelo de {file_path}: {len(shard_ranges)} shards en {workers} procesos")
+
+    # spawn: los procesos no heredan conexiones ni threads del worker web
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+        futures = [
+            pool.submit(transform_shard, file_path, start, end, columns, dtypes, index == 0, geo_lookup)
+            for index, (start, end) in enumerate(shard_ranges)
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,88 @@
+"""
+Seguimiento del avance de un import: etapa actual, filas procesadas, throughput, ETA y cancelación.
+"""
+import threading
+import time
+
+# Etapas del import, en orden. Las tres se procesan por chunk en la misma pasada del archivo
+IMPORT_STAGES = ("dimensions", "pdv", "pois")
+IMPORT_PASSES = 1
+
+
+class ImportCancelled(Exception):
+    """ El import fue cancelado. """
+
+
+class ImportProgress:
+    """
+    Avance de un import. import_dataset lo actualiza al terminar cada chunk y consulta
+    check_cancelled() entre chunks, así una cancelación nunca deja un chunk a medio grabar.
+    """
+
+    def __init__(self, total_rows: int | None = None):
+        self.stage = None
+        self.pass_number = 0
+        self.rows_processed = 0
+        self.total_rows = total_rows
+        self.started_at = time.monotonic()
+        self._rows_done = 0
+        self._rows_skipped = 0
+        self._cancel_event = threading.Event()
+
+    def start_pass(self):
+        """ Empieza una nueva pasada sobre el archivo. """
+        self.pass_number += 1
+        self.rows_processed = 0
+
+    def set_stage(self, stage: str):
+        self.stage = stage
+
+    def add_rows(self, rows: int):
+        self.rows_processed += rows
+        self._rows_done += rows
+
+    def skip_rows(self, rows: int):
+        """ Filas grabadas en un import anterior (checkpoint): suman avance, no throughput. """
+        self.rows_processed += rows
+        self._rows_skipped += rows
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """ Levanta ImportCancelled si se pidió cancelar el import. """
+        if self.cancelled:
+            raise ImportCancelled("Import cancelado")
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self._rows_done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> float | None:
+        """ Segundos estimados para terminar, considerando las pasadas que faltan. """
+        if self.total_rows is None or not self.rows_per_second:
+            return None
+        rows_left = max(self.total_rows * IMPORT_PASSES - self._rows_done - self._rows_skipped, 0)
+        return rows_left / self.rows_per_second
+
+    def as_dict(self) -> dict:
+        eta_seconds = self.eta_seconds
+        return {
+            "stage": self.stage,
+            "pass": self.pass_number,
+            "rows_processed": self.rows_processed,
+            "total_rows": self.total_rows,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "rows_per_second": round(self.rows_per_second, 2),
+            "eta_seconds": round(eta_seconds, 2) if eta_seconds is not None else None,
+        }
@@ -0,0 +1,88 @@
+"""
+Rollups por prefijo de geohash para los mapas de calor: cantidad de PDVs y de POIs por tipo para
+cada precisión. Se rehacen al final de cada import con INSERT ... SELECT, sin traer filas a Python.
+
+PDV y POIAndPDV se recorren una sola vez: primero se agrupan por el geohash truncado a la precisión
+máxima (las hojas) y cada precisión se arma desde la siguiente más fina. Los geohash más cortos que
+la precisión máxima quedan en hojas de su largo, que se suman al llegar a esa precisión. Las hojas se
+graban con la precisión en negativo (-largo) y se borran al final.
+"""
+from sqlalchemy import delete, func, insert, literal, or_, select
+
+from api.marketminds.models import PDV, GeohashPOIRollup, GeohashRollup, POIAndPDV
+
+# Precisiones con rollup, de 1 (~5000 km) a 7 (~150 m)
+MAX_GEOHASH_PRECISION = 7
+GEOHASH_PRECISIONS = range(1, MAX_GEOHASH_PRECISION + 1)
+
+PDV_ROLLUP_COLUMNS = ["precision", "geohash", "pdv_count", "lat", "lon"]
+POI_ROLLUP_COLUMNS = ["precision", "geohash", "pois_type_id", "quantity"]
+
+
+def get_pdv_leaves_select():
+    """ Devuelve el SELECT de las hojas del rollup de PDVs. """
+    prefix = func.substr(PDV.geohash, 1, MAX_GEOHASH_PRECISION)
+    return (
+        select(-func.length(prefix), prefix, func.count(PDV.id), func.avg(PDV.lat), func.avg(PDV.lon))
+        .where(func.length(PDV.geohash) > 0)
+        .group_by(prefix)
+    )
+
+
+def get_poi_leaves_select():
+    """ Devuelve el SELECT de las hojas del rollup de POIs. """
+    prefix = func.substr(PDV.geohash, 1, MAX_GEOHASH_PRECISION)
+    return (
+        select(-func.length(prefix), prefix, POIAndPDV.pois_type_id, func.sum(POIAndPDV.quantity))
+        .join(PDV, PDV.id == POIAndPDV.pdv_id)
+        .where(func.length(PDV.geohash) > 0, POIAndPDV.pois_type_id.is_not(None))
+        .group_by(prefix, POIAndPDV.pois_type_id)
+    )
+
+
+def get_pdv_rollup_select(precision: int):
+    """
+    Devuelve el SELECT del rollup de PDVs de una precisión, desde la precisión siguiente y las
+    hojas de ese largo, con el promedio de lat / lon ponderado por cantidad de PDVs.
+    """
+    prefix = func.substr(GeohashRollup.geohash, 1, precision)
+    pdv_count = func.sum(GeohashRollup.pdv_count)
+    return (
+        select(
+            literal(precision),
+            prefix,
+            pdv_count,
+            func.sum(GeohashRollup.lat * GeohashRollup.pdv_count) / pdv_count,
+            func.sum(GeohashRollup.lon * GeohashRollup.pdv_count) / pdv_count,
+        )
+        .where(or_(GeohashRollup.precision == precision + 1, GeohashRollup.precision == -precision))
+        .group_by(prefix)
+    )
+
+
+def get_poi_rollup_select(precision: int):
+    """ Devuelve el SELECT del rollup de POIs de una precisión, desde la siguiente y las hojas. """
+    prefix = func.substr(GeohashPOIRollup.geohash, 1, precision)
+    return (
+        select(literal(precision), prefix, GeohashPOIRollup.pois_type_id, func.sum(GeohashPOIRollup.quantity))
+        .where(or_(GeohashPOIRollup.precision == precision + 1, GeohashPOIRollup.precision == -precision))
+        .group_by(prefix, GeohashPOIRollup.pois_type_id)
+    )
+
+
+def rebuild_geohash_rollups(session):
+    """
+    Rehace los rollups de todas las precisiones en una transacción, así la API nunca ve un
+    rollup a medio armar.
+    :param session: La sesión de base de datos.
+    """
+    session.execute(delete(GeohashRollup))
+    session.execute(delete(GeohashPOIRollup))
+    session.execute(insert(GeohashRollup).from_select(PDV_ROLLUP_COLUMNS, get_pdv_leaves_select()))
+    session.execute(insert(GeohashPOIRollup).from_select(POI_ROLLUP_COLUMNS, get_poi_leaves_select()))
+    for precision in reversed(GEOHASH_PRECISIONS):
+        session.execute(insert(GeohashRollup).from_select(PDV_ROLLUP_COLUMNS, get_pdv_rollup_select(precision)))
+        session.execute(insert(GeohashPOIRollup).from_select(POI_ROLLUP_COLUMNS, get_poi_rollup_select(precision)))
+    session.execute(delete(GeohashRollup).where(GeohashRollup.precision < 0))
+    session.execute(delete(GeohashPOIRollup).where(GeohashPOIRollup.precision < 0))
+    session.commit()
@@ -0,0 +1,137 @@
+"""
+Instrumentación del import por etapa: tiempo, filas por segundo, cantidad de queries y pico de
+memoria (tracemalloc). Las etapas se acumulan entre chunks.
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class ImportStats:
+    """
+    Estadísticas de un import. Se cuentan sólo las queries del thread que corre el import, así
+    no se mezclan las de otros requests que usan el mismo engine.
+    tracemalloc hace más lenta cada alocación de Python, por eso el pico de memoria es opcional.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.total_seconds = 0.0
+        self._queries = 0
+        self._engine = None
+        self._thread_id = None
+        self._started_at = None
+        self._tracemalloc_started = False
+
+    def _count_query(self, *args, **kwargs):
+        if threading.get_ident() == self._thread_id:
+            self._queries += 1
+
+    def start(self, engine):
+        """ Empieza a medir: registra el contador de queries en el engine y arranca tracemalloc. """
+        self._engine = engine
+        self._thread_id = threading.get_ident()
+        event.listen(engine, "before_cursor_execute", self._count_query)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_started = True
+        self._started_at = time.perf_counter()
+
+    def stop(self):
+        if self._started_at is None:
+            return
+        self.total_seconds = time.perf_counter() - self._started_at
+        event.remove(self._engine, "before_cursor_execute", self._count_query)
+        if self._tracemalloc_started:
+            tracemalloc.stop()
+            self._tracemalloc_started = False
+        self._started_at = None
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """
+        Mide un bloque del import y lo suma a su etapa.
+        :param name: El nombre de la etapa.
+        :param rows: Las filas que procesa el bloque.
+        """
+        queries_before = self._queries
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, {
+                "seconds": 0.0,
+                "rows": 0,
+                "queries": 0,
+                "calls": 0,
+                "peak_memory_bytes": None,
+            })
+            stage["seconds"] += time.perf_counter() - started_at
+            stage["rows"] += rows
+            stage["queries"] += self._queries - queries_before
+            stage["calls"] += 1
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                stage["peak_memory_bytes"] = max(stage["peak_memory_bytes"] or 0, peak)
+
+    def add_rows(self, name: str, rows: int):
+        """ Suma filas a una etapa ya medida (cuando se conocen después del bloque). """
+        self.stages[name]["rows"] += rows
+
+    def iter_stage(self, name: str, iterable, count_rows=len):
+        """
+        Mide el tiempo de producir cada elemento de un iterador (lectura de chunks, shards).
+        :param name: El nombre de la etapa.
+        :param iterable: El iterador a medir.
+        :param count_rows: Función que devuelve las filas de un elemento.
+        :return: Un iterador con los mismos elementos.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, None)
+            if item is None:
+                return
+            self.add_rows(name, count_rows(item))
+            yield item
+
+    def as_dict(self) -> dict:
+        stages = {}
+        for name, stage in self.stages.items():
+            seconds = stage["seconds"]
+            peak = stage["peak_memory_bytes"]
+            stages[name] = {
+                "seconds": round(seconds, 3),
+                "rows": stage["rows"],
+                "rows_per_second": round(stage["rows"] / seconds, 2) if stage["rows"] and seconds > 0 else None,
+                "queries": stage["queries"],
+                "calls": stage["calls"],
+                "peak_memory_mb": round(peak / 1024 / 1024, 2) if peak is not None else None,
+            }
+        return {
+            "total_seconds": round(self.total_seconds, 3),
+            "queries": self._queries,
+            "stages": stages,
+        }
+
+    def log(self, file_path: str):
+        """ Emite una línea de log JSON por etapa y una con el total. """
+        stats = self.as_dict()
+        for name, stage in stats["stages"].items():
+            logger.info(json.dumps({"event": "import_stage", "file": file_path, "stage": name, **stage}))
+        logger.info(json.dumps({
+            "event": "import_total",
+            "file": file_path,
+            "seconds": stats["total_seconds"],
+            "queries": stats["queries"],
+        }))
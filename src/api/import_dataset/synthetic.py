@@ -0,0 +1,276 @@
+"""
+Generador de datasets sintéticos con el formato de mdt_negocio_import.csv (columnas del docstring
+de models.py), para medir el import sin datos reales:
+
+    python -m api.import_dataset.synthetic /tmp/mdt_100k.csv --rows 100k --duplicate-ratio 0.2
+
+Los valores imitan los del archivo real: ids de PDV "cliente-número", coordenadas dentro de
+provincias argentinas con su geohash, respuestas "Si" / "No", fechas ISO, cantidades de POIs con
+muchos ceros, y una proporción configurable de valores inválidos o vacíos.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from api.import_dataset.dataset_keys import pdv_keys_dict, pois_types
+
+# Columnas del archivo en el orden del docstring de models.py
+BASE_COLUMNS = [
+    "id_pdv_unique",
+    "id_cli_suc_cuenta",
+    "id_cod_pdv",
+    "desc_cli_suc_cuenta",
+    "id_tie_fecha_alta",
+    "pv_x",
+    "pv_y",
+    "id_cli_canal_dist",
+    "desc_cli_canal_dist",
+    "id_cli_categoria_dist",
+    "id_cli_subcanal_adic_dist",
+    "desc_cli_subcanal_dist",
+    "pv_pcia",
+    "pv_departamento",
+    "geohash",
+    "id_cli_vendedor",
+    "desc_cli_vendedor",
+    "id_cli_gte_regional",
+    "desc_cli_gte_regional",
+    "id_cli_gte_nacional",
+    "desc_cli_gte_nacional",
+]
+SURVEY_COLUMNS = [value["name"] for value in pdv_keys_dict.values() if value["name"] not in BASE_COLUMNS]
+DATASET_COLUMNS = BASE_COLUMNS + SURVEY_COLUMNS + pois_types + ["total_pois"]
+
+# Provincias con un centro aproximado (lat, lon) y algunos departamentos
+PROVINCIAS = {
+    "Buenos Aires": ((-36.5, -60.0), ["La Plata", "Bahía Blanca", "Mar del Plata", "Tandil", "Pilar", "Quilmes"]),
+    "Ciudad Autónoma de Buenos Aires": ((-34.6, -58.45), ["Comuna 1", "Comuna 4", "Comuna 13", "Comuna 14"]),
+    "Córdoba": ((-31.4, -64.2), ["Capital", "Río Cuarto", "Punilla", "Colón"]),
+    "Santa Fe": ((-31.6, -60.7), ["La Capital", "Rosario", "Rafaela", "General López"]),
+    "Mendoza": ((-32.9, -68.8), ["Capital", "Godoy Cruz", "San Rafael", "Maipú"]),
+    "Tucumán": ((-26.8, -65.2), ["Capital", "Tafí Viejo", "Yerba Buena"]),
+    "Salta": ((-24.8, -65.4), ["Capital", "Orán", "Cafayate"]),
+    "Neuquén": ((-38.95, -68.06), ["Confluencia", "Lácar"]),
+}
+
+CANALES = ["Autoservicio", "Almacén", "Kiosco", "Supermercado", "Mayorista"]
+SUBCANALES = ["Tradicional", "Moderno", "Estación de servicio", "Farmacia", "Bar", "Restaurante"]
+UBICACIONES = ["Calle", "Avenida", "Shopping", "Galería", "Estación de servicio"]
+FECHA_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+GEOHASH_BASE32 = np.array(list("0123456789bcdefghjkmnpqrstuvwxyz"))
+GEOHASH_PRECISION = 7
+
+# Filas por bloque escrito al CSV
+GENERATOR_CHUNK_ROWS = 100000
+
+
+def parse_rows(value: str) -> int:
+    """ Convierte tamaños como "10k" o "1M" a cantidad de filas. """
+    value = value.strip().lower()
+    multipliers = {"k": 1000, "m": 1000000}
+    if value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def encode_geohash(lat: np.ndarray, lon: np.ndarray, precision: int = GEOHASH_PRECISION) -> np.ndarray:
+    """
+    Calcula el geohash de arrays de coordenadas.
+    :param lat: Las latitudes.
+    :param lon: Las longitudes.
+    :param precision: La cantidad de caracteres del geohash.
+    :return: Un array con los geohash.
+    """
+    bits = precision * 5
+    # Intercalado de bits: los pares son longitud, los impares latitud
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    lon_index = np.clip(((lon + 180) / 360 * (1 << lon_bits)).astype(np.int64), 0, (1 << lon_bits) - 1)
+    lat_index = np.clip(((lat + 90) / 180 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+
+    code = np.zeros(len(lat), dtype=np.int64)
+    for bit in range(bits):
+        if bit % 2 == 0:
+            value = (lon_index >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            value = (lat_index >> (lat_bits - 1 - bit // 2)) & 1
+        code = (code << 1) | value
+
+    geohash = np.full(len(lat), "", dtype=f"<U{precision}")
+    for position in range(precision):
+        geohash = np.char.add(geohash, GEOHASH_BASE32[(code >> (5 * (precision - 1 - position))) & 31])
+    return geohash
+
+
+def with_invalid(rng: np.random.Generator, values: np.ndarray, invalid_ratio: float, invalid_values: list) -> np.ndarray:
+    """ Reemplaza una proporción de los valores por valores inválidos o vacíos. """
+    values = values.astype(object)
+    invalid = rng.random(len(values)) < invalid_ratio
+    values[invalid] = rng.choice(np.array(invalid_values, dtype=object), invalid.sum())
+    return values
+
+
+def generate_pdvs(rng: np.random.Generator, count: int, first_number: int, clients: int, invalid_ratio: float) -> pd.DataFrame:
+    """
+    Genera los datos de PDVs distintos (todas las columnas menos los POIs).
+    :param rng: El generador de números aleatorios.
+    :param count: La cantidad de PDVs.
+    :param first_number: El número del primer PDV, para no repetir ids entre bloques.
+    :param clients: La cantidad de clientes.
+    :param invalid_ratio: La proporción de valores inválidos o vacíos en la encuesta y fechas.
+    :return: Un DataFrame con un PDV por fila.
+    """
+    client = rng.integers(1, clients + 1, count)
+    number = np.arange(first_number, first_number + count)
+    pdv_id = np.char.add(np.char.add(client.astype(str), "-"), number.astype(str))
+
+    provincia_names = list(PROVINCIAS)
+    provincia = rng.integers(0, len(provincia_names), count)
+    centers = np.array([PROVINCIAS[name][0] for name in provincia_names])
+    lat = centers[provincia, 0] + rng.normal(0, 0.6, count)
+    lon = centers[provincia, 1] + rng.normal(0, 0.6, count)
+    departamento = np.array([
+        rng.choice(PROVINCIAS[provincia_names[index]][1])
+        for index in provincia
+    ])
+
+    canal = rng.integers(1, len(CANALES) + 1, count)
+    subcanal = rng.integers(1, len(SUBCANALES) + 1, count)
+    vendedor = rng.integers(1, 20 * clients + 1, count)
+    gte_regional = rng.integers(1, 4 * clients + 1, count)
+    gte_nacional = rng.integers(1, clients + 1, count)
+    fecha_alta = pd.Timestamp("2005-01-01") + pd.to_timedelta(rng.integers(0, 7000, count), unit="D")
+
+    df = pd.DataFrame({
+        "id_pdv_unique": pdv_id,
+        "id_cli_suc_cuenta": client,
+        "id_cod_pdv": np.char.add("PDV", number.astype(str)),
+        "desc_cli_suc_cuenta": np.char.add("Cliente ", client.astype(str)),
+        "id_tie_fecha_alta": with_invalid(rng, fecha_alta.strftime(FECHA_FORMAT).to_numpy(), invalid_ratio, [None, "s/d"]),
+        "pv_x": lon.round(6),
+        "pv_y": lat.round(6),
+        "id_cli_canal_dist": canal,
+        "desc_cli_canal_dist": np.array(CANALES)[canal - 1],
+        "id_cli_categoria_dist": rng.integers(1, 5, count),
+        "id_cli_subcanal_adic_dist": subcanal,
+        "desc_cli_subcanal_dist": np.array(SUBCANALES)[subcanal - 1],
+        "pv_pcia": np.array(provincia_names)[provincia],
+        "pv_departamento": departamento,
+        "geohash": encode_geohash(lat, lon),
+        "id_cli_vendedor": vendedor,
+        "desc_cli_vendedor": np.char.add("Vendedor ", vendedor.astype(str)),
+        "id_cli_gte_regional": gte_regional,
+        "desc_cli_gte_regional": np.char.add("Gerente regional ", gte_regional.astype(str)),
+        "id_cli_gte_nacional": gte_nacional,
+        "desc_cli_gte_nacional": np.char.add("Gerente nacional ", gte_nacional.astype(str)),
+    })
+
+    for value in pdv_keys_dict.values():
+        column = value["name"]
+        if column in df:
+            continue
+        if value.get("type") == "bool":
+            answers = rng.choice(np.array(["Si", "No"]), count)
+            df[column] = with_invalid(rng, answers, invalid_ratio, [None, "NS/NC"])
+        elif value.get("type") == "float":
+            quantities = rng.poisson(4, count).astype(str)
+            df[column] = with_invalid(rng, quantities, invalid_ratio, [None, "más de 10", "2,5"])
+        elif column == "donde_se_encuentra_ubicado":
+            df[column] = rng.choice(np.array(UBICACIONES), count)
+        else:
+            df[column] = with_invalid(rng, rng.choice(np.array(["Si", "No", "Horizontal", "Vertical"]), count),
+                                      invalid_ratio, [None])
+    return df
+
+
+def generate_pois(rng: np.random.Generator, count: int, invalid_ratio: float) -> pd.DataFrame:
+    """ Genera las cantidades de POIs por tipo (mayoría de ceros) y total_pois. """
+    quantities = rng.poisson(0.6, (count, len(pois_types))).astype(float)
+    quantities[rng.random((count, len(pois_types))) < invalid_ratio] = np.nan
+    df = pd.DataFrame(quantities, columns=pois_types)
+    df["total_pois"] = np.nansum(quantities, axis=1)
+    return df
+
+
+def generate_chunk(
+    rng: np.random.Generator,
+    rows: int,
+    first_number: int,
+    previous_pdvs: pd.DataFrame | None,
+    duplicate_ratio: float,
+    clients: int,
+    invalid_ratio: float,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Genera un bloque de filas: PDVs nuevos y filas repetidas de PDVs ya generados (con otros POIs).
+    :return: El bloque y los PDVs nuevos del bloque.
+    """
+    duplicates = int(rows * duplicate_ratio)
+    new_pdvs = generate_pdvs(rng, rows - duplicates, first_number, clients, invalid_ratio)
+    candidates = new_pdvs if previous_pdvs is None else pd.concat([previous_pdvs, new_pdvs], ignore_index=True)
+    repeated = candidates.iloc[rng.integers(0, len(candidates), duplicates)] if duplicates else candidates.iloc[:0]
+
+    pdv_rows = pd.concat([new_pdvs, repeated], ignore_index=True)
+    pdv_rows = pdv_rows.iloc[rng.permutation(len(pdv_rows))].reset_index(drop=True)
+    chunk = pd.concat([pdv_rows, generate_pois(rng, len(pdv_rows), invalid_ratio)], axis=1)
+    return chunk[DATASET_COLUMNS], new_pdvs
+
+
+def generate_dataset(
+    file_path: str,
+    rows: int,
+    duplicate_ratio: float = 0.2,
+    clients: int = 3,
+    invalid_ratio: float = 0.05,
+    seed: int = 0,
+) -> str:
+    """
+    Genera un dataset sintético.
+    :param file_path: El archivo CSV a crear (se pisa si existe).
+    :param rows: La cantidad de filas de datos.
+    :param duplicate_ratio: La proporción de filas que repiten un PDV ya generado.
+    :param clients: La cantidad de clientes.
+    :param invalid_ratio: La proporción de valores inválidos o vacíos.
+    :param seed: La semilla, el mismo seed genera el mismo archivo.
+    :return: La ruta del archivo.
+    """
+    rng = np.random.default_rng(seed)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+    previous_pdvs = None
+    first_number = 1
+    for start in range(0, rows, GENERATOR_CHUNK_ROWS):
+        chunk_rows = min(GENERATOR_CHUNK_ROWS, rows - start)
+        chunk, new_pdvs = generate_chunk(
+            rng, chunk_rows, first_number, previous_pdvs, duplicate_ratio, clients, invalid_ratio
+        )
+        chunk.to_csv(file_path, mode="a", header=start == 0, index=False, encoding="utf-8")
+        first_number += len(new_pdvs)
+        # Sólo se repiten PDVs de los últimos bloques, así la memoria no crece con el archivo
+        previous_pdvs = new_pdvs
+
+    return file_path
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m api.import_dataset.synthetic",
+        description="Genera un dataset sintético con el formato de mdt_negocio_import.csv.",
+    )
+    parser.add_argument("file_path", help="Archivo CSV a crear")
+    parser.add_argument("--rows", type=parse_rows, default=parse_rows("10k"), help="Filas, ej: 10k, 100k, 1M")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="Proporción de filas de PDVs repetidos")
+    parser.add_argument("--clients", type=int, default=3, help="Cantidad de clientes")
+    parser.add_argument("--invalid-ratio", type=float, default=0.05, help="Proporción de valores inválidos")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_dataset(args.file_path, args.rows, args.duplicate_ratio, args.clients, args.invalid_ratio, args.seed)
+    print(args.file_path)
+
+
+if __name__ == "__main__":
+    main()
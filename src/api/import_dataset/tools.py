@@ -1,9 +1,11 @@
 import logging
 
 import pandas as pd
-from sqlmodel import select
+from sqlmodel import Session, delete
 
-from api.db.session import get_session
+from api.db.session import engine
+from api.helpers.cache import invalidate_response_cache
+from api.helpers.tools import add_conversion_errors
 from api.marketminds.models import (
     CanalDistribucion,
     Categoria,
@@ -11,680 +13,697 @@ from api.marketminds.models import (
     Departamento,
     GerenteNacional,
     GerenteRegional,
+    ImportCheckpoint,
     PDV,
+    PDVHash,
     POIAndPDV,
     POISType,
-    Provincia,
     SubcanalAdicional,
     Sucursal,
     Vendedor,
 )
-from api.helpers.tools import get_datetime_from_str, si_no_a_bool
+from api.marketminds.poi_types import reset_poi_type_names
+from api.marketminds.segments import mark_segment_index_stale
+from api.marketminds.spatial import mark_pdv_index_stale
+from api.import_dataset.bulk import bulk_upsert
+from api.import_dataset.columnar import (
+    GEO_COLUMNS,
+    ID_NAME_MODELS,
+    PDV_KEY,
+    get_departamento_ids,
+    get_existing_pdv_records,
+    transform_chunk,
+)
+from api.import_dataset.checkpoint import (
+    delete_checkpoint,
+    get_checkpoint_record,
+    get_checkpoint_rows,
+    split_imported_rows,
+)
+from api.import_dataset.formats import (
+    DATASET_CSV,
+    DATASET_PARQUET,
+    count_data_rows,
+    detect_dataset_format,
+    get_compression,
+    get_dataset_columns,
+    get_import_columns,
+    read_parquet_chunks,
+)
+from api.import_dataset.geo import get_pdv_ids_without_departamento, resolve_geo, update_pdv_departamentos
+from api.import_dataset.key_index import (
+    KEY_INDEX_PATH,
+    get_key_set,
+    get_poi_key_set,
+    load_key_index,
+    save_key_index,
+)
+from api.import_dataset.delta import (
+    DeltaFilter,
+    PDVHasher,
+    get_file_checksum,
+    get_pdv_hashes,
+    hash_pdv_rows,
+    is_file_imported,
+    register_imported_file,
+)
+from api.import_dataset.parallel import transform_dataset_parallel
+from api.import_dataset.rollups import rebuild_geohash_rollups
+from api.import_dataset.progress import ImportProgress
+from api.import_dataset.stats import ImportStats
+from api.import_dataset.dataset_keys import (
+    numeric_columns,
+    numeric_columns_prefix,
+    pdv_keys_dict,  # noqa: F401
+    pois_types,
+)
 
 logger = logging.getLogger(__name__)
-session = next(get_session())
-
-pdv_keys_dict = {
-    'id': {'name': 'id_pdv_unique'},
-    'cod_pdv': {'name': 'id_cod_pdv'},
-    'fecha_alta': {'name': 'id_tie_fecha_alta'},
-    'lat': {'name': 'pv_y'},
-    'lon': {'name': 'pv_x'},
-    'geohash': {'name': 'geohash'},
-    'bandejas': {'name': 'indicar_cantidad_de_bandejas'},
-    'm2': {'name': 'indique_la_cantidad_de_m2_de_la_tienda'},
-    'pasillos': {'name': 'indique_la_cantidad_de_pasillos'},
-    'puertas_heladeras': {'name': 'indique_la_cantidad_de_puertas_de_heladeras'},
-    'puntos_cobro': {'name': 'indique_la_cantidad_de_puntos_de_cobro_cajas_del_pdv'},
-    'tiene_ingreso': {'name': 'se_puede_ingresar_al_interior_del_local', 'type': 'bool'},
-    'compra_en_plataformas': {
-        'name': 'compra_en_plataformas_web_ej_bees_compre_ahora_coca_tokin',
-        'type': 'bool',
-    },
-    'cuenta_con_apps_delivery': {
-        'name': 'cuenta_con_apps_de_delivery_ej_pedidos_ya_rappi_propia',
-        'type': 'bool',
-    },
-    'cuenta_con_deposito': {
-        'name': 'cuenta_con_deposito_de_mercaderia',
-        'type': 'bool',
-    },
-    'cuenta_con_medios_cobro_digital': {
-        'name': 'cuenta_con_medios_de_cobro_digital_o_electronico_ej_posnet_apps_de_pago_qr',
-        'type': 'bool',
-    },
-    'otros_servicios': {
-        'name': 'cuenta_con_otros_servicios_ej_tarjeta_colectivos_carga_celular_cospeles_rapipago_pago_facil',
-        'type': 'bool',
-    },
-    'ubicacion': {'name': 'donde_se_encuentra_ubicado'},
-    'abierto_24h': {'name': 'la_tienda_se_encuentra_abierta_las_24_hs_del_dia', 'type': 'bool'},
-    'abierto_7d': {'name': 'la_tienda_se_encuentra_abierta_los_7_dias_de_la_semana', 'type': 'bool'},
-    'bebidas_alcoholicas': {'name': 'ofrece_bebidas_alcoholicas', 'type': 'bool'},
-    'medicamentos_venta_libre': {
-        'name': 'ofrece_medicamentos_de_venta_libre_ej_ibuprofeno_sertal_otros',
-        'type': 'bool'
-    },
-    'cuidados_personales': {
-        'name': 'ofrece_producto_de_cuidado_personal_ej_shampoo_maquinita_de_afeitar_toallitas_femeninas',
-        'type': 'bool'
-    },
-    'productos_lacteos': {'name': 'ofrece_productos_lacteos', 'type': 'bool'},
-    'productos_varios': {'name': 'ofrece_productos_varios_ej_pilas_encendedroes_preservativos', 'type': 'bool'},
-    'viandas': {'name': 'ofrece_viandas_ej_menues_tartas_sandwiches_ensaladas', 'type': 'bool'},
-    'freezer': {'name': 'tiene_freezer_cual_es'},
-    'imagen_frente': {'name': 'tiene_imagen_en_el_frente_del_local', 'type': 'bool'},
-    'presencia_redes_sociales': {
-        'name': 'tiene_presencia_en_redes_sociales_ej_instagram_facebook_tik_tok',
-        'type': 'bool'
-    },
-    'eventos_tematicos': {
-        'name': 'trabaja_los_eventos_tematicos_navidad_pascuas_halloween_seleccion_argentina',
-        'type': 'bool'
-    },
-}
-
-pois_types = [
-    'pois_agencias_de_viajes',
-    'pois_alimentacion',
-    'pois_alojamientos',
-    'pois_atracciones_turisticas',
-    'pois_bares_bodegas',
-    'pois_centros_de_salud',
-    'pois_clubes_deportivos',
-    'pois_clubes_nocturnos'
-    'pois_escuelas',
-    'pois_heladerias',
-    'pois_hoteles',
-    'pois_instituciones_educativas',
-    'pois_otras_instituciones',
-    'pois_servicios_de_transporte',
-    'pois_bus_stop',
-]
-
-
-def get_set_of_ids(model_to_get, this_key: str = 'id') -> set:
-    """
-    Devuelve un set de ids de un modelo específico.
+
+DATASET_PATH = "api/datasets/mdt_negocio_import.csv"
+
+
+def get_set_of_ids(session: Session, model_to_get, this_key: str = 'id') -> set:
+    """
+    Devuelve un set de ids de un modelo específico, leyendo sólo esa columna.
+    :param session: La sesión de base de datos.
     :param model_to_get: El modelo del cual se quiere obtener los ids.
     :return: Un set con los ids del modelo.
     """
-    # Obtener todos los registros del modelo
-    all_records = session.query(model_to_get).all()
+    return get_key_set(session, getattr(model_to_get, this_key))
 
-    # Crear un set con los ids
-    ids = {getattr(record, this_key) for record in all_records}
-    return ids
 
-
-def get_set_of_names(model_to_get) -> set:
+def get_set_of_names(session: Session, model_to_get) -> set:
     """
-    Devuelve un set de names de un modelo específico.
+    Devuelve un set de names de un modelo específico, leyendo sólo esa columna.
+    :param session: La sesión de base de datos.
     :param model_to_get: El modelo del cual se quiere obtener los names.
     :return: Un set con los names del modelo.
     """
-    # Obtener todos los registros del modelo
-    all_records = session.query(model_to_get).all()
-
-    # Crear un set con los ids
-    names = {record.name for record in all_records}
-    return names
+    return get_key_set(session, model_to_get.name)
 
 
-def get_model_dict(model_class, this_key: str = 'id') -> dict:
+def get_model_dict(session: Session, model_class, this_key: str = 'id', value_key: str = 'id') -> dict:
     """
-    Devuelve un diccionario de PDVs.
+    Devuelve un diccionario this_key -> value_key de un modelo, sin cargar las instancias.
     """
-    # Obtener todos los registros del modelo
-    all_records = session.query(model_class).all()
-
-    # Crear un set con los ids
-    records_dict = {
-        getattr(record, this_key): record
-        for record in all_records
-    }
-    return records_dict
+    return dict(get_key_set(session, getattr(model_class, this_key), getattr(model_class, value_key)))
 
 
-def get_set_of_pois_and_pdv() -> set:
+def get_set_of_pois_and_pdv(session: Session) -> set:
     """
     Devuelve un set de ids de POI y PDV.
-    :return: Un set con los ids de POI y PDV.
+    :param session: La sesión de base de datos.
+    :return: Un set con "pois_type - pdv_id" de los POIs.
     """
-    # Obtener todos los registros del modelo
-    all_records = session.query(POIAndPDV).all()
-
-    # Crear un set con los información que no puede ser duplicada
-    pois_and_pdv = {
-        f'{record.pois_type.name} - {record.pdv_id}'
-        for record in all_records
-    }
-
-    return pois_and_pdv
+    return get_poi_key_set(session)
 
 
-def init_pois_types():
+def init_pois_types(session: Session) -> dict[str, int]:
     """
     Inicializa los tipos de POI en la base de datos.
-    :return: None
+    :param session: La sesión de base de datos.
+    :return: Los ids de los tipos de POI por nombre.
     """
-    dict_of_pois_types = get_model_dict(POISType, this_key='name')
-
-    for poi_type in pois_types:
-        if poi_type in dict_of_pois_types.keys():
-            # Si el tipo de POI ya existe, no lo creo
-            continue
-        new_poi_type = POISType(name=poi_type)
-        session.add(new_poi_type)
-        dict_of_pois_types[poi_type] = new_poi_type
-    session.commit()
-
-    return dict_of_pois_types
+    pois_type_ids = get_model_dict(session, POISType, this_key='name')
 
+    new_pois_types = [
+        POISType(name=poi_type)
+        for poi_type in pois_types
+        if poi_type not in pois_type_ids
+    ]
+    if new_pois_types:
+        session.add_all(new_pois_types)
+        session.commit()
+        # Los nombres de tipos de POI que usa la API se vuelven a leer
+        reset_poi_type_names()
+        pois_type_ids = get_model_dict(session, POISType, this_key='name')
 
-def get_clients_dict() -> dict[str, Client]:
-    clients = session.exec(select(Client)).all()
-    return {str(client.id): client for client in clients}
+    return pois_type_ids
 
 
-def get_any_model_dict(model_to_get, this_key: str = 'id') -> dict[str, any]:
-    """
-    Devuelve un diccionario de un modelo específico.
-    :param model_to_get: El modelo del cual se quiere obtener los ids.
-    :return: Un diccionario con los ids del modelo.
-    """
-    # Obtener todos los registros del modelo
-    all_records = session.query(model_to_get).all()
-
-    # Crear un diccionario con los ids
-    records_dict = {getattr(record, this_key): record for record in all_records}
-    return records_dict
-
-
-def get_set_of_departamentos_names() -> set:
+def get_set_of_departamentos_names(session: Session) -> set:
     """
     Devuelve un set de names de departamento
+    :param session: La sesión de base de datos.
     :return: Un set con "provincia_id - name" de departamentos.
     """
-    # Obtener todos los registros del modelo
-    all_records = session.query(Departamento).all()
-
-    # Crear un set con los ids
-    names = {f"{record.provincia_id} - {record.name}" for record in all_records}
-    return names
+    return {
+        f"{provincia_id} - {name}"
+        for provincia_id, name in get_key_set(session, Departamento.provincia_id, Departamento.name)
+    }
 
 
-def process_any_id_name_pair(row, id_key: str, name_key: str, ids_set: set, model_class):
+def add_new_records(records: list[dict], model_class, ids_set: set, records_to_import: dict):
     """
-    Procesa un par de id y nombre de cualquier modelo.
-    :param row: La fila del DataFrame.
-    :param id_key: La clave del id en el DataFrame.
-    :param name_key: La clave del nombre en el DataFrame.
-    :param model_class: La clase del modelo a procesar.
-    :return: None si no crea o registro creado
+    Agrega los registros nuevos a los datos a importar del modelo.
+    :param records: Los datos de los registros nuevos.
+    :param model_class: La clase del modelo a crear.
+    :param ids_set: El set de ids del modelo, se actualiza con los nuevos ids.
+    :param records_to_import: Los datos a importar por modelo.
+    :return: None
     """
-    id_value = str(row[id_key])
-    if name_key == "(Sin nombre)":
-        name_value = name_key
-    else:
-        name_value = str(row[name_key])
-
-    this_registro = None
-    if (
-        id_value not in ids_set or
-        pd.isna(id_value) or
-        pd.isna(name_value)
-    ):
-        # Sólo agregar si el id y la descripción no son nulos y no están en el set
-        this_registro = model_class(
-            id=id_value,
-            name=name_value,
-        )
+    records_to_import.setdefault(model_class, []).extend(records)
+    ids_set.update(record['id'] for record in records)
 
-    return this_registro
 
-
-def process_just_name(row, name_key: str, names_set: set, model_class):
+def save_records(
+    session: Session,
+    records_to_import: dict,
+    bulk: bool = False,
+    records_to_upsert: dict | None = None,
+):
     """
-    Procesa un registro de un modelo que sólo tiene un nombre. (id es autonumérico)
-    :param row: La fila del DataFrame.
-    :param name_key: La clave del nombre en el DataFrame.
-    :param model_class: La clase del modelo a procesar.
-    :return: None si no crea o registro creado
+    Graba en la base los datos a importar, en el orden en que se agregaron los modelos.
+    :param session: La sesión de base de datos.
+    :param records_to_import: Los datos a importar por modelo.
+    :param bulk: Si es True usa INSERTs multi-fila de Core con upsert, si no instancias del ORM.
+    :param records_to_upsert: Datos de registros que pueden existir, siempre se graban con upsert.
+    :return: None
     """
-    if name_key == "(Sin nombre)":
-        name_value = name_key
-    else:
-        name_value = row[name_key]
-
-    this_registro = None
-    if (
-        name_value not in names_set or
-        pd.isna(name_value)
-    ):
-        # Sólo agregar si nombre si no es nulo y no está en el set
-        this_registro = model_class(
-            name=name_value,
-        )
-
-    return this_registro
+    for model_class, records in records_to_import.items():
+        if bulk:
+            bulk_upsert(session, model_class, records)
+        else:
+            session.add_all([model_class(**record) for record in records])
+    if records_to_upsert:
+        # Las inserciones del ORM tienen que llegar antes que los upserts de Core
+        session.flush()
+        for model_class, records in records_to_upsert.items():
+            bulk_upsert(session, model_class, records)
+    session.commit()
+    # Las respuestas cacheadas de la API y los índices en memoria ya no reflejan la base
+    invalidate_response_cache()
+    mark_pdv_index_stale()
+    mark_segment_index_stale()
 
 
-def process_related_names(
-    row,
-    name_key: str,
-    names_set: set,
-    model_class,
-    instance_related,
-    related_key: str,
-    related_instance: str,
+def add_transformed_chunk(
+    transformed: dict,
+    ids_sets: dict,
+    records_to_import: dict,
+    conversion_errors: dict | None = None,
 ):
     """
-    Procesa un registro de un modelo que sólo tiene un nombre relacionado con otro modelo, a buscar por name.
-    :param row: La fila del DataFrame.
-    :param name_key: La clave del nombre en el DataFrame.
-    :param model_class: La clase del modelo a procesar.
-    :param model_class_related: La clase del modelo relacionado a procesar.
-    :return: None si no crea o registro creado
-    :param related_name: El nombre del campo relacionado en el modelo.
+    Agrega a los datos a importar los registros de un chunk transformado (ver transform_chunk)
+    que todavía no existen. Los chunks se tienen que agregar en el orden del archivo.
+    :param transformed: El chunk transformado.
+    :param ids_sets: Los sets de ids por modelo, se actualizan con los nuevos ids.
+    :param records_to_import: Los datos a importar por modelo.
+    :param conversion_errors: Donde se acumulan los errores de conversión de los PDVs agregados.
+    :return: None
     """
-    if name_key == "(Sin nombre)":
-        name_value = name_key
-    else:
-        name_value = row[name_key]
-
-    this_registro = None
-    if (
-        name_value not in names_set or
-        pd.isna(name_value)
-    ):
-        new_registro_params = {
-            'name': name_value,
-            related_key: instance_related.id,
-            related_instance: instance_related,
-        }
-        this_registro = model_class(**new_registro_params)
+    for model_class, records in transformed["records"].items():
+        ids_set = ids_sets[model_class]
+        new_records = [record for record in records if record['id'] not in ids_set]
+        add_new_records(new_records, model_class, ids_set, records_to_import)
 
-    return this_registro
+        if model_class is PDV and conversion_errors is not None:
+            new_pdv_ids = {record['id'] for record in new_records}
+            add_conversion_errors(conversion_errors, transformed["conversion_errors"], only_ids=new_pdv_ids)
 
 
-def process_base_model(
-    row,
-    id_key: str,
-    name_key: str,
+def add_poi_candidates(
+    pois: pd.DataFrame,
     ids_set: set,
-    model_class,
-    this_client,
-    models_to_import: list,
+    pois_type_ids: dict[str, int],
+    records_to_import: dict,
 ):
-    new_record = process_any_id_name_pair(
-        row=row,
-        id_key=id_key,
-        name_key=name_key,
-        ids_set=ids_set,
-        model_class=model_class,
-    )
-
-    if new_record:
-        new_record.client_id = this_client.id
-        new_record.client = this_client
-        models_to_import.append(new_record)
-        ids_set.add(str(row[id_key]))
-
-    return new_record
+    """
+    Agrega a los datos a importar los POIs (ver get_poi_candidates) que todavía no existen.
+    Se vinculan sólo por foreign key, sin cargar las instancias de PDV.
+    :param pois: Los candidatos (pois_type, pdv_id, quantity).
+    :param ids_set: El set de ids de POI ("pois_type - pdv_id"), se actualiza con los nuevos.
+    :param pois_type_ids: Los ids de los tipos de POI por nombre.
+    :param records_to_import: Los datos a importar por modelo.
+    :return: None
+    """
+    if pois.empty:
+        return
+
+    # Anti-join contra los pares (tipo, PDV) que ya existen
+    poi_identifiers = pois["pois_type"] + " - " + pois["pdv_id"]
+    is_new = ~poi_identifiers.isin(ids_set)
+    pois_type_id = pois["pois_type"].map(pois_type_ids)
+    unknown_type = pois_type_id.isna()
+    for poi_type in pois.loc[is_new & unknown_type, "pois_type"].unique():
+        # Si el tipo de POI no existe, dejo un log y continúo
+        logger.warning(f"Tipo de POI {poi_type} no encontrado en la base de datos.")
+
+    to_import = is_new & ~unknown_type
+    new_pois = pd.DataFrame({
+        'pois_type_id': pois_type_id[to_import].astype("int64"),
+        'pdv_id': pois.loc[to_import, "pdv_id"],
+        'quantity': pois.loc[to_import, "quantity"],
+    })
+    records_to_import.setdefault(POIAndPDV, []).extend(new_pois.to_dict("records"))
+    ids_set.update(poi_identifiers[to_import])
+
+
+def get_dataset_dtypes(file_path: str) -> dict:
+    """
+    Devuelve los tipos con los que se leen las columnas del dataset.
+    :param file_path: La ruta del archivo a importar.
+    :return: Un diccionario columna -> tipo para pd.read_csv.
+    """
+    return {
+        column: str
+        for column in get_dataset_columns(file_path)
+        if column not in numeric_columns and not column.startswith(numeric_columns_prefix)
+    }
 
 
-def process_pdv(
-    row,
-    ids_set: set,
-    this_client,
-    models_to_import: list,
-):
+def count_dataset_rows(file_path: str) -> int:
     """
-    Procesa un registro de PDV.
-    :param row: La fila del DataFrame.
-    :param ids_set: El set de ids de PDV.
-    :param this_client: El cliente al que pertenece el PDV.
-    :param models_to_import: La lista de modelos a importar.
-
-    :return: None o si no crea o registro creado
+    Cuenta las filas a procesar del dataset (sin el header ni la primera fila), sin parsearlo.
+    :param file_path: La ruta del archivo a importar.
+    :return: La cantidad de filas.
     """
-    if str(row['id_pdv_unique']) in ids_set:
-        # Si el pdv ya existe, no lo creo
-        return None
+    return max(count_data_rows(file_path) - 1, 0)
 
-    pdv_data = {
-        'client_id': this_client.id,
-        'client': this_client,
-    }
 
-    for key, value in pdv_keys_dict.items():
-        dataset_key = value['name']
-
-        if dataset_key in row:
-            if value.get('type') == 'bool':
-                pdv_data[key] = si_no_a_bool(row[dataset_key])
-            elif value.get('type') == 'int':
-                pdv_data[key] = int(row[dataset_key]) if not pd.isna(row[dataset_key]) else 0
-            else:
-                pdv_data[key] = str(row[dataset_key])
+def read_dataset(file_path: str, chunksize: int | None = None, usecols: list | None = None):
+    """
+    Lee el dataset a importar (CSV, CSV con gzip o Parquet), completo o en chunks.
+    De un Parquet sólo se leen las columnas que usa el import.
+    :param file_path: La ruta del archivo a importar.
+    :param chunksize: Cantidad de filas por chunk. None para leer todo el archivo de una vez.
+    :param usecols: Las columnas a leer, None para leer todas.
+    :return: Un iterador de DataFrames.
+    """
+    dtypes = get_dataset_dtypes(file_path)
+    dataset_format = detect_dataset_format(file_path)
+    if dataset_format == DATASET_PARQUET:
+        columns = usecols or get_import_columns(get_dataset_columns(file_path))
+        chunks = read_parquet_chunks(file_path, chunksize, columns, dtypes)
+    else:
+        read_kwargs = {
+            "encoding": "utf-8",
+            "dtype": dtypes,
+            "usecols": usecols,
+            "compression": get_compression(dataset_format),
+        }
+        if chunksize:
+            chunks = pd.read_csv(file_path, chunksize=chunksize, **read_kwargs)
         else:
-            pdv_data[key] = None
+            chunks = [pd.read_csv(file_path, **read_kwargs)]
 
-    # Limpieza algunos campos
-    pdv_data['fecha_alta'] = get_datetime_from_str(pdv_data['fecha_alta'])
+    for index, chunk in enumerate(chunks):
+        if index == 0:
+            # Skip the first row if it contains headers or unwanted data
+            chunk = chunk.iloc[1:]
+        yield chunk
 
-    # Creo el pdv
-    new_pdv = PDV(**pdv_data)
-    models_to_import.append(new_pdv)
-    ids_set.add(str(row['id_pdv_unique']))
 
-    return new_pdv
+def read_geo_pairs(file_path: str, chunksize: int | None = None) -> pd.DataFrame:
+    """
+    Lee sólo las columnas de provincia y departamento y devuelve los pares distintos.
+    :param file_path: La ruta del archivo a importar.
+    :param chunksize: Cantidad de filas por chunk.
+    :return: Un DataFrame con los pares (pv_pcia, pv_departamento), en el orden del archivo.
+    """
+    geo_pairs = pd.concat([
+        df_rows[GEO_COLUMNS].drop_duplicates()
+        for df_rows in read_dataset(file_path, chunksize, usecols=GEO_COLUMNS)
+    ])
+    return geo_pairs.drop_duplicates()
 
 
-def process_pois(
-    row,
-    ids_set: set,
-    models_to_import: list,
-    dict_of_pois_types: dict,
-    pdv_instances_dict: dict = {},
-):
+def get_backfill_departamentos(pdv_ids, departamento_ids, pdvs_without_departamento: set) -> dict[str, int]:
     """
-    Procesa un registro de POI.
-    :param row: La fila del DataFrame.
-    :param ids_set: El set de ids de POI.
-    :param models_to_import: La lista de modelos a importar.
-    :param set_of_pois_types: El set de tipos de POI.
-
-    :return: None
+    Devuelve el departamento de los PDVs existentes sin departamento que aparecen en un chunk, por
+    ejemplo los importados antes de que PDV tuviera departamento_id: el import sólo inserta los PDVs
+    nuevos, así que sin esto no se completarían nunca. Como al insertarlo, vale la primera fila del
+    PDV: los PDVs vistos se sacan de pdvs_without_departamento.
+    :param pdv_ids: Los ids de PDV del chunk, en el orden del archivo.
+    :param departamento_ids: El id de departamento de cada fila, None si no tiene.
+    :param pdvs_without_departamento: Los ids de los PDVs de la base sin departamento.
+    :return: El departamento de cada PDV a completar: pdv_id -> departamento_id.
     """
-    for poi_type in pois_types:
-        if poi_type in row and not pd.isna(row[poi_type]):
-            poi_quantity = row[poi_type]
-            pdv_id = str(row['id_pdv_unique'])
-            poi_identifier = f"{poi_type} - {pdv_id}"
-            if poi_quantity > 0 and poi_identifier not in ids_set:
-                poi_type_instance = dict_of_pois_types.get(poi_type)
-                if poi_type_instance is None:
-                    # Si el tipo de POI no existe, dejo un log y continúo
-                    logger.warning(f"Tipo de POI {poi_type} no encontrado en la base de datos.")
-                    continue
-                pdv_instance = pdv_instances_dict.get(pdv_id)
-                # Si el poi ya existe, no lo creo
-                new_poi = POIAndPDV(
-                    pois_type=poi_type_instance,
-                    pois_type_id=poi_type_instance.id,
-                    pdv=pdv_instance,
-                    pdv_id=pdv_id,
-                    quantity=poi_quantity,
-                )
-                models_to_import.append(new_poi)
-                ids_set.add(poi_identifier)
+    departamentos = {}
+    for pdv_id, departamento_id in zip(pdv_ids, departamento_ids):
+        if pdv_id in pdvs_without_departamento:
+            pdvs_without_departamento.discard(pdv_id)
+            if departamento_id is not None:
+                departamentos[pdv_id] = departamento_id
+    return departamentos
 
 
-def process_provincia_departamento(
-    row,
-    models_to_import: list,
-    provincias_dict: dict,
-    names_provincia: set,
-    names_departamento: set,
-):
+def get_chunk_backfill_departamentos(df_rows: pd.DataFrame, pdvs_without_departamento: set, geo_lookup: dict) -> dict:
     """
-    Procesa un registro de provincia y departamento.
-    :param row: La fila del DataFrame.
-    :param models_to_import: La lista de modelos a importar.
-    :param provincias_dict: El diccionario de provincias.
-    :param names_provincia: El set de nombres de provincias.
-    :param names_departamento: El set de nombres de departamentos.
-    :return: None
+    Devuelve el departamento de los PDVs sin departamento del chunk (ver get_backfill_departamentos).
+    :param df_rows: El chunk del dataset, antes del filtro incremental.
+    :param pdvs_without_departamento: Los ids de los PDVs de la base sin departamento.
+    :param geo_lookup: El lookup de provincias y departamentos (ver geo.resolve_geo).
+    :return: El departamento de cada PDV a completar: pdv_id -> departamento_id.
     """
-    provincia_name = row["pv_pcia"]
-    if provincia_name not in names_provincia:
-        new_provincia = process_just_name(
-            row,
-            name_key="pv_pcia",
-            names_set=names_provincia,
-            model_class=Provincia,
-        )
-        if new_provincia:
-            # En el caso de provincia lo grabo ahora ya que necesito vincularlo a departamento
-            session.add(new_provincia)
-            session.commit()
-            provincias_dict[provincia_name] = new_provincia
-            names_provincia.add(provincia_name)
-    else:
-        new_provincia = provincias_dict[provincia_name]
-
-    # Departamento --------------------------------------
-    departamento_name = row["pv_departamento"]
-    prov_departamento_name = f"{new_provincia.id} - {departamento_name}"
-    if prov_departamento_name not in names_departamento:
-        new_departamento = process_related_names(
-            row,
-            name_key="pv_departamento",
-            names_set=names_departamento,
-            model_class=Departamento,
-            instance_related=new_provincia,
-            related_key="provincia_id",
-            related_instance="provincia",
-        )
-        if new_departamento:
-            models_to_import.append(new_departamento)
-            names_departamento.add(prov_departamento_name)
+    if not pdvs_without_departamento:
+        return {}
+    ids = df_rows[PDV_KEY].astype(str)
+    rows = df_rows[ids.isin(pdvs_without_departamento) & ~ids.duplicated(keep="first")]
+    return get_backfill_departamentos(
+        rows[PDV_KEY].astype(str),
+        get_departamento_ids(rows, geo_lookup),
+        pdvs_without_departamento,
+    )
 
 
-def import_dataset() -> dict:
-    # Toma el archivo de import (api/datasets/mdt_negocio_import.csv), lo convierte a un dataframe
-    # y lo va procesando en los modelos de la base de datos.
+def import_dataset(
+    file_path: str = DATASET_PATH,
+    chunksize: int | None = None,
+    bulk: bool = False,
+    progress: ImportProgress | None = None,
+    incremental: bool = False,
+    workers: int | None = None,
+    key_index_path: str | None = KEY_INDEX_PATH,
+    checkpoint: bool = False,
+    trace_memory: bool = False,
+    session: Session | None = None,
+) -> dict:
+    """
+    Toma el archivo de import (api/datasets/mdt_negocio_import.csv), lo convierte a un dataframe
+    y lo va procesando en los modelos de la base de datos.
+    :param file_path: La ruta del archivo a importar: CSV, CSV comprimido con gzip o Parquet.
+    :param chunksize: Cantidad de filas por chunk. Con chunksize cada chunk se graba en la base
+        antes de leer el siguiente, así la memoria no depende del tamaño del archivo.
+    :param bulk: Si es True graba con INSERTs multi-fila (upsert) en lugar del unit-of-work del ORM.
+    :param progress: Donde se informa el avance. Si se cancela, el chunk en curso se descarta
+        y los chunks ya grabados quedan en la base.
+    :param incremental: Si es True se saltea un archivo ya importado y sólo se procesan las filas
+        de PDVs nuevos o con cambios desde el último import; los PDVs modificados se actualizan.
+    :param workers: Cantidad de procesos para transformar el archivo en paralelo (por shards de
+        bytes). Con más de un worker se ignora chunksize y todo se graba al final.
+    :param key_index_path: Archivo donde se guarda el índice de claves entre imports (ver
+        key_index.py). None para leerlo siempre de la base.
+    :param checkpoint: Si es True, con cada chunk se graba cuántas filas del archivo ya están en la
+        base y un import del mismo archivo que se cortó retoma desde ese chunk. No aplica con workers.
+    :param trace_memory: Si es True se mide el pico de memoria por etapa con tracemalloc (más lento).
+    :param session: La sesión de base de datos. Si es None el import abre una sesión propia, que
+        no se comparte con los requests de la API.
+    :return: El resultado de la importación con los registros agregados por modelo, los errores
+        de conversión por campo de PDV (cantidad de valores inválidos y algunos de ejemplo) y las
+        estadísticas por etapa (ver ImportStats).
+    """
     resp = {
         "status": 200,
         "message": "Importación de dataset exitosa",
-        "registros_added": {}
+        "registros_added": {},
+        "conversion_errors": {},
+        "stats": {},
     }
-
-    # Cargar el archivo CSV en un DataFrame de pandas
-    df = pd.read_csv("api/datasets/mdt_negocio_import.csv", encoding="utf-8")
-
-    # Init pois_types
-    dict_of_pois_types = init_pois_types()
-
-    # Crear una sesión de base de datos
-    models_to_import = []
-
-    # Sets de ids para evitar duplicados -------------------------------------------------
-    clients_dict = get_clients_dict()
-    initial_client = set(list(clients_dict.keys()))
-    ids_client = initial_client.copy()
-    initial_canal_distribucion = get_set_of_ids(CanalDistribucion)
-    ids_canal_distribucion = initial_canal_distribucion.copy()
-    initial_categoria = get_set_of_ids(Categoria)
-    ids_categoria = initial_categoria.copy()
-    provincias_dict = get_any_model_dict(Provincia, "name")
-    initial_provincia = set(list(provincias_dict.keys()))
-    names_provincia = initial_provincia.copy()
-    initial_departamento = get_set_of_names(Departamento)
-    names_departamento = initial_departamento.copy()
-    initial_gerente_nacional = get_set_of_ids(GerenteNacional)
-    ids_gerente_nacional = initial_gerente_nacional.copy()
-    initial_gerente_regional = get_set_of_ids(GerenteRegional)
-    ids_gerente_regional = initial_gerente_regional.copy()
-    initial_sucursal = get_set_of_ids(Sucursal)
-    ids_sucursal = initial_sucursal.copy()
-    initial_subcanal_adicional = get_set_of_ids(SubcanalAdicional)
-    ids_subcanal_adicional = initial_subcanal_adicional.copy()
-    initial_vendedor = get_set_of_ids(Vendedor)
-    ids_vendedor = initial_vendedor.copy()
-    initial_pdv = get_set_of_ids(PDV)
-    ids_pdv = initial_pdv.copy()
-    initial_poi = get_set_of_pois_and_pdv()
-    ids_poi = initial_poi.copy()
-
-    # -------------------------------------------------------------------------------------
-
-    # Procesar cada fila del DataFrame
-    for index, row in df.iterrows():
-        if index == 0:
-            # Skip the first row if it contains headers or unwanted data
-            continue
-        # Crear instancias de los modelos y asignar valores ------------------------------------
-        # Client -------------------------------------------------------------
-        # Por ahora tomo a cliente como id_cli_suc_cuenta y desc_cli_suc_cuenta
-        # A futuro definir como mejorar si un cliente tiene sucursales
-        # Id = -1 para clientes no identificados
-        this_cliente_id = str(row["id_cli_suc_cuenta"])
-        if this_cliente_id not in ids_client:
-            new_client = process_any_id_name_pair(
-                row,
-                id_key="id_cli_suc_cuenta",
-                name_key="desc_cli_suc_cuenta",
-                ids_set=ids_client,
-                model_class=Client
-            )
-            if new_client:
-                models_to_import.append(new_client)
-                ids_client.add(str(row["id_cli_suc_cuenta"]))
-            this_cliente = new_client
-            clients_dict[this_cliente_id] = new_client
-        else:
-            this_cliente = clients_dict[this_cliente_id]
-
-        # Fin Client -------------------------------------------------------------
-
-        # CanalDistribucion -----------------------------
-        process_base_model(
-            row=row,
-            id_key="id_cli_canal_dist",
-            name_key="desc_cli_canal_dist",
-            ids_set=ids_canal_distribucion,
-            model_class=CanalDistribucion,
-            models_to_import=models_to_import,
-            this_client=this_cliente,
-        )
-
-        # Categoría ------------------------------------------
-        process_base_model(
-            row=row,
-            id_key="id_cli_categoria_dist",
-            name_key="(Sin nombre)",
-            ids_set=ids_categoria,
-            model_class=Categoria,
-            models_to_import=models_to_import,
-            this_client=this_cliente,
-        )
-
-        # Provincias y Departamentos -------------------------------------
-        process_provincia_departamento(
-            row=row,
-            models_to_import=models_to_import,
-            provincias_dict=provincias_dict,
-            names_provincia=names_provincia,
-            names_departamento=names_departamento,
-        )
-
-        # Gerente Nacional --------------------------------
-        process_base_model(
-            row=row,
-            id_key="id_cli_gte_nacional",
-            name_key="desc_cli_gte_nacional",
-            ids_set=ids_gerente_nacional,
-            model_class=GerenteNacional,
-            this_client=this_cliente,
-            models_to_import=models_to_import,
-        )
-
-        # Gerente Regional --------------------------------
-        process_base_model(
-            row=row,
-            id_key="id_cli_gte_regional",
-            name_key="desc_cli_gte_regional",
-            ids_set=ids_gerente_regional,
-            model_class=GerenteRegional,
-            this_client=this_cliente,
-            models_to_import=models_to_import,
+    if incremental and workers and workers > 1:
+        raise ValueError("El import incremental no se puede combinar con workers")
+    if workers and workers > 1 and detect_dataset_format(file_path) != DATASET_CSV:
+        raise ValueError("El import con workers sólo acepta archivos CSV sin comprimir")
+
+    if session is None:
+        session = Session(engine)
+    stats = ImportStats(trace_memory)
+    stats.start(session.get_bind())
+    if progress is None:
+        progress = ImportProgress()
+    if progress.total_rows is None:
+        with stats.stage("count_rows"):
+            progress.total_rows = count_dataset_rows(file_path)
+
+    checkpoint = checkpoint and not (workers and workers > 1)
+    checksum = None
+    if incremental or checkpoint:
+        with stats.stage("checksum"):
+            checksum = get_file_checksum(file_path)
+    if incremental and is_file_imported(session, checksum):
+        session.close()
+        stats.stop()
+        resp["message"] = "El archivo ya fue importado, no hay cambios"
+        resp["stats"] = stats.as_dict()
+        return resp
+
+    start_row = 0
+    if checkpoint:
+        start_row = get_checkpoint_rows(session, checksum)
+        resp["resumed_from_row"] = start_row
+        if start_row:
+            logger.info(f"Retomando el import de {file_path} desde la fila {start_row}")
+
+    try:
+        resp['registros_added'] = _import_dataset(
+            session,
+            file_path,
+            chunksize,
+            bulk,
+            progress,
+            stats,
+            conversion_errors=resp['conversion_errors'],
+            incremental=incremental,
+            workers=workers,
+            key_index_path=key_index_path,
+            checkpoint_id=checksum if checkpoint else None,
+            start_row=start_row,
         )
+        if checkpoint:
+            delete_checkpoint(session, checksum)
+        if incremental:
+            register_imported_file(session, checksum, file_path, progress.total_rows)
+        # Rollups por geohash de los mapas de calor (ver rollups.py)
+        with stats.stage("rollups"):
+            rebuild_geohash_rollups(session)
+    except Exception:
+        # Descartar el chunk en curso, incluso si el import fue cancelado (ImportCancelled)
+        session.rollback()
+        raise
+    finally:
+        # Cerrar la sesión
+        session.close()
+        stats.stop()
+        # Aunque el import falle, los chunks y datos geográficos ya grabados cambian la base
+        invalidate_response_cache()
+        mark_pdv_index_stale()
+        mark_segment_index_stale()
+
+    resp["stats"] = stats.as_dict()
+    stats.log(file_path)
+    for field, errors in resp['conversion_errors'].items():
+        logger.warning(f"{field}: {errors['invalid']} valores no convertidos, ej: {errors['examples']}")
 
-        # Sucursal --------------------------------------
-        process_base_model(
-            row=row,
-            id_key="id_cli_suc_cuenta",
-            name_key="desc_cli_suc_cuenta",
-            ids_set=ids_sucursal,
-            model_class=Sucursal,
-            this_client=this_cliente,
-            models_to_import=models_to_import,
-        )
-
-        # Subcanal Adicional -----------------------------
-        process_base_model(
-            row=row,
-            id_key="id_cli_subcanal_adic_dist",
-            name_key="desc_cli_subcanal_dist",
-            ids_set=ids_subcanal_adicional,
-            model_class=SubcanalAdicional,
-            this_client=this_cliente,
-            models_to_import=models_to_import,
-        )
-
-        # Vendedor --------------------------------------
-        process_base_model(
-            row=row,
-            id_key="id_cli_vendedor",
-            name_key="desc_cli_vendedor",
-            ids_set=ids_vendedor,
-            model_class=Vendedor,
-            this_client=this_cliente,
-            models_to_import=models_to_import,
-        )
+    return resp
 
-        # PDV ------------------------------------------------
-        process_pdv(
-            row=row,
-            ids_set=ids_pdv,
-            this_client=this_cliente,
-            models_to_import=models_to_import,
-        )
 
-    # Agregar las instancias a la sesión
-    session.add_all(models_to_import)
-    session.commit()
-
-    # Procesar los POI en una segunda ronda con ya los PDV creados
-    models_to_import_pois = []
-    pdv_instances_dict = get_model_dict(PDV)
-    for index, row in df.iterrows():
-        if index == 0:
-            # Skip the first row if it contains headers or unwanted data
-            continue
-        # Crear instancias de los modelos y asignar valores ------------------------------------
-        # POI ------------------------------------------------
-        process_pois(
-            row=row,
-            ids_set=ids_poi,
-            models_to_import=models_to_import_pois,
-            dict_of_pois_types=dict_of_pois_types,
-            pdv_instances_dict=pdv_instances_dict,
+def _import_dataset(
+    session: Session,
+    file_path: str,
+    chunksize: int | None,
+    bulk: bool,
+    progress: ImportProgress,
+    stats: ImportStats,
+    conversion_errors: dict,
+    incremental: bool = False,
+    workers: int | None = None,
+    key_index_path: str | None = KEY_INDEX_PATH,
+    checkpoint_id: str | None = None,
+    start_row: int = 0,
+) -> dict:
+    """
+    Procesa el dataset en una sola pasada: por chunk se graban las dimensiones, los PDVs y sus POIs.
+    El import incremental hace antes una pasada que sólo calcula el hash de las filas de cada PDV.
+    Los valores de PDV que no se pudieron convertir se acumulan por campo en conversion_errors.
+    Con checkpoint_id cada chunk graba su checkpoint y se saltean las primeras start_row filas.
+    :return: Los registros agregados por modelo.
+    """
+    # Init pois_types
+    progress.set_stage("dimensions")
+    with stats.stage("key_index"):
+        pois_type_ids = init_pois_types(session)
+
+        # Sets de ids para evitar duplicados -------------------------------------------------
+        # Sólo columnas clave, reusando el índice guardado del import anterior si sigue vigente
+        ids_sets = load_key_index(
+            session,
+            [model_class for model_class, _, _ in ID_NAME_MODELS] + [PDV, POIAndPDV],
+            key_index_path,
         )
+    initial_counts = {model_class: len(ids_set) for model_class, ids_set in ids_sets.items()}
+    ids_poi = ids_sets[POIAndPDV]
+    ids_pdv_updated = set()
+    # POIs que existían de los PDVs modificados, se borran y se vuelven a cargar
+    ids_poi_replaced = set()
+
+    # Provincias y Departamentos -------------------------------------
+    # Se resuelven en una pasada previa sobre los pares distintos del archivo
+    with stats.stage("geo"):
+        geo_lookup, geo_added = resolve_geo(session, read_geo_pairs(file_path, chunksize))
+        # PDVs existentes sin departamento, se completan con las filas de cada chunk
+        pdvs_without_departamento = get_pdv_ids_without_departamento(session)
+        geo_added["pdv_departamento"] = 0
+
+    # Hash de las filas de cada PDV, se graba en todos los imports para el próximo incremental
+    with stats.stage("delta"):
+        stored_hashes = get_pdv_hashes(session)
+    pdv_hasher = PDVHasher()
 
-    # Agregar las instancias a la sesión
-    session.add_all(models_to_import_pois)
-    session.commit()
+    # -------------------------------------------------------------------------------------
 
-    resp['registros_added'] = {
-        "canal_distribucion": len(ids_canal_distribucion) - len(initial_canal_distribucion),
-        "categoria": len(ids_categoria) - len(initial_categoria),
-        "client": len(ids_client) - len(initial_client),
-        "provincia": len(names_provincia) - len(initial_provincia),
-        "departamento": len(names_departamento) - len(initial_departamento),
-        "gerente_nacional": len(ids_gerente_nacional) - len(initial_gerente_nacional),
-        "gerente_regional": len(ids_gerente_regional) - len(initial_gerente_regional),
-        "pdv": len(ids_pdv) - len(initial_pdv),
-        "poi": len(ids_poi) - len(initial_poi),
-        "subcanal_adicional": len(ids_subcanal_adicional) - len(initial_subcanal_adicional),
-        "sucursal": len(ids_sucursal) - len(initial_sucursal),
-        "vendedor": len(ids_vendedor) - len(initial_vendedor),
+    progress.start_pass()
+    if workers and workers > 1:
+        # Import paralelo: se transforman los shards en procesos y se graba todo junto
+        records_to_import = {}
+        backfill_departamentos = {}
+        dtypes = get_dataset_dtypes(file_path)
+        shards = transform_dataset_parallel(file_path, dtypes, workers, geo_lookup)
+        # El tiempo de "transform" es la espera de cada shard
+        for transformed in stats.iter_stage("transform", shards, count_rows=lambda shard: shard["rows"]):
+            progress.check_cancelled()
+            with stats.stage("delta", rows=transformed["rows"]):
+                pdv_hasher.add_chunk(transformed["pdv_hashes"])
+            progress.set_stage("pdv")
+            with stats.stage("dedup", rows=transformed["rows"]):
+                # Los registros del shard tienen todos sus PDVs, también los existentes
+                shard_pdvs = transformed["records"][PDV]
+                backfill_departamentos.update(get_backfill_departamentos(
+                    [record["id"] for record in shard_pdvs],
+                    [record["departamento_id"] for record in shard_pdvs],
+                    pdvs_without_departamento,
+                ))
+                add_transformed_chunk(transformed, ids_sets, records_to_import, conversion_errors)
+            progress.set_stage("pois")
+            with stats.stage("pois", rows=transformed["rows"]):
+                add_poi_candidates(transformed["pois"], ids_poi, pois_type_ids, records_to_import)
+            progress.add_rows(transformed["rows"])
+
+        progress.check_cancelled()
+        with stats.stage("save", rows=progress.rows_processed):
+            geo_added["pdv_departamento"] = update_pdv_departamentos(session, backfill_departamentos)
+            save_records(session, records_to_import, bulk, {PDVHash: pdv_hasher.get_hash_records(stored_hashes)})
+        with stats.stage("key_index"):
+            save_key_index(session, ids_sets, key_index_path)
+        return get_registros_added(ids_sets, initial_counts, geo_added, ids_pdv_updated, ids_poi_replaced)
+
+    # Import incremental: sólo filas de PDVs nuevos o modificados. Un PDV puede tener filas en
+    # cualquier chunk, así que los hashes se calculan en una pasada previa
+    delta_filter = None
+    if incremental:
+        with stats.stage("delta"):
+            for df_rows in read_dataset(file_path, chunksize):
+                progress.check_cancelled()
+                pdv_hasher.add_chunk(hash_pdv_rows(df_rows))
+        delta_filter = DeltaFilter(stored_hashes, pdv_hasher.get_hashes())
+
+    # Procesar el dataset por chunks, los sets de ids se mantienen entre chunks
+    rows_read = 0
+    for df_rows in stats.iter_stage("read", read_dataset(file_path, chunksize)):
+        progress.check_cancelled()
+        progress.set_stage("dimensions")
+        if not delta_filter:
+            # Incluye las filas grabadas antes del checkpoint: el hash cubre todas las filas
+            with stats.stage("delta", rows=len(df_rows)):
+                pdv_hasher.add_chunk(hash_pdv_rows(df_rows))
+        if rows_read < start_row:
+            # Filas grabadas antes del checkpoint
+            imported_rows, df_rows = split_imported_rows(df_rows, rows_read, start_row)
+            if delta_filter:
+                delta_filter.skip_rows(imported_rows)
+            # Su primera fila ya se leyó en el import interrumpido
+            pdvs_without_departamento.difference_update(imported_rows[PDV_KEY].astype(str))
+            rows_read += len(imported_rows)
+            progress.skip_rows(len(imported_rows))
+            if df_rows.empty:
+                continue
+
+        chunk_rows = len(df_rows)
+        rows_read += chunk_rows
+        records_to_import = {}
+        records_to_upsert = {}
+        if checkpoint_id:
+            # El checkpoint se graba en la misma transacción que el chunk
+            records_to_upsert[ImportCheckpoint] = [get_checkpoint_record(checkpoint_id, file_path, rows_read)]
+        with stats.stage("geo"):
+            # Antes del filtro incremental, que saca las filas de los PDVs sin cambios
+            backfill_departamentos = get_chunk_backfill_departamentos(df_rows, pdvs_without_departamento, geo_lookup)
+        if delta_filter:
+            with stats.stage("delta", rows=chunk_rows):
+                df_rows, delta_first_rows = delta_filter.filter_chunk(df_rows)
+
+                # PDVs modificados: se actualizan y sus POIs se vuelven a cargar
+                updated_errors = {}
+                updated_pdvs = get_existing_pdv_records(
+                    delta_first_rows,
+                    existing_ids=ids_sets[PDV],
+                    conversion_errors=updated_errors,
+                    geo_lookup=geo_lookup,
+                )
+                add_conversion_errors(conversion_errors, updated_errors)
+                records_to_upsert[PDV] = updated_pdvs
+                updated_ids = [record['id'] for record in updated_pdvs]
+                ids_pdv_updated.update(updated_ids)
+                if updated_ids:
+                    session.execute(delete(POIAndPDV).where(POIAndPDV.pdv_id.in_(updated_ids)))
+                    replaced = ids_poi.intersection(
+                        f"{poi_type} - {pdv_id}"
+                        for poi_type in pois_type_ids
+                        for pdv_id in updated_ids
+                    )
+                    ids_poi.difference_update(replaced)
+                    ids_poi_replaced.update(replaced)
+
+        # Clientes, modelos (id, name), provincias / departamentos y PDVs nuevos
+        with stats.stage("transform", rows=chunk_rows):
+            transformed = transform_chunk(df_rows, ids_sets, geo_lookup)
+        progress.set_stage("pdv")
+        with stats.stage("dedup", rows=chunk_rows):
+            add_transformed_chunk(transformed, ids_sets, records_to_import, conversion_errors)
+
+        # POIs del chunk, después de sus PDVs
+        progress.set_stage("pois")
+        with stats.stage("pois", rows=chunk_rows):
+            add_poi_candidates(transformed["pois"], ids_poi, pois_type_ids, records_to_import)
+
+        # Grabar los registros del chunk
+        progress.check_cancelled()
+        with stats.stage("save", rows=chunk_rows):
+            geo_added["pdv_departamento"] += update_pdv_departamentos(session, backfill_departamentos)
+            save_records(session, records_to_import, bulk, records_to_upsert)
+        progress.add_rows(chunk_rows)
+
+    # Los hashes al final: si el import se interrumpe, los PDVs modificados siguen en el delta
+    with stats.stage("save"):
+        save_records(session, {}, bulk, {PDVHash: pdv_hasher.get_hash_records(stored_hashes)})
+    with stats.stage("key_index"):
+        save_key_index(session, ids_sets, key_index_path)
+    return get_registros_added(ids_sets, initial_counts, geo_added, ids_pdv_updated, ids_poi_replaced)
+
+
+def get_registros_added(
+    ids_sets: dict,
+    initial_counts: dict,
+    geo_added: dict,
+    ids_pdv_updated: set,
+    ids_poi_replaced: set,
+) -> dict:
+    """
+    Devuelve la cantidad de registros agregados por modelo.
+    Los POIs de los PDVs modificados que se volvieron a cargar se cuentan en poi_updated y los que
+    ya no están en el archivo en poi_deleted; poi sólo cuenta los pares (tipo, PDV) nuevos.
+    pdv_departamento son los PDVs existentes a los que se les completó el departamento.
+    """
+    def added(model_class):
+        return len(ids_sets[model_class]) - initial_counts[model_class]
+
+    poi_deleted = len(ids_poi_replaced - ids_sets[POIAndPDV])
+
+    return {
+        "canal_distribucion": added(CanalDistribucion),
+        "categoria": added(Categoria),
+        "client": added(Client),
+        "provincia": geo_added["provincia"],
+        "departamento": geo_added["departamento"],
+        "gerente_nacional": added(GerenteNacional),
+        "gerente_regional": added(GerenteRegional),
+        "pdv": added(PDV),
+        "pdv_updated": len(ids_pdv_updated),
+        "pdv_departamento": geo_added["pdv_departamento"],
+        "poi": added(POIAndPDV) + poi_deleted,
+        "poi_updated": len(ids_poi_replaced) - poi_deleted,
+        "poi_deleted": poi_deleted,
+        "subcanal_adicional": added(SubcanalAdicional),
+        "sucursal": added(Sucursal),
+        "vendedor": added(Vendedor),
     }
-
-    # Cerrar la sesión
-    session.close()
-
-    return resp
@@ -0,0 +1,70 @@
+"""
+Datasets subidos por la API. El archivo se copia a disco por bloques (nunca entero en memoria)
+con la extensión de su formato real, y se borra cuando termina el import.
+"""
+import logging
+import os
+import shutil
+from uuid import uuid4
+
+from api.import_dataset.columnar import PDV_KEY
+from api.import_dataset.formats import (
+    DATASET_PARQUET,
+    DATASET_SUFFIXES,
+    UnsupportedDatasetFormat,
+    detect_dataset_format,
+    get_dataset_columns,
+    get_parquet_module,
+)
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_PATH = "api/datasets/uploads"
+
+# Tamaño de los bloques de copia del archivo subido
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+def save_uploaded_dataset(upload_file) -> str:
+    """
+    Guarda en UPLOADS_PATH un dataset subido y valida que tenga la columna de id de PDV.
+    :param upload_file: El archivo subido (file-like, se lee por bloques).
+    :return: La ruta del archivo guardado.
+    :raises UnsupportedDatasetFormat: Si es un Parquet y pyarrow no está instalado.
+    :raises ValueError: Si el archivo no se puede leer como dataset.
+    """
+    os.makedirs(UPLOADS_PATH, exist_ok=True)
+    upload_id = uuid4().hex
+    spool_path = os.path.join(UPLOADS_PATH, f"{upload_id}.upload")
+    with open(spool_path, "wb") as spool_file:
+        shutil.copyfileobj(upload_file, spool_file, UPLOAD_BLOCK_SIZE)
+
+    dataset_format = detect_dataset_format(spool_path)
+    file_path = os.path.join(UPLOADS_PATH, f"{upload_id}{DATASET_SUFFIXES[dataset_format]}")
+    os.replace(spool_path, file_path)
+
+    try:
+        if dataset_format == DATASET_PARQUET:
+            get_parquet_module()
+    except UnsupportedDatasetFormat:
+        delete_uploaded_dataset(file_path)
+        raise
+    try:
+        columns = get_dataset_columns(file_path)
+    except Exception as e:
+        delete_uploaded_dataset(file_path)
+        raise ValueError(f"No se pudo leer el archivo como {dataset_format}: {e}")
+    if PDV_KEY not in columns:
+        delete_uploaded_dataset(file_path)
+        raise ValueError(f"El archivo no tiene la columna {PDV_KEY}")
+
+    logger.info(f"Dataset subido en {file_path} ({dataset_format}, {os.path.getsize(file_path)} bytes)")
+    return file_path
+
+
+def delete_uploaded_dataset(file_path: str):
+    """ Borra un dataset subido, si todavía existe. """
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,150 @@
+"""
+Load test for the API: sends the same requests at increasing concurrency levels and reports
+throughput and latency for each level, to check that throughput scales with concurrency:
+
+    python -m api.marketminds.loadtest http://localhost:8002/api/marketminds/pdv --concurrency 1 4 16 64
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16, 32]
+DEFAULT_REQUESTS_PER_LEVEL = 500
+# A level with a higher share of failed requests (errors, timeouts) fails the load test
+DEFAULT_MAX_ERROR_RATE = 0.01
+
+_thread_local = threading.local()
+
+
+def get_http_session() -> requests.Session:
+    """ Get the HTTP session of the current thread, so every thread reuses its own connection.
+    """
+    if not hasattr(_thread_local, "http_session"):
+        _thread_local.http_session = requests.Session()
+    return _thread_local.http_session
+
+
+def timed_get(url: str, timeout: float) -> tuple[float, bool]:
+    """ Send a GET request and return its latency in seconds and whether it succeeded.
+    """
+    started_at = time.perf_counter()
+    try:
+        response = get_http_session().get(url, timeout=timeout)
+        ok = response.status_code < 400
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - started_at, ok
+
+
+def get_percentile(values: list[float], percentile: float) -> float:
+    """ Get a percentile of a sorted list of values.
+    """
+    if not values:
+        return 0.0
+    index = min(int(len(values) * percentile), len(values) - 1)
+    return values[index]
+
+
+def run_level(
+    url: str,
+    concurrency: int,
+    requests_count: int,
+    timeout: float,
+    max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+) -> dict:
+    """ Send requests_count requests with concurrency threads.
+    requests_per_second counts every request, ok_requests_per_second only the successful ones,
+    so timeouts do not look like scaling. The latency percentiles are of the successful requests.
+    :return: The throughput, latency percentiles and errors of the level, failed when the error
+        rate is above max_error_rate.
+    """
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: timed_get(url, timeout), range(requests_count)))
+    seconds = time.perf_counter() - started_at
+
+    latencies = sorted(latency for latency, ok in results if ok)
+    errors = len(results) - len(latencies)
+    error_rate = errors / len(results) if results else 0.0
+    return {
+        "concurrency": concurrency,
+        "requests": requests_count,
+        "errors": errors,
+        "error_rate": round(error_rate, 4),
+        "failed": error_rate > max_error_rate,
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(results) / seconds, 2) if seconds else None,
+        "ok_requests_per_second": round(len(latencies) / seconds, 2) if seconds else None,
+        "p50_ms": round(get_percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(get_percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(get_percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+def run_load_test(
+    url: str,
+    concurrency_levels: list[int],
+    requests_count: int,
+    timeout: float = 30,
+    max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+) -> list[dict]:
+    """ Run one level per concurrency, after a warm up request.
+    """
+    timed_get(url, timeout)
+    return [
+        run_level(url, concurrency, requests_count, timeout, max_error_rate)
+        for concurrency in concurrency_levels
+    ]
+
+
+def format_results(results: list[dict]) -> str:
+    """ Format the results as a table, with the successful throughput relative to the first level.
+    """
+    base_throughput = results[0]["ok_requests_per_second"] if results else None
+    lines = [
+        f"{'concurrency':>12}{'req/s':>10}{'ok req/s':>10}{'scaling':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'error %':>9}"
+    ]
+    for level in results:
+        throughput = level["requests_per_second"] or 0
+        ok_throughput = level["ok_requests_per_second"] or 0
+        scaling = f"{ok_throughput / base_throughput:.2f}x" if base_throughput else "-"
+        lines.append(
+            f"{level['concurrency']:>12}{throughput:>10}{ok_throughput:>10}{scaling:>10}"
+            f"{level['p50_ms']:>10}{level['p95_ms']:>10}{level['p99_ms']:>10}{level['errors']:>8}"
+            f"{level['error_rate'] * 100:>8.1f}%{'  FAILED' if level['failed'] else ''}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m api.marketminds.loadtest",
+        description="Measure API throughput at increasing concurrency.",
+    )
+    parser.add_argument("url", help="URL to request, e.g. http://localhost:8002/api/marketminds/pdv")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS_PER_LEVEL, help="Requests per level")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=DEFAULT_MAX_ERROR_RATE,
+        help="Share of failed requests (0-1) above which a level fails",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run_load_test(args.url, args.concurrency, args.requests, args.timeout, args.max_error_rate)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    return 1 if any(level["failed"] for level in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
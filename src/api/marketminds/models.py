@@ -181,14 +181,14 @@ class PDV(BaseModel, table=True):
     lat: float = Field(..., description="PDV latitud")
     lon: float = Field(..., description="PDV longitud")
     geohash: str = Field(..., description="Geohash del PDV")
-    bandejas: Optional[str] = Field(default=None, description="Número de bandejas")
-    m2: Optional[str] = Field(default=None, description="Número de m2")
-    pasillos: Optional[str] = Field(default=None, description="Número de pasillos")
-    puertas_heladeras: Optional[str] = Field(
+    bandejas: Optional[float] = Field(default=None, description="Número de bandejas")
+    m2: Optional[float] = Field(default=None, description="Número de m2")
+    pasillos: Optional[float] = Field(default=None, description="Número de pasillos")
+    puertas_heladeras: Optional[float] = Field(
         default=None,
         description="Número de puertas de heladeras"
     )
-    puntos_cobro: Optional[str] = Field(
+    puntos_cobro: Optional[float] = Field(
         default=None,
         description="Número de puntos de cobro (cajas)"
     )
@@ -268,6 +268,12 @@ class PDV(BaseModel, table=True):
         default=False,
         description="Trabaja los eventos tematicos (navidad, pascuas, halloween, seleccion argentina)"
     )
+    departamento_id: Optional[int] = Field(
+        default=None,
+        foreign_key="departamento.id",
+        index=True,
+        description="Departamento del PDV (pv_pcia / pv_departamento)",
+    )
     client_id: Optional[str] = Field(foreign_key="client.id")
     client: Optional["Client"] = Relationship(back_populates="pdvs")
     pois_link: list["POIAndPDV"] = Relationship(back_populates="pdv")
@@ -372,3 +378,44 @@ class POIAndPDV(BaseModelAutoId, table=True):
     pdv_id: Optional[str] = Field(foreign_key="pdv.id")
     pdv: Optional["PDV"] = Relationship(back_populates="pois_link")
     quantity: int = Field(..., description="Cantidad de POI")
+
+
+# Models for incremental / resumable import -----------------
+class ImportedFile(BaseModel, table=True):
+    """ Model for archivos importados, id es el checksum (sha256) del archivo
+    """
+    name: str = Field(..., description="Nombre del archivo")
+    rows: int = Field(..., description="Cantidad de filas del archivo")
+
+
+class ImportCheckpoint(BaseModel, table=True):
+    """ Model for el avance grabado de un import con checkpoints, id es el checksum del archivo
+    """
+    name: str = Field(..., description="Nombre del archivo")
+    rows: int = Field(..., description="Cantidad de filas del archivo ya grabadas")
+
+
+class PDVHash(BaseModel, table=True):
+    """ Model for hash del contenido de las filas de cada PDV en el último import, id es el id del PDV
+    """
+    row_hash: str = Field(..., description="Hash del contenido de las filas")
+
+
+# Geohash rollups for heatmaps, rebuilt by every import -----------------
+class GeohashRollup(SQLModel, table=True):
+    """ Model for la cantidad de PDVs por prefijo de geohash, para cada precisión
+    """
+    precision: int = Field(primary_key=True, description="Largo del prefijo de geohash")
+    geohash: str = Field(primary_key=True, description="Prefijo de geohash")
+    pdv_count: int = Field(..., description="Cantidad de PDVs")
+    lat: float = Field(..., index=True, description="Latitud promedio de los PDVs")
+    lon: float = Field(..., description="Longitud promedio de los PDVs")
+
+
+class GeohashPOIRollup(SQLModel, table=True):
+    """ Model for la cantidad de POIs por prefijo de geohash y tipo de POI, para cada precisión
+    """
+    precision: int = Field(primary_key=True, description="Largo del prefijo de geohash")
+    geohash: str = Field(primary_key=True, description="Prefijo de geohash")
+    pois_type_id: int = Field(primary_key=True, foreign_key="poistype.id")
+    quantity: int = Field(..., description="Cantidad de POI")
@@ -0,0 +1,52 @@
+import threading
+
+from sqlalchemy import select
+
+from api.marketminds.models import POISType
+
+
+# POI type names by id, loaded once per process. The table only changes in init_pois_types
+_poi_type_names: dict[int, str] | None = None
+_poi_type_names_lock = threading.Lock()
+
+
+def reset_poi_type_names():
+    """ Drop the POI type names, they are loaded again on the next use.
+    """
+    global _poi_type_names
+    with _poi_type_names_lock:
+        _poi_type_names = None
+
+
+def _set_poi_type_names(rows) -> dict[int, str]:
+    global _poi_type_names
+    poi_type_names = dict(rows)
+    with _poi_type_names_lock:
+        _poi_type_names = poi_type_names
+    return poi_type_names
+
+
+def get_poi_type_names(session, poi_type_ids=()) -> dict[int, str]:
+    """ Get the POI type names by id.
+    :param session: The database session, used only when the names are not loaded.
+    :param poi_type_ids: The ids about to be looked up. If one is missing the names are loaded
+        again, in case the types were added by another process.
+    """
+    poi_type_names = _poi_type_names
+    if poi_type_names is None or any(
+        poi_type_id not in poi_type_names for poi_type_id in poi_type_ids if poi_type_id is not None
+    ):
+        poi_type_names = _set_poi_type_names(session.execute(select(POISType.id, POISType.name)).all())
+    return poi_type_names
+
+
+async def get_poi_type_names_async(session, poi_type_ids=()) -> dict[int, str]:
+    """ Same as get_poi_type_names with an AsyncSession.
+    """
+    poi_type_names = _poi_type_names
+    if poi_type_names is None or any(
+        poi_type_id not in poi_type_names for poi_type_id in poi_type_ids if poi_type_id is not None
+    ):
+        rows = (await session.execute(select(POISType.id, POISType.name))).all()
+        poi_type_names = _set_poi_type_names(rows)
+    return poi_type_names
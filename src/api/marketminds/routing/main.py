@@ -1,5 +1,14 @@
-from fastapi import APIRouter
-from api.import_dataset.tools import import_dataset
+from fastapi import APIRouter, Request, Response, UploadFile
+from fastapi.responses import JSONResponse
+
+from api.import_dataset.jobs import (
+    cancel_import_job,
+    get_import_job,
+    list_import_jobs,
+    start_import_job,
+)
+from api.import_dataset.formats import UnsupportedDatasetFormat
+from api.import_dataset.upload import save_uploaded_dataset
 
 
 router = APIRouter()
@@ -12,15 +21,118 @@ def health_check():
     return {"status": "ok"}
 
 
-@router.get("/import-dataset/")
-def import_data():
+@router.post("/import-jobs/", status_code=202)
+def create_import_job(
+    chunksize: int | None = None,
+    bulk: bool = False,
+    incremental: bool = False,
+    workers: int | None = None,
+    trace_memory: bool = False,
+):
+    """ Start an import of the dataset in the background.
+    If chunksize is given, the file is read and saved in chunks of that many rows.
+    If bulk is True, rows are written with multi-row INSERT / upsert statements instead of the ORM.
+    If incremental is True, an already imported file is skipped and only new or changed PDVs are saved.
+    If workers is greater than 1, the file is transformed in that many processes.
+    Returns the job, use its id to follow the progress or cancel it. Its result has per-stage stats
+    (time, rows/sec, queries); trace_memory adds the peak memory.
+    """
+    import_kwargs = {
+        "bulk": bulk,
+        "incremental": incremental,
+        "workers": workers,
+        "trace_memory": trace_memory,
+    }
+    if chunksize:
+        import_kwargs["chunksize"] = chunksize
+    job = start_import_job(**import_kwargs)
+    return job.as_dict()
+
+
+@router.get("/import-dataset/", status_code=202, deprecated=True)
+def import_data(
+    request: Request,
+    response: Response,
+    chunksize: int | None = None,
+    bulk: bool = False,
+    incremental: bool = False,
+    workers: int | None = None,
+    trace_memory: bool = False,
+):
     """ Import data from CSV file.
+    Deprecated alias of POST /import-jobs/, with the same parameters: the import runs in the
+    background, the response is the job and its Location header is GET /import-jobs/{job_id},
+    which has the result when the job finishes.
+    """
+    job = create_import_job(
+        chunksize=chunksize,
+        bulk=bulk,
+        incremental=incremental,
+        workers=workers,
+        trace_memory=trace_memory,
+    )
+    response.headers["Location"] = str(request.url_for("get_import_job_status", job_id=job["id"]))
+    return job
+
+
+@router.post("/import-dataset/upload/", status_code=202)
+def upload_dataset(
+    file: UploadFile,
+    chunksize: int | None = None,
+    bulk: bool = False,
+    incremental: bool = False,
+    workers: int | None = None,
+    trace_memory: bool = False,
+):
+    """ Upload a dataset and import it in the background.
+    Accepts plain CSV, gzip-compressed CSV or Parquet (detected from the content). The upload is
+    copied to disk in blocks, never held in memory, and deleted when the import job finishes.
+    Returns the import job, like POST /import-jobs/.
     """
-    import_result = import_dataset()
-    if import_result["status"] != 200:
-        return {
-            "status": import_result["status"],
-            "message": import_result["message"]
-        }
-
-    return import_result
+    try:
+        file_path = save_uploaded_dataset(file.file)
+    except UnsupportedDatasetFormat as e:
+        return JSONResponse(content={"error": str(e)}, status_code=415)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    import_kwargs = {
+        "file_path": file_path,
+        "bulk": bulk,
+        "incremental": incremental,
+        "workers": workers,
+        "trace_memory": trace_memory,
+    }
+    if chunksize:
+        import_kwargs["chunksize"] = chunksize
+    job = start_import_job(delete_file=True, **import_kwargs)
+    return job.as_dict()
+
+
+@router.get("/import-jobs/")
+def get_import_jobs():
+    """ Get all import jobs of this worker.
+    """
+    return [job.as_dict() for job in list_import_jobs()]
+
+
+@router.get("/import-jobs/{job_id}")
+def get_import_job_status(job_id: str):
+    """ Get the status of an import job: stage, rows processed, throughput and ETA.
+    """
+    job = get_import_job(job_id)
+    if not job:
+        return JSONResponse(content={"error": "Import job not found"}, status_code=404)
+
+    return job.as_dict()
+
+
+@router.post("/import-jobs/{job_id}/cancel")
+def cancel_import(job_id: str):
+    """ Cancel a running import job. Chunks already saved are kept.
+    """
+    job = cancel_import_job(job_id)
+    if not job:
+        return JSONResponse(content={"error": "Import job not found"}, status_code=404)
+
+    return job.as_dict()
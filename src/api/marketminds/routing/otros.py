@@ -1,8 +1,15 @@
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
-
-from api.db.session import get_session
-from api.helpers.tools import dict_all_serialized
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import select
+from sqlmodel import Session
+
+from api.db.session import engine, get_session
+from api.helpers.cache import cached_json_response
+from api.helpers.pagination import filter_list_query, get_list_params, get_page
+from api.helpers.streaming import JSON_ARRAY, NDJSON, get_streaming_response
+from api.helpers.serialization import get_model_columns, get_model_encoder
 from api.marketminds.models import (
     CanalDistribucion,
     Categoria,
@@ -16,82 +23,178 @@ from api.marketminds.models import (
 
 
 otros_router = APIRouter()
-session = next(get_session())
 
 
-def base_get_all(model_class):
+def get_model_list_stmt(
+    model_class,
+    client_id: str | None = None,
+    updated_since=None,
+    updated_before=None,
+):
+    """
+    Select the columns of a model with the list filters.
+    """
+    client_column = model_class.id if model_class is Client else model_class.client_id
+    return filter_list_query(
+        select(*get_model_columns(model_class)),
+        model_class,
+        client_column=client_column,
+        client_id=client_id,
+        updated_since=updated_since,
+        updated_before=updated_before,
+    )
+
+
+def base_get_all(
+    model_class,
+    request: Request,
+    session: Session,
+    cursor: str | None = None,
+    limit: int | None = None,
+    client_id: str | None = None,
+    updated_since=None,
+    updated_before=None,
+):
+    """
+    Base function to get the records of a model, or a page of them (see get_page), ordered by id.
+    The pages are cached until the next import (see cached_json_response).
+    """
+    stmt = get_model_list_stmt(model_class, client_id, updated_since, updated_before)
+
+    return cached_json_response(request, lambda: get_page(
+        session,
+        stmt,
+        model_class.id,
+        cursor=cursor,
+        limit=limit,
+        serialize=get_model_encoder(model_class),
+    ))
+
+
+def base_stream_all(
+    model_class,
+    stream_format: str = NDJSON,
+    client_id: str | None = None,
+    updated_since=None,
+    updated_before=None,
+):
     """
-    Base function to get all records from a model.
+    Base function to stream all records from a model, ordered by id, with a server-side cursor.
     """
-    all_records = session.query(model_class).all()
-    records = []
-    for record in all_records:
-        record_dict = record.dict()
-        record_ser_dict = dict_all_serialized(record_dict)
-        records.append(record_ser_dict)
+    stmt = get_model_list_stmt(model_class, client_id, updated_since, updated_before)
+
+    return get_streaming_response(
+        engine,
+        stmt.order_by(model_class.id),
+        get_model_encoder(model_class),
+        stream_format,
+    )
 
-    return JSONResponse(content=records, status_code=200)
+
+@otros_router.get("/canales-distribucion", response_model=list[dict] | dict)
+def get_canales_distribucion(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: Session = Depends(get_session),
+):
+    """
+    Get the Canales de Distribución, or a page of them with cursor / limit.
+    """
+    return base_get_all(CanalDistribucion, request, session, **params)
 
 
-@otros_router.get("/canales-distribucion", response_model=list[dict])
-def get_canales_distribucion():
+@otros_router.get("/categorias", response_model=list[dict] | dict)
+def get_categorias(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: Session = Depends(get_session),
+):
     """
-    Get all Canales de Distribución.
+    Get the Categorías, or a page of them with cursor / limit.
     """
-    return base_get_all(CanalDistribucion)
+    return base_get_all(Categoria, request, session, **params)
 
 
-@otros_router.get("/categorias", response_model=list[dict])
-def get_categorias():
+@otros_router.get("/clientes", response_model=list[dict] | dict)
+def get_clientes(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: Session = Depends(get_session),
+):
     """
-    Get all Categorías.
+    Get the Clientes, or a page of them with cursor / limit.
     """
-    return base_get_all(Categoria)
+    return base_get_all(Client, request, session, **params)
 
 
-@otros_router.get("/clientes", response_model=list[dict])
-def get_clientes():
+@otros_router.get("/clientes/stream")
+def stream_clientes(
+    stream_format: Literal[NDJSON, JSON_ARRAY] = Query(NDJSON, alias="format"),
+    client_id: str | None = None,
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+):
     """
-    Get all Clientes.
+    Stream all Clientes, as NDJSON (one per line) or as a JSON array.
     """
-    return base_get_all(Client)
+    return base_stream_all(Client, stream_format, client_id, updated_since, updated_before)
 
 
-@otros_router.get("/gerentes-nacionales", response_model=list[dict])
-def get_gerentes_nacionales():
+@otros_router.get("/gerentes-nacionales", response_model=list[dict] | dict)
+def get_gerentes_nacionales(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: Session = Depends(get_session),
+):
     """
-    Get all Gerentes Nacionales.
+    Get the Gerentes Nacionales, or a page of them with cursor / limit.
     """
-    return base_get_all(GerenteNacional)
+    return base_get_all(GerenteNacional, request, session, **params)
 
 
-@otros_router.get("/gerentes-regionales", response_model=list[dict])
-def get_gerentes_regionales():
+@otros_router.get("/gerentes-regionales", response_model=list[dict] | dict)
+def get_gerentes_regionales(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: Session = Depends(get_session),
+):
     """
-    Get all Gerentes Regionales.
+    Get the Gerentes Regionales, or a page of them with cursor / limit.
     """
-    return base_get_all(GerenteRegional)
+    return base_get_all(GerenteRegional, request, session, **params)
 
 
-@otros_router.get("/subcanales-adicionales", response_model=list[dict])
-def get_subcanales_adicionales():
+@otros_router.get("/subcanales-adicionales", response_model=list[dict] | dict)
+def get_subcanales_adicionales(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: Session = Depends(get_session),
+):
     """
-    Get all Subcanales Adicionales.
+    Get the Subcanales Adicionales, or a page of them with cursor / limit.
     """
-    return base_get_all(SubcanalAdicional)
+    return base_get_all(SubcanalAdicional, request, session, **params)
 
 
-@otros_router.get("/sucursales", response_model=list[dict])
-def get_sucursales():
+@otros_router.get("/sucursales", response_model=list[dict] | dict)
+def get_sucursales(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: Session = Depends(get_session),
+):
     """
-    Get all Sucursales.
+    Get the Sucursales, or a page of them with cursor / limit.
     """
-    return base_get_all(Sucursal)
+    return base_get_all(Sucursal, request, session, **params)
 
 
-@otros_router.get("/vendedores", response_model=list[dict])
-def get_vendedores():
+@otros_router.get("/vendedores", response_model=list[dict] | dict)
+def get_vendedores(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: Session = Depends(get_session),
+):
     """
-    Get all Vendedores.
+    Get the Vendedores, or a page of them with cursor / limit.
     """
-    return base_get_all(Vendedor)
+    return base_get_all(Vendedor, request, session, **params)
@@ -0,0 +1,179 @@
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.async_session import async_engine, get_async_session
+from api.helpers.cache import cached_json_response_async
+from api.helpers.pagination import get_list_params, get_page_async
+from api.helpers.streaming import JSON_ARRAY, NDJSON, get_async_streaming_response
+from api.helpers.serialization import get_model_encoder
+from api.marketminds.models import (
+    CanalDistribucion,
+    Categoria,
+    Client,
+    GerenteNacional,
+    GerenteRegional,
+    SubcanalAdicional,
+    Sucursal,
+    Vendedor,
+)
+from api.marketminds.routing.otros import get_model_list_stmt
+
+
+otros_async_router = APIRouter()
+
+
+async def base_get_all_async(
+    model_class,
+    request: Request,
+    session: AsyncSession,
+    cursor: str | None = None,
+    limit: int | None = None,
+    client_id: str | None = None,
+    updated_since=None,
+    updated_before=None,
+):
+    """
+    Async version of base_get_all: get the cached records or page of records of a model, ordered by id.
+    """
+    stmt = get_model_list_stmt(model_class, client_id, updated_since, updated_before)
+
+    return await cached_json_response_async(request, lambda: get_page_async(
+        session,
+        stmt,
+        model_class.id,
+        cursor=cursor,
+        limit=limit,
+        serialize=get_model_encoder(model_class),
+    ))
+
+
+def base_stream_all_async(
+    model_class,
+    stream_format: str = NDJSON,
+    client_id: str | None = None,
+    updated_since=None,
+    updated_before=None,
+):
+    """
+    Async version of base_stream_all: stream all records from a model, ordered by id.
+    """
+    stmt = get_model_list_stmt(model_class, client_id, updated_since, updated_before)
+
+    return get_async_streaming_response(
+        async_engine,
+        stmt.order_by(model_class.id),
+        get_model_encoder(model_class),
+        stream_format,
+    )
+
+
+@otros_async_router.get("/canales-distribucion", response_model=list[dict] | dict)
+async def get_canales_distribucion(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the Canales de Distribución, or a page of them with cursor / limit.
+    """
+    return await base_get_all_async(CanalDistribucion, request, session, **params)
+
+
+@otros_async_router.get("/categorias", response_model=list[dict] | dict)
+async def get_categorias(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the Categorías, or a page of them with cursor / limit.
+    """
+    return await base_get_all_async(Categoria, request, session, **params)
+
+
+@otros_async_router.get("/clientes", response_model=list[dict] | dict)
+async def get_clientes(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the Clientes, or a page of them with cursor / limit.
+    """
+    return await base_get_all_async(Client, request, session, **params)
+
+
+@otros_async_router.get("/clientes/stream")
+async def stream_clientes(
+    stream_format: Literal[NDJSON, JSON_ARRAY] = Query(NDJSON, alias="format"),
+    client_id: str | None = None,
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+):
+    """
+    Stream all Clientes, as NDJSON (one per line) or as a JSON array.
+    """
+    return base_stream_all_async(Client, stream_format, client_id, updated_since, updated_before)
+
+
+@otros_async_router.get("/gerentes-nacionales", response_model=list[dict] | dict)
+async def get_gerentes_nacionales(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the Gerentes Nacionales, or a page of them with cursor / limit.
+    """
+    return await base_get_all_async(GerenteNacional, request, session, **params)
+
+
+@otros_async_router.get("/gerentes-regionales", response_model=list[dict] | dict)
+async def get_gerentes_regionales(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the Gerentes Regionales, or a page of them with cursor / limit.
+    """
+    return await base_get_all_async(GerenteRegional, request, session, **params)
+
+
+@otros_async_router.get("/subcanales-adicionales", response_model=list[dict] | dict)
+async def get_subcanales_adicionales(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the Subcanales Adicionales, or a page of them with cursor / limit.
+    """
+    return await base_get_all_async(SubcanalAdicional, request, session, **params)
+
+
+@otros_async_router.get("/sucursales", response_model=list[dict] | dict)
+async def get_sucursales(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the Sucursales, or a page of them with cursor / limit.
+    """
+    return await base_get_all_async(Sucursal, request, session, **params)
+
+
+@otros_async_router.get("/vendedores", response_model=list[dict] | dict)
+async def get_vendedores(
+    request: Request,
+    params: dict = Depends(get_list_params),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the Vendedores, or a page of them with cursor / limit.
+    """
+    return await base_get_all_async(Vendedor, request, session, **params)
@@ -1,20 +1,52 @@
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
-from sqlalchemy import select
+from datetime import datetime
+from typing import Literal
 
-from api.db.session import get_session
-from api.helpers.tools import dict_all_serialized
-from api.marketminds.models import PDV, POISType, POIAndPDV
+from fastapi import APIRouter, Body, Depends, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, select
+from sqlmodel import Session
+
+from api.db.session import engine, get_session
+from api.helpers.cache import cached_json_response
+from api.helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, filter_list_query, get_list_params, get_page
+from api.helpers.streaming import JSON_ARRAY, NDJSON, get_streaming_response
+from api.helpers.serialization import get_model_columns, get_model_encoder
+from api.import_dataset.rollups import MAX_GEOHASH_PRECISION
+from api.marketminds.models import PDV, GeohashPOIRollup, GeohashRollup, POISType, POIAndPDV
+from api.marketminds.poi_types import get_poi_type_names
+from api.marketminds.segments import PDVSegmentIndex, PDVSegmentSchema, get_segment_index
+from api.marketminds.spatial import PDVIndex, get_pdv_index
 
 
 pdv_router = APIRouter()
-session = next(get_session())
+
+# PDVs per call of the POIs batch endpoint
+MAX_BATCH_PDVS = 1000
+
+# Limits of the location search endpoints
+DEFAULT_NEAREST_PDVS = 20
+MAX_NEAREST_PDVS = 1000
+MAX_RADIUS_KM = 500
+
+# Cells per call of the heatmap endpoint
+MAX_HEATMAP_CELLS = 10000
+GEOHASH_PATTERN = "^[0123456789bcdefghjkmnpqrstuvwxyz]+$"
+
+
+def serialize_pdv_list_row(pdv) -> dict:
+    """
+    Serialize a PDV row of the list endpoints.
+    """
+    return {
+        "id": pdv.id,
+        "code": pdv.cod_pdv,
+        "ubicacion": pdv.ubicacion,
+    }
 
 
-@pdv_router.get("/pdv", response_model=list[dict])
-def get_pdvs():
+def get_pdv_list_stmt(client_id: str | None = None, updated_since=None, updated_before=None):
     """
-    Get all Punto de Venta (PDV)
+    Select the PDV columns of the list endpoints with the list filters.
     """
     stmt = (
         select(
@@ -23,72 +55,351 @@ def get_pdvs():
             PDV.ubicacion,
         )
     )
+    return filter_list_query(
+        stmt,
+        PDV,
+        client_column=PDV.client_id,
+        client_id=client_id,
+        updated_since=updated_since,
+        updated_before=updated_before,
+    )
+
+
+@pdv_router.get("/pdv", response_model=list[dict] | dict)
+def get_pdvs(params: dict = Depends(get_list_params), session: Session = Depends(get_session)):
+    """
+    Get the Punto de Venta (PDV), or a page of them with cursor / limit, ordered by id.
+    """
+    stmt = get_pdv_list_stmt(params["client_id"], params["updated_since"], params["updated_before"])
+
+    page = get_page(
+        session,
+        stmt,
+        PDV.id,
+        cursor=params["cursor"],
+        limit=params["limit"],
+        serialize=serialize_pdv_list_row,
+    )
+
+    return ORJSONResponse(content=page, status_code=200)
+
+
+@pdv_router.get("/pdv/stream")
+def stream_pdvs(
+    stream_format: Literal[NDJSON, JSON_ARRAY] = Query(NDJSON, alias="format"),
+    client_id: str | None = None,
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+):
+    """
+    Stream all Punto de Venta (PDV), ordered by id, as NDJSON (one per line) or as a JSON array.
+    Rows are read with a server-side cursor, so memory does not depend on the table size.
+    """
+    stmt = get_pdv_list_stmt(client_id, updated_since, updated_before)
+
+    return get_streaming_response(engine, stmt.order_by(PDV.id), serialize_pdv_list_row, stream_format)
+
+
+def get_nearest_content(pdv_index: PDVIndex, lat: float, lon: float, k: int, client_id: str | None) -> dict:
+    """
+    Get the k PDVs nearest to a point, nearest first.
+    """
+    positions, distances = pdv_index.get_nearest_positions(lat, lon, k, client_id)
+    return {"results": pdv_index.serialize(positions, distances)}
+
+
+def get_radius_content(
+    pdv_index: PDVIndex,
+    lat: float,
+    lon: float,
+    radius_km: float,
+    limit: int,
+    client_id: str | None,
+) -> dict:
+    """
+    Get the PDVs within a distance of a point, nearest first, with the count of all of them.
+    """
+    positions, distances = pdv_index.get_radius_positions(lat, lon, radius_km, client_id)
+    return {"count": len(positions), "results": pdv_index.serialize(positions[:limit], distances[:limit])}
+
+
+def get_bbox_content(
+    pdv_index: PDVIndex,
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    limit: int,
+    client_id: str | None,
+) -> dict:
+    """
+    Get the PDVs inside a bounding box, grouped by location, with the count of all of them.
+    """
+    positions = pdv_index.get_bbox_positions(min_lat, min_lon, max_lat, max_lon, client_id)
+    return {"count": len(positions), "results": pdv_index.serialize(positions[:limit])}
+
+
+@pdv_router.get("/pdv/nearest", response_model=dict)
+def get_nearest_pdvs(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(DEFAULT_NEAREST_PDVS, ge=1, le=MAX_NEAREST_PDVS),
+    client_id: str | None = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Get the k PDVs nearest to a point, from the in-memory spatial index.
+    """
+    content = get_nearest_content(get_pdv_index(session), lat, lon, k, client_id)
+    return ORJSONResponse(content=content, status_code=200)
+
+
+@pdv_router.get("/pdv/within-radius", response_model=dict)
+def get_pdvs_within_radius(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    client_id: str | None = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Get the PDVs within radius_km of a point, nearest first, from the in-memory spatial index.
+    """
+    content = get_radius_content(get_pdv_index(session), lat, lon, radius_km, limit, client_id)
+    return ORJSONResponse(content=content, status_code=200)
+
 
-    all_pdv = session.execute(stmt).all()
-    pdvs = []
-    for pdv in all_pdv:
-        pdv_dict = {
-            "id": pdv.id,
-            "code": pdv.cod_pdv,
-            "ubicacion": pdv.ubicacion,
-        }
+@pdv_router.get("/pdv/within-bbox", response_model=dict)
+def get_pdvs_within_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    client_id: str | None = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Get the PDVs inside a bounding box, from the in-memory spatial index.
+    """
+    if min_lat > max_lat or min_lon > max_lon:
+        return ORJSONResponse(
+            content={"error": "min_lat / min_lon must not be above max_lat / max_lon"},
+            status_code=400,
+        )
 
-        pdvs.append(pdv_dict)
+    content = get_bbox_content(get_pdv_index(session), min_lat, min_lon, max_lat, max_lon, limit, client_id)
+    return ORJSONResponse(content=content, status_code=200)
 
-    return JSONResponse(content=pdvs, status_code=200)
+
+def get_heatmap_area_error(precision: int, tile: str | None, bbox: tuple) -> str | None:
+    """
+    Check the area of a heatmap request: a geohash tile or a full bounding box.
+    """
+    if tile is None and None in bbox:
+        return "tile or min_lat, min_lon, max_lat and max_lon are required"
+    if tile is not None and len(tile) > precision:
+        return "tile must not be longer than precision"
+    if None not in bbox and (bbox[0] > bbox[2] or bbox[1] > bbox[3]):
+        return "min_lat / min_lon must not be above max_lat / max_lon"
+    return None
+
+
+def filter_heatmap_cells(stmt, precision: int, tile: str | None, bbox: tuple):
+    """
+    Filter the rollup cells of a precision by tile (geohash prefix) and bounding box. A cell is in
+    the box when the mean location of its PDVs is.
+    """
+    stmt = stmt.where(GeohashRollup.precision == precision)
+    if tile is not None:
+        stmt = stmt.where(GeohashRollup.geohash.startswith(tile, autoescape=True))
+    if None not in bbox:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        stmt = stmt.where(GeohashRollup.lat.between(min_lat, max_lat), GeohashRollup.lon.between(min_lon, max_lon))
+    return stmt
+
+
+def get_heatmap_stmt(precision: int, tile: str | None, bbox: tuple):
+    """
+    Select the rollup cells of a heatmap, one more than MAX_HEATMAP_CELLS to tell when it is truncated.
+    """
+    stmt = select(GeohashRollup.geohash, GeohashRollup.lat, GeohashRollup.lon, GeohashRollup.pdv_count)
+    stmt = filter_heatmap_cells(stmt, precision, tile, bbox)
+    return stmt.order_by(GeohashRollup.geohash).limit(MAX_HEATMAP_CELLS + 1)
+
+
+def get_heatmap_pois_stmt(precision: int, tile: str | None, bbox: tuple):
+    """
+    Select the POI quantities by type of the rollup cells of a heatmap.
+    """
+    stmt = select(GeohashPOIRollup.geohash, GeohashPOIRollup.pois_type_id, GeohashPOIRollup.quantity).join(
+        GeohashRollup,
+        and_(
+            GeohashRollup.precision == GeohashPOIRollup.precision,
+            GeohashRollup.geohash == GeohashPOIRollup.geohash,
+        ),
+    )
+    return filter_heatmap_cells(stmt, precision, tile, bbox)
+
+
+def build_heatmap(precision: int, cells, pois=None, poi_type_names: dict[int, str] | None = None) -> dict:
+    """
+    Build the heatmap content: the cells with their PDV count and, if pois is given, the POI
+    quantities by type name.
+    """
+    results = [
+        {"geohash": cell.geohash, "lat": cell.lat, "lon": cell.lon, "pdv_count": cell.pdv_count}
+        for cell in cells[:MAX_HEATMAP_CELLS]
+    ]
+    if pois is not None:
+        pois_by_cell = {cell["geohash"]: {} for cell in results}
+        for poi in pois:
+            cell_pois = pois_by_cell.get(poi.geohash)
+            if cell_pois is not None:
+                cell_pois[poi_type_names.get(poi.pois_type_id, "Unknown")] = poi.quantity
+        for cell in results:
+            cell["pois"] = pois_by_cell[cell["geohash"]]
+
+    return {"precision": precision, "truncated": len(cells) > MAX_HEATMAP_CELLS, "results": results}
+
+
+@pdv_router.get("/pdv/heatmap", response_model=dict)
+def get_pdv_heatmap(
+    request: Request,
+    precision: int = Query(..., ge=1, le=MAX_GEOHASH_PRECISION),
+    tile: str | None = Query(None, max_length=MAX_GEOHASH_PRECISION, pattern=GEOHASH_PATTERN),
+    min_lat: float | None = Query(None, ge=-90, le=90),
+    min_lon: float | None = Query(None, ge=-180, le=180),
+    max_lat: float | None = Query(None, ge=-90, le=90),
+    max_lon: float | None = Query(None, ge=-180, le=180),
+    include_pois: bool = False,
+    session: Session = Depends(get_session),
+):
+    """
+    Get the PDV count (and POI quantities by type with include_pois) by geohash prefix of the
+    given precision, inside a geohash tile and/or bounding box. Served from the rollups rebuilt
+    by every import and cached until the next one.
+    """
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    error = get_heatmap_area_error(precision, tile, bbox)
+    if error:
+        return ORJSONResponse(content={"error": error}, status_code=400)
+
+    def get_content():
+        cells = session.execute(get_heatmap_stmt(precision, tile, bbox)).all()
+        if not include_pois:
+            return build_heatmap(precision, cells)
+        pois = session.execute(get_heatmap_pois_stmt(precision, tile, bbox)).all()
+        poi_type_names = get_poi_type_names(session, {poi.pois_type_id for poi in pois})
+        return build_heatmap(precision, cells, pois, poi_type_names)
+
+    return cached_json_response(request, get_content)
+
+
+def get_segment_content(
+    segment_index: PDVSegmentIndex,
+    filters: PDVSegmentSchema,
+    cursor: str | None,
+    limit: int,
+) -> dict:
+    """
+    Get the count and a page of ids of the PDVs of a segment.
+    """
+    result = segment_index.query(filters.model_dump(exclude_none=True))
+    return {"count": segment_index.count(result), **segment_index.get_page(result, cursor, limit)}
+
+
+@pdv_router.post("/pdv/segments", response_model=dict)
+def get_pdv_segment(
+    filters: PDVSegmentSchema,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: Session = Depends(get_session),
+):
+    """
+    Get the PDVs matching all the filters of the body, from the in-memory bitmap index: boolean
+    columns by value, client_id and provincia_id by any of a list of values.
+    Returns the count of matching PDVs and a page of their ids, ordered by id.
+    """
+    content = get_segment_content(get_segment_index(session), filters, cursor, limit)
+    return ORJSONResponse(content=content, status_code=200)
 
 
 @pdv_router.get("/pdv/{pdv_id}", response_model=dict)
-def get_pdv(pdv_id: int):
+def get_pdv(pdv_id: int, session: Session = Depends(get_session)):
     """
     Get a Punto de Venta (PDV) by ID.
     """
-    pdv = session.query(PDV).filter(PDV.id == pdv_id).first()
+    pdv = session.execute(select(*get_model_columns(PDV)).where(PDV.id == pdv_id)).first()
     if not pdv:
-        return JSONResponse(content={"error": "PDV not found"}, status_code=404)
+        return ORJSONResponse(content={"error": "PDV not found"}, status_code=404)
 
-    pdv_dict = pdv.dict()
-    pdv_ser_dict = dict_all_serialized(pdv_dict)
+    pdv_ser_dict = get_model_encoder(PDV)(pdv)
 
-    return JSONResponse(content=pdv_ser_dict, status_code=200)
+    return ORJSONResponse(content=pdv_ser_dict, status_code=200)
 
 
 @pdv_router.get("/pois-types", response_model=list[str])
-def get_pois_types():
+def get_pois_types(request: Request, session: Session = Depends(get_session)):
     """
-    Get all POI types.
+    Get all POI types. Cached until the next import.
     """
-    all_pois_types = session.query(POISType).all()
-    pois_types = []
-    for pois_type in all_pois_types:
-        pois_types.append(pois_type.name)
+    def get_content():
+        all_pois_types = session.execute(select(POISType)).scalars().all()
+        pois_types = []
+        for pois_type in all_pois_types:
+            pois_types.append(pois_type.name)
+        return pois_types
 
-    return JSONResponse(content=pois_types, status_code=200)
+    return cached_json_response(request, get_content)
 
 
-def get_poi_type_name_by_id(poi_type_id: int) -> str:
+def serialize_pois(pois, poi_type_names: dict[int, str]) -> list[dict]:
     """
-    Get POI type name by ID.
+    Serialize POI rows with the name of their type instead of its id.
     """
-    poi_type = session.query(POISType).filter(POISType.id == poi_type_id).first()
-    if not poi_type:
-        return "Unknown"
-    return poi_type.name
+    encode_poi = get_model_encoder(POIAndPDV)
+    pois_list = []
+    for poi in pois:
+        poi_dict = encode_poi(poi)
+        poi_dict.pop("pois_type_id")
+        poi_dict["poi_type"] = poi_type_names.get(poi.pois_type_id, "Unknown")
+        pois_list.append(poi_dict)
+    return pois_list
 
 
-@pdv_router.get("/pois-for-pdv/{pdv_id}", response_model=list[dict])
-def get_pois_for_pdv(pdv_id: str):
+def group_pois_by_pdv(pdv_ids: list[str], pois: list[dict]) -> dict[str, list[dict]]:
     """
-    Get all POIs for a given PDV.
+    Group serialized POIs by PDV, with an empty list for the PDVs without POIs.
     """
-    pois = session.query(POIAndPDV).filter(POIAndPDV.pdv_id == pdv_id).all()
-    pois_list = []
+    pois_by_pdv = {pdv_id: [] for pdv_id in pdv_ids}
     for poi in pois:
-        poi_dict = poi.dict()
-        poi_type_id = poi_dict.pop("pois_type_id")
-        poi_type_name = get_poi_type_name_by_id(poi_type_id)
-        poi_dict["poi_type"] = poi_type_name
-        poi_ser_dict = dict_all_serialized(poi_dict)
-        pois_list.append(poi_ser_dict)
-
-    return JSONResponse(content=pois_list, status_code=200)
+        pois_by_pdv[poi["pdv_id"]].append(poi)
+    return pois_by_pdv
+
+
+@pdv_router.get("/pois-for-pdv/{pdv_id}", response_model=list[dict])
+def get_pois_for_pdv(pdv_id: str, session: Session = Depends(get_session)):
+    """
+    Get all POIs for a given PDV, in one query: the type names come from the in-process dictionary.
+    """
+    pois = session.execute(select(*get_model_columns(POIAndPDV)).where(POIAndPDV.pdv_id == pdv_id)).all()
+    poi_type_names = get_poi_type_names(session, {poi.pois_type_id for poi in pois})
+
+    return ORJSONResponse(content=serialize_pois(pois, poi_type_names), status_code=200)
+
+
+@pdv_router.post("/pois-for-pdv/batch", response_model=dict[str, list[dict]])
+def get_pois_for_pdvs(
+    pdv_ids: list[str] = Body(..., min_length=1, max_length=MAX_BATCH_PDVS),
+    session: Session = Depends(get_session),
+):
+    """
+    Get the POIs of many PDVs in one query, by PDV id.
+    """
+    pdv_ids = list(dict.fromkeys(pdv_ids))
+    pois = session.execute(select(*get_model_columns(POIAndPDV)).where(POIAndPDV.pdv_id.in_(pdv_ids))).all()
+    poi_type_names = get_poi_type_names(session, {poi.pois_type_id for poi in pois})
+
+    return ORJSONResponse(content=group_pois_by_pdv(pdv_ids, serialize_pois(pois, poi_type_names)), status_code=200)
@@ -0,0 +1,230 @@
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Body, Depends, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.async_session import async_engine, get_async_session
+from api.helpers.cache import cached_json_response_async
+from api.helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, get_list_params, get_page_async
+from api.helpers.streaming import JSON_ARRAY, NDJSON, get_async_streaming_response
+from api.helpers.serialization import get_model_columns, get_model_encoder
+from api.import_dataset.rollups import MAX_GEOHASH_PRECISION
+from api.marketminds.models import PDV, POISType, POIAndPDV
+from api.marketminds.poi_types import get_poi_type_names_async
+from api.marketminds.routing.pdv import (
+    DEFAULT_NEAREST_PDVS,
+    GEOHASH_PATTERN,
+    MAX_BATCH_PDVS,
+    MAX_NEAREST_PDVS,
+    MAX_RADIUS_KM,
+    build_heatmap,
+    get_bbox_content,
+    get_heatmap_area_error,
+    get_heatmap_pois_stmt,
+    get_heatmap_stmt,
+    get_nearest_content,
+    get_pdv_list_stmt,
+    get_radius_content,
+    get_segment_content,
+    group_pois_by_pdv,
+    serialize_pdv_list_row,
+    serialize_pois,
+)
+from api.marketminds.segments import PDVSegmentSchema, get_segment_index
+from api.marketminds.spatial import get_pdv_index
+
+
+pdv_async_router = APIRouter()
+
+
+@pdv_async_router.get("/pdv", response_model=list[dict] | dict)
+async def get_pdvs(params: dict = Depends(get_list_params), session: AsyncSession = Depends(get_async_session)):
+    """
+    Get the Punto de Venta (PDV), or a page of them with cursor / limit, ordered by id.
+    """
+    stmt = get_pdv_list_stmt(params["client_id"], params["updated_since"], params["updated_before"])
+
+    page = await get_page_async(
+        session,
+        stmt,
+        PDV.id,
+        cursor=params["cursor"],
+        limit=params["limit"],
+        serialize=serialize_pdv_list_row,
+    )
+
+    return ORJSONResponse(content=page, status_code=200)
+
+
+@pdv_async_router.get("/pdv/stream")
+async def stream_pdvs(
+    stream_format: Literal[NDJSON, JSON_ARRAY] = Query(NDJSON, alias="format"),
+    client_id: str | None = None,
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+):
+    """
+    Stream all Punto de Venta (PDV), ordered by id, as NDJSON (one per line) or as a JSON array.
+    """
+    stmt = get_pdv_list_stmt(client_id, updated_since, updated_before)
+
+    return get_async_streaming_response(async_engine, stmt.order_by(PDV.id), serialize_pdv_list_row, stream_format)
+
+
+@pdv_async_router.get("/pdv/nearest", response_model=dict)
+async def get_nearest_pdvs(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(DEFAULT_NEAREST_PDVS, ge=1, le=MAX_NEAREST_PDVS),
+    client_id: str | None = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the k PDVs nearest to a point, from the in-memory spatial index.
+    """
+    pdv_index = await session.run_sync(get_pdv_index)
+    return ORJSONResponse(content=get_nearest_content(pdv_index, lat, lon, k, client_id), status_code=200)
+
+
+@pdv_async_router.get("/pdv/within-radius", response_model=dict)
+async def get_pdvs_within_radius(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    client_id: str | None = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the PDVs within radius_km of a point, nearest first, from the in-memory spatial index.
+    """
+    pdv_index = await session.run_sync(get_pdv_index)
+    content = get_radius_content(pdv_index, lat, lon, radius_km, limit, client_id)
+    return ORJSONResponse(content=content, status_code=200)
+
+
+@pdv_async_router.get("/pdv/within-bbox", response_model=dict)
+async def get_pdvs_within_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    client_id: str | None = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the PDVs inside a bounding box, from the in-memory spatial index.
+    """
+    if min_lat > max_lat or min_lon > max_lon:
+        return ORJSONResponse(
+            content={"error": "min_lat / min_lon must not be above max_lat / max_lon"},
+            status_code=400,
+        )
+
+    pdv_index = await session.run_sync(get_pdv_index)
+    content = get_bbox_content(pdv_index, min_lat, min_lon, max_lat, max_lon, limit, client_id)
+    return ORJSONResponse(content=content, status_code=200)
+
+
+@pdv_async_router.get("/pdv/heatmap", response_model=dict)
+async def get_pdv_heatmap(
+    request: Request,
+    precision: int = Query(..., ge=1, le=MAX_GEOHASH_PRECISION),
+    tile: str | None = Query(None, max_length=MAX_GEOHASH_PRECISION, pattern=GEOHASH_PATTERN),
+    min_lat: float | None = Query(None, ge=-90, le=90),
+    min_lon: float | None = Query(None, ge=-180, le=180),
+    max_lat: float | None = Query(None, ge=-90, le=90),
+    max_lon: float | None = Query(None, ge=-180, le=180),
+    include_pois: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the PDV count (and POI quantities by type with include_pois) by geohash prefix of the
+    given precision, inside a geohash tile and/or bounding box. Served from the rollups rebuilt
+    by every import and cached until the next one.
+    """
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    error = get_heatmap_area_error(precision, tile, bbox)
+    if error:
+        return ORJSONResponse(content={"error": error}, status_code=400)
+
+    async def get_content():
+        cells = (await session.execute(get_heatmap_stmt(precision, tile, bbox))).all()
+        if not include_pois:
+            return build_heatmap(precision, cells)
+        pois = (await session.execute(get_heatmap_pois_stmt(precision, tile, bbox))).all()
+        poi_type_names = await get_poi_type_names_async(session, {poi.pois_type_id for poi in pois})
+        return build_heatmap(precision, cells, pois, poi_type_names)
+
+    return await cached_json_response_async(request, get_content)
+
+
+@pdv_async_router.post("/pdv/segments", response_model=dict)
+async def get_pdv_segment(
+    filters: PDVSegmentSchema,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the PDVs matching all the filters of the body, from the in-memory bitmap index.
+    """
+    segment_index = await session.run_sync(get_segment_index)
+    return ORJSONResponse(content=get_segment_content(segment_index, filters, cursor, limit), status_code=200)
+
+
+@pdv_async_router.get("/pdv/{pdv_id}", response_model=dict)
+async def get_pdv(pdv_id: int, session: AsyncSession = Depends(get_async_session)):
+    """
+    Get a Punto de Venta (PDV) by ID.
+    """
+    pdv = (await session.execute(select(*get_model_columns(PDV)).where(PDV.id == pdv_id))).first()
+    if not pdv:
+        return ORJSONResponse(content={"error": "PDV not found"}, status_code=404)
+
+    pdv_ser_dict = get_model_encoder(PDV)(pdv)
+
+    return ORJSONResponse(content=pdv_ser_dict, status_code=200)
+
+
+@pdv_async_router.get("/pois-types", response_model=list[str])
+async def get_pois_types(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """
+    Get all POI types. Cached until the next import.
+    """
+    async def get_content():
+        return list((await session.execute(select(POISType.name).order_by(POISType.id))).scalars())
+
+    return await cached_json_response_async(request, get_content)
+
+
+@pdv_async_router.get("/pois-for-pdv/{pdv_id}", response_model=list[dict])
+async def get_pois_for_pdv(pdv_id: str, session: AsyncSession = Depends(get_async_session)):
+    """
+    Get all POIs for a given PDV, in one query: the type names come from the in-process dictionary.
+    """
+    stmt = select(*get_model_columns(POIAndPDV)).where(POIAndPDV.pdv_id == pdv_id)
+    pois = (await session.execute(stmt)).all()
+    poi_type_names = await get_poi_type_names_async(session, {poi.pois_type_id for poi in pois})
+
+    return ORJSONResponse(content=serialize_pois(pois, poi_type_names), status_code=200)
+
+
+@pdv_async_router.post("/pois-for-pdv/batch", response_model=dict[str, list[dict]])
+async def get_pois_for_pdvs(
+    pdv_ids: list[str] = Body(..., min_length=1, max_length=MAX_BATCH_PDVS),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the POIs of many PDVs in one query, by PDV id.
+    """
+    pdv_ids = list(dict.fromkeys(pdv_ids))
+    stmt = select(*get_model_columns(POIAndPDV)).where(POIAndPDV.pdv_id.in_(pdv_ids))
+    pois = (await session.execute(stmt)).all()
+    poi_type_names = await get_poi_type_names_async(session, {poi.pois_type_id for poi in pois})
+
+    return ORJSONResponse(content=group_pois_by_pdv(pdv_ids, serialize_pois(pois, poi_type_names)), status_code=200)
@@ -1,59 +1,176 @@
-from fastapi import APIRouter
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+from sqlmodel import Session
 
 from api.db.session import get_session
-from api.marketminds.models import Departamento, Provincia
+from api.helpers.cache import cached_json_response
+from api.helpers.pagination import MAX_PAGE_SIZE, filter_list_query, get_page
+from api.marketminds.models import PDV, Departamento, Provincia
 
 
 prov_router = APIRouter()
-session = next(get_session())
 
 
-@prov_router.get("/provincias", response_model=list[dict])
-def get_provincias():
+def get_provincias_stmt():
+    """
+    Select the provinces with their departments count, counted in one GROUP BY instead of
+    loading the departments of every province.
+    """
+    departamentos_counts = (
+        select(Departamento.provincia_id, func.count(Departamento.id).label("departamentos_count"))
+        .group_by(Departamento.provincia_id)
+        .subquery()
+    )
+    return select(
+        Provincia.id,
+        Provincia.name,
+        func.coalesce(departamentos_counts.c.departamentos_count, 0).label("departamentos_count"),
+    ).outerjoin(departamentos_counts, departamentos_counts.c.provincia_id == Provincia.id)
+
+
+def serialize_provincia(provincia) -> dict:
+    """
+    Serialize a row of get_provincias_stmt.
+    """
+    return {
+        "id": provincia.id,
+        "name": provincia.name,
+        "departamentos_count": provincia.departamentos_count,
+    }
+
+
+def get_geo_tree_stmt():
+    """
+    Select every department with its province and PDVs count, provinces without departments
+    included, ordered for build_geo_tree.
+    """
+    pdvs_counts = (
+        select(PDV.departamento_id, func.count(PDV.id).label("pdvs_count"))
+        .group_by(PDV.departamento_id)
+        .subquery()
+    )
+    return (
+        select(
+            Provincia.id.label("provincia_id"),
+            Provincia.name.label("provincia_name"),
+            Departamento.id.label("departamento_id"),
+            Departamento.name.label("departamento_name"),
+            func.coalesce(pdvs_counts.c.pdvs_count, 0).label("pdvs_count"),
+        )
+        .outerjoin(Departamento, Departamento.provincia_id == Provincia.id)
+        .outerjoin(pdvs_counts, pdvs_counts.c.departamento_id == Departamento.id)
+        .order_by(Provincia.id, Departamento.id)
+    )
+
+
+def build_geo_tree(rows) -> list[dict]:
     """
-    Get all provinces.
+    Nest the rows of get_geo_tree_stmt: provinces with their departments and PDV counts.
     """
-    all_provincias = session.query(Provincia).all()
     provincias = []
-    for provincia in all_provincias:
-        provincias.append({
-            "id": provincia.id,
-            "name": provincia.name,
-            "departamentos_count": len(provincia.departamentos),
+    for row in rows:
+        if not provincias or provincias[-1]["id"] != row.provincia_id:
+            provincias.append({
+                "id": row.provincia_id,
+                "name": row.provincia_name,
+                "departamentos_count": 0,
+                "pdvs_count": 0,
+                "departamentos": [],
+            })
+        if row.departamento_id is None:
+            continue
+        provincia = provincias[-1]
+        provincia["departamentos"].append({
+            "id": row.departamento_id,
+            "name": row.departamento_name,
+            "pdvs_count": row.pdvs_count,
         })
+        provincia["departamentos_count"] += 1
+        provincia["pdvs_count"] += row.pdvs_count
+    return provincias
+
 
-    return JSONResponse(content=provincias, status_code=200)
+@prov_router.get("/provincias", response_model=list[dict] | dict)
+def get_provincias(
+    request: Request,
+    cursor: int | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Get the provinces, or a page of them with cursor / limit, ordered by id. Cached until the next import.
+    """
+    stmt = filter_list_query(
+        get_provincias_stmt(),
+        Provincia,
+        updated_since=updated_since,
+        updated_before=updated_before,
+    )
+
+    return cached_json_response(request, lambda: get_page(
+        session,
+        stmt,
+        Provincia.id,
+        cursor=cursor,
+        limit=limit,
+        serialize=serialize_provincia,
+    ))
 
 
 @prov_router.get("/provincias/{provincia_id}", response_model=dict)
-def get_provincia(provincia_id: int):
+def get_provincia(provincia_id: int, session: Session = Depends(get_session)):
     """
     Get a province by ID.
     """
-    provincia = session.query(Provincia).filter(Provincia.id == provincia_id).first()
+    provincia = session.execute(get_provincias_stmt().where(Provincia.id == provincia_id)).first()
     if not provincia:
         return JSONResponse(content={"error": "Province not found"}, status_code=404)
 
-    return JSONResponse(content={
-        "id": provincia.id,
-        "name": provincia.name,
-        "departamentos_count": len(provincia.departamentos),
-    }, status_code=200)
+    return JSONResponse(content=serialize_provincia(provincia), status_code=200)
 
 
-@prov_router.get("/departamentos", response_model=list[dict])
-def get_departamentos():
+@prov_router.get("/provincias-departamentos", response_model=list[dict])
+def get_provincias_departamentos(request: Request, session: Session = Depends(get_session)):
     """
-    Get all departments.
+    Get the geo tree: every province with its departments and PDV counts, in one query.
+    Cached until the next import.
     """
-    all_departamentos = session.query(Departamento).all()
-    departamentos = []
-    for departamento in all_departamentos:
-        departamentos.append({
+    return cached_json_response(request, lambda: build_geo_tree(session.execute(get_geo_tree_stmt())))
+
+
+@prov_router.get("/departamentos", response_model=list[dict] | dict)
+def get_departamentos(
+    request: Request,
+    cursor: int | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Get the departments, or a page of them with cursor / limit, ordered by id. Cached until the next import.
+    """
+    stmt = filter_list_query(
+        select(Departamento.id, Departamento.name, Departamento.provincia_id),
+        Departamento,
+        updated_since=updated_since,
+        updated_before=updated_before,
+    )
+
+    return cached_json_response(request, lambda: get_page(
+        session,
+        stmt,
+        Departamento.id,
+        cursor=cursor,
+        limit=limit,
+        serialize=lambda departamento: {
             "id": departamento.id,
             "name": departamento.name,
             "provincia_id": departamento.provincia_id,
-        })
-
-    return JSONResponse(content=departamentos, status_code=200)
+        },
+    ))
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.async_session import get_async_session
+from api.helpers.cache import cached_json_response_async
+from api.helpers.pagination import MAX_PAGE_SIZE, filter_list_query, get_page_async
+from api.marketminds.models import Departamento, Provincia
+from api.marketminds.routing.provincias_departamentos import (
+    build_geo_tree,
+    get_geo_tree_stmt,
+    get_provincias_stmt,
+    serialize_provincia,
+)
+
+
+prov_async_router = APIRouter()
+
+
+@prov_async_router.get("/provincias", response_model=list[dict] | dict)
+async def get_provincias(
+    request: Request,
+    cursor: int | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the provinces, or a page of them with cursor / limit, ordered by id. Cached until the next import.
+    """
+    stmt = filter_list_query(
+        get_provincias_stmt(),
+        Provincia,
+        updated_since=updated_since,
+        updated_before=updated_before,
+    )
+
+    return await cached_json_response_async(request, lambda: get_page_async(
+        session,
+        stmt,
+        Provincia.id,
+        cursor=cursor,
+        limit=limit,
+        serialize=serialize_provincia,
+    ))
+
+
+@prov_async_router.get("/provincias/{provincia_id}", response_model=dict)
+async def get_provincia(provincia_id: int, session: AsyncSession = Depends(get_async_session)):
+    """
+    Get a province by ID.
+    """
+    provincia = (await session.execute(get_provincias_stmt().where(Provincia.id == provincia_id))).first()
+    if not provincia:
+        return JSONResponse(content={"error": "Province not found"}, status_code=404)
+
+    return JSONResponse(content=serialize_provincia(provincia), status_code=200)
+
+
+@prov_async_router.get("/provincias-departamentos", response_model=list[dict])
+async def get_provincias_departamentos(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """
+    Get the geo tree: every province with its departments and PDV counts, in one query.
+    Cached until the next import.
+    """
+    async def get_content():
+        return build_geo_tree(await session.execute(get_geo_tree_stmt()))
+
+    return await cached_json_response_async(request, get_content)
+
+
+@prov_async_router.get("/departamentos", response_model=list[dict] | dict)
+async def get_departamentos(
+    request: Request,
+    cursor: int | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    updated_since: datetime | None = None,
+    updated_before: datetime | None = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Get the departments, or a page of them with cursor / limit, ordered by id. Cached until the next import.
+    """
+    stmt = filter_list_query(
+        select(Departamento.id, Departamento.name, Departamento.provincia_id),
+        Departamento,
+        updated_since=updated_since,
+        updated_before=updated_before,
+    )
+
+    return await cached_json_response_async(request, lambda: get_page_async(
+        session,
+        stmt,
+        Departamento.id,
+        cursor=cursor,
+        limit=limit,
+        serialize=lambda departamento: {
+            "id": departamento.id,
+            "name": departamento.name,
+            "provincia_id": departamento.provincia_id,
+        },
+    ))
@@ -0,0 +1,239 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from pydantic import ConfigDict, create_model
+from sqlalchemy import Boolean, select
+
+from api.marketminds.models import PDV, Departamento
+
+
+# Boolean survey columns of PDV, one bitmap per value (True / False, NULL is in neither)
+PDV_BOOLEAN_COLUMNS = [column.name for column in PDV.__table__.columns if isinstance(column.type, Boolean)]
+# Other columns with one bitmap per value
+PDV_SEGMENT_COLUMNS = ["client_id", "provincia_id"]
+
+# A bitmap with fewer PDVs than this ratio is kept as the sorted positions of its PDVs (int32),
+# which take less memory than one bit per PDV
+SPARSE_RATIO = 1 / 32
+
+# The index is refreshed after this many seconds even without an import in this process
+SEGMENT_INDEX_TTL = 600
+
+# Set bits of every byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+PDVSegmentSchema = create_model(
+    "PDVSegmentSchema",
+    __config__=ConfigDict(extra="forbid"),
+    client_id=(list[str] | None, None),
+    provincia_id=(list[int] | None, None),
+    **{column: (bool | None, None) for column in PDV_BOOLEAN_COLUMNS},
+)
+
+_segment_index = None
+_segment_index_stale = False
+_segment_index_refreshed_at = 0.0
+_segment_index_lock = threading.Lock()
+
+
+def encode_bitmap(bits: np.ndarray):
+    """ Compress a boolean array: packed bits, or the positions of the set bits when sparse.
+    """
+    positions = np.flatnonzero(bits)
+    if len(positions) < len(bits) * SPARSE_RATIO:
+        return positions.astype(np.int32)
+    return np.packbits(bits)
+
+
+def decode_bitmap(bitmap, size: int) -> np.ndarray:
+    """ Get the boolean array of a compressed bitmap.
+    """
+    if bitmap.dtype == np.uint8:
+        return np.unpackbits(bitmap, count=size).astype(bool)
+    bits = np.zeros(size, dtype=bool)
+    bits[bitmap] = True
+    return bits
+
+
+class PDVSegmentIndex:
+    """ In-memory bitmap index of the PDVs: for every value of the boolean columns, client and
+    provincia, the PDVs with that value, as bits in the order of the sorted PDV ids.
+    """
+
+    def __init__(self, ids: np.ndarray, bitmaps: dict, watermark=None):
+        self.ids = ids
+        # (column, value) -> compressed bitmap (see encode_bitmap)
+        self.bitmaps = bitmaps
+        self.all_pdvs = np.packbits(np.ones(len(ids), dtype=bool))
+        # Highest updated_at loaded, the next refresh only reads PDVs updated since then
+        self.watermark = watermark
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, rows: dict, watermark=None) -> "PDVSegmentIndex":
+        """ Build the index from the columns of the PDVs (see load_segment_rows).
+        """
+        return cls(np.array([], dtype=object), {}).merge(rows, watermark)
+
+    def merge(self, rows: dict, watermark) -> "PDVSegmentIndex":
+        """ Get a new index with some PDVs added or updated. Only the bits of those PDVs change:
+        sparse bitmaps are updated through their positions, without decoding them.
+        """
+        changed_ids = np.asarray(rows["id"], dtype=object)
+        old_size = len(self.ids)
+        if old_size:
+            found = np.minimum(np.searchsorted(self.ids, changed_ids), old_size - 1)
+            new_ids = np.sort(changed_ids[self.ids[found] != changed_ids], kind="stable")
+            # PDVs not in the index yet are inserted in id order. int32 like the sparse bitmaps,
+            # so searchsorted does not convert them on every call
+            insert_at = np.searchsorted(self.ids, new_ids).astype(np.int32)
+            ids = np.insert(self.ids, insert_at, new_ids)
+            positions = np.searchsorted(ids, changed_ids).astype(np.int32)
+        else:
+            # Building: every PDV is new, its position is its rank by id
+            order = np.argsort(changed_ids, kind="stable")
+            ids = changed_ids[order]
+            insert_at = np.zeros(len(ids), dtype=np.int32)
+            positions = np.empty(len(ids), dtype=np.int32)
+            positions[order] = np.arange(len(ids), dtype=np.int32)
+        sorted_positions = np.sort(positions)
+
+        bitmaps = {}
+        for column in PDV_BOOLEAN_COLUMNS + PDV_SEGMENT_COLUMNS:
+            # One code per value, -1 for NULL
+            codes, values = pd.factorize(pd.Series(rows[column], dtype=object))
+            value_codes = {value: code for code, value in enumerate(values.tolist())}
+            keys = {key for key in self.bitmaps if key[0] == column} | {(column, value) for value in value_codes}
+            for key in keys:
+                bitmap = self.bitmaps.get(key, np.array([], dtype=np.int32))
+                matches = codes == value_codes.get(key[1], -2)
+                if bitmap.dtype == np.uint8:
+                    bits = np.insert(decode_bitmap(bitmap, old_size), insert_at, False)
+                    bits[positions] = matches
+                    bitmaps[key] = encode_bitmap(bits)
+                    continue
+                # The old positions move by the PDVs inserted before them, the changed ones are set again
+                moved = bitmap + np.searchsorted(insert_at, bitmap, side="right")
+                if len(moved) and len(sorted_positions):
+                    found = np.minimum(np.searchsorted(sorted_positions, moved), len(sorted_positions) - 1)
+                    moved = moved[sorted_positions[found] != moved]
+                key_positions = np.sort(np.concatenate([moved, positions[matches]])).astype(np.int32)
+                if len(key_positions) >= len(ids) * SPARSE_RATIO:
+                    bitmaps[key] = encode_bitmap(decode_bitmap(key_positions, len(ids)))
+                elif len(key_positions):
+                    bitmaps[key] = key_positions
+
+        return PDVSegmentIndex(ids, bitmaps, max(filter(None, [self.watermark, watermark]), default=None))
+
+    def get_bitmap(self, column: str, values: list) -> np.ndarray:
+        """ Get the packed bitmap of the PDVs with any of the values of a column.
+        """
+        bitmaps = [self.bitmaps[(column, value)] for value in values if (column, value) in self.bitmaps]
+        if len(bitmaps) == 1 and bitmaps[0].dtype == np.uint8:
+            return bitmaps[0]
+        bits = np.zeros(len(self.ids), dtype=bool)
+        for bitmap in bitmaps:
+            bits |= decode_bitmap(bitmap, len(self.ids))
+        return np.packbits(bits)
+
+    def query(self, filters: dict) -> np.ndarray:
+        """ Get the packed bitmap of the PDVs matching all the filters: column -> value for the
+        boolean columns, column -> list of values (any of them) for client_id and provincia_id.
+        """
+        result = self.all_pdvs
+        for column, value in filters.items():
+            if value is not None:
+                result = result & self.get_bitmap(column, value if isinstance(value, list) else [value])
+        return result
+
+    def count(self, result: np.ndarray) -> int:
+        """ Count the PDVs of a query result.
+        """
+        return int(POPCOUNT[result].sum())
+
+    def get_page(self, result: np.ndarray, cursor: str | None = None, limit: int = 100) -> dict:
+        """ Get a page of the ids of a query result, ordered by id.
+        """
+        start = int(np.searchsorted(self.ids, cursor, side="right")) if cursor is not None else 0
+        positions = np.flatnonzero(np.unpackbits(result, count=len(self.ids))[start:])[:limit + 1] + start
+        ids = self.ids[positions[:limit]].tolist()
+        return {"results": ids, "next_cursor": ids[-1] if len(positions) > limit else None}
+
+
+def load_segment_rows(session, updated_since=None) -> tuple[dict, object]:
+    """ Read the segment columns of the PDVs, all or the ones updated since a date.
+    :return: The values by column and the highest updated_at read.
+    """
+    stmt = (
+        select(
+            PDV.id,
+            PDV.client_id,
+            Departamento.provincia_id,
+            *(getattr(PDV, column) for column in PDV_BOOLEAN_COLUMNS),
+            PDV.updated_at,
+        )
+        .outerjoin(Departamento, Departamento.id == PDV.departamento_id)
+    )
+    if updated_since is not None:
+        stmt = stmt.where(PDV.updated_at >= updated_since)
+    rows = session.execute(stmt).all()
+    columns = ["id"] + PDV_SEGMENT_COLUMNS + PDV_BOOLEAN_COLUMNS
+    if not rows:
+        return {column: [] for column in columns}, None
+    values = list(zip(*rows))
+    return dict(zip(columns, values[:-1])), max(values[-1])
+
+
+def mark_segment_index_stale():
+    """ Refresh the segment index on its next use, with the PDVs updated since it was loaded.
+    Called when an import finishes.
+    """
+    global _segment_index_stale
+    _segment_index_stale = True
+
+
+def refresh_segment_index(session) -> PDVSegmentIndex:
+    """ Build the segment index, or update the bitmaps of the PDVs updated since the last load.
+    """
+    global _segment_index, _segment_index_stale, _segment_index_refreshed_at
+    _segment_index_stale = False
+    _segment_index_refreshed_at = time.monotonic()
+    segment_index = _segment_index
+    try:
+        if segment_index is None:
+            segment_index = PDVSegmentIndex.build(*load_segment_rows(session))
+        else:
+            rows, watermark = load_segment_rows(session, segment_index.watermark)
+            if rows["id"]:
+                segment_index = segment_index.merge(rows, watermark)
+    except Exception:
+        _segment_index_stale = True
+        raise
+    _segment_index = segment_index
+    return segment_index
+
+
+def get_segment_index(session) -> PDVSegmentIndex:
+    """ Get the segment index, refreshing it when an import finished or it is older than
+    SEGMENT_INDEX_TTL. Like get_pdv_index, the lock is never waited for.
+    """
+    segment_index = _segment_index
+    if (
+        segment_index is not None
+        and not _segment_index_stale
+        and time.monotonic() - _segment_index_refreshed_at < SEGMENT_INDEX_TTL
+    ):
+        return segment_index
+
+    if _segment_index_lock.acquire(blocking=False):
+        try:
+            return refresh_segment_index(session)
+        finally:
+            _segment_index_lock.release()
+    if segment_index is None:
+        return PDVSegmentIndex.build(*load_segment_rows(session))
+    return segment_index
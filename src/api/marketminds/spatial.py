@@ -0,0 +1,231 @@
+import math
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from api.marketminds.models import PDV
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Side of the grid cells, in degrees (about 2.2 km of latitude)
+GRID_CELL_DEGREES = 0.02
+GRID_LAT_CELLS = math.ceil(180 / GRID_CELL_DEGREES)
+GRID_LON_CELLS = math.ceil(360 / GRID_CELL_DEGREES)
+
+# The index is refreshed after this many seconds even without an import in this process
+# (e.g. when the dataset is imported from the command line)
+PDV_INDEX_TTL = 600
+
+_pdv_index = None
+_pdv_index_stale = False
+_pdv_index_refreshed_at = 0.0
+_pdv_index_lock = threading.Lock()
+
+
+def get_cell_keys(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """ Get the grid cell of each point, as row * GRID_LON_CELLS + column.
+    """
+    rows = np.clip(((lats + 90) // GRID_CELL_DEGREES).astype(np.int64), 0, GRID_LAT_CELLS - 1)
+    columns = np.clip(((lons + 180) // GRID_CELL_DEGREES).astype(np.int64), 0, GRID_LON_CELLS - 1)
+    return rows * GRID_LON_CELLS + columns
+
+
+def get_distances_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """ Get the haversine distance from a point to each of the points, in km.
+    """
+    lat_rad, lats_rad = math.radians(lat), np.radians(lats)
+    half_dlat = (lats_rad - lat_rad) / 2
+    half_dlon = np.radians(lons - lon) / 2
+    a = np.sin(half_dlat) ** 2 + math.cos(lat_rad) * np.cos(lats_rad) * np.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+def get_radius_bboxes(lat: float, lon: float, radius_km: float) -> list[tuple[float, float, float, float]]:
+    """ Get the bounding boxes (min_lat, min_lon, max_lat, max_lon) of a circle: one, or two when
+    the circle crosses the antimeridian, one on each side of it.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - dlat, lat + dlat
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if min_lat <= -90 or max_lat >= 90 or radius_km >= KM_PER_DEGREE * 180 * cos_lat:
+        # The circle reaches a pole or wraps around: every longitude
+        return [(max(min_lat, -90), -180, min(max_lat, 90), 180)]
+    dlon = radius_km / (KM_PER_DEGREE * cos_lat)
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        return [(min_lat, min_lon + 360, max_lat, 180), (min_lat, -180, max_lat, max_lon)]
+    if max_lon > 180:
+        return [(min_lat, min_lon, max_lat, 180), (min_lat, -180, max_lat, max_lon - 360)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+class PDVIndex:
+    """ In-memory spatial index of the PDVs: NumPy arrays sorted by grid cell, so the points of
+    a row of cells are a contiguous slice found with searchsorted.
+    """
+
+    def __init__(self, ids, client_ids, lats, lons, geohashes, watermark=None):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        # PDVs without valid coordinates can not be found by location
+        valid = np.isfinite(lats) & np.isfinite(lons)
+        cell_keys = get_cell_keys(lats[valid], lons[valid])
+        order = np.argsort(cell_keys, kind="stable")
+
+        self.cell_keys = cell_keys[order]
+        self.ids = np.asarray(ids, dtype=object)[valid][order]
+        self.client_ids = np.asarray(client_ids, dtype=object)[valid][order]
+        self.lats = lats[valid][order]
+        self.lons = lons[valid][order]
+        self.geohashes = np.asarray(geohashes, dtype=object)[valid][order]
+        # Highest updated_at loaded, the next refresh only reads PDVs updated since then
+        self.watermark = watermark
+
+    def __len__(self):
+        return len(self.ids)
+
+    def merge(self, ids, client_ids, lats, lons, geohashes, watermark) -> "PDVIndex":
+        """ Get a new index with some PDVs added or replaced.
+        """
+        # A set lookup per id, np.isin sorts the object arrays and is much slower
+        replaced_ids = set(ids)
+        kept = np.fromiter((pdv_id not in replaced_ids for pdv_id in self.ids), dtype=bool, count=len(self.ids))
+        return PDVIndex(
+            np.concatenate([self.ids[kept], np.asarray(ids, dtype=object)]),
+            np.concatenate([self.client_ids[kept], np.asarray(client_ids, dtype=object)]),
+            np.concatenate([self.lats[kept], np.asarray(lats, dtype=np.float64)]),
+            np.concatenate([self.lons[kept], np.asarray(lons, dtype=np.float64)]),
+            np.concatenate([self.geohashes[kept], np.asarray(geohashes, dtype=object)]),
+            watermark=max(filter(None, [self.watermark, watermark]), default=None),
+        )
+
+    def get_bbox_positions(self, min_lat, min_lon, max_lat, max_lon, client_id=None) -> np.ndarray:
+        """ Get the positions of the points inside a bounding box, in index order.
+        """
+        first_key, last_key = get_cell_keys(np.array([min_lat, max_lat]), np.array([min_lon, max_lon]))
+        first_row, first_column = divmod(int(first_key), GRID_LON_CELLS)
+        last_row, last_column = divmod(int(last_key), GRID_LON_CELLS)
+
+        rows = np.arange(first_row, last_row + 1, dtype=np.int64) * GRID_LON_CELLS
+        starts = np.searchsorted(self.cell_keys, rows + first_column, side="left")
+        ends = np.searchsorted(self.cell_keys, rows + last_column, side="right")
+        positions = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)] or [[]])
+        positions = positions.astype(np.int64)
+
+        # The cells on the border are only partly inside the box
+        lats, lons = self.lats[positions], self.lons[positions]
+        inside = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+        if client_id is not None:
+            inside &= self.client_ids[positions] == client_id
+        return positions[inside]
+
+    def get_radius_positions(self, lat, lon, radius_km, client_id=None) -> tuple[np.ndarray, np.ndarray]:
+        """ Get the positions of the points within a distance of a point, nearest first.
+        :return: The positions and their distances in km.
+        """
+        positions = np.concatenate([
+            self.get_bbox_positions(*bbox, client_id=client_id)
+            for bbox in get_radius_bboxes(lat, lon, radius_km)
+        ])
+        distances = get_distances_km(lat, lon, self.lats[positions], self.lons[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return positions[order], distances[order]
+
+    def get_nearest_positions(self, lat, lon, k, client_id=None) -> tuple[np.ndarray, np.ndarray]:
+        """ Get the positions of the k points nearest to a point, nearest first.
+        The search radius grows until it holds k points, every point within it is a candidate so
+        the result is exact.
+        :return: The positions and their distances in km.
+        """
+        radius_km = GRID_CELL_DEGREES * KM_PER_DEGREE
+        while True:
+            positions, distances = self.get_radius_positions(lat, lon, radius_km, client_id)
+            if len(positions) >= k or radius_km >= math.pi * EARTH_RADIUS_KM:
+                return positions[:k], distances[:k]
+            radius_km *= 4
+
+    def serialize(self, positions: np.ndarray, distances: np.ndarray | None = None) -> list[dict]:
+        """ Serialize the points at some positions, with their distance in km if given.
+        """
+        columns = {
+            "id": self.ids[positions].tolist(),
+            "client_id": self.client_ids[positions].tolist(),
+            "lat": self.lats[positions].tolist(),
+            "lon": self.lons[positions].tolist(),
+            "geohash": self.geohashes[positions].tolist(),
+        }
+        if distances is not None:
+            columns["distance_km"] = np.round(distances, 4).tolist()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def load_pdv_points(session, updated_since=None) -> tuple[list, object]:
+    """ Read the location of the PDVs, all or the ones updated since a date.
+    :return: The columns (ids, client_ids, lats, lons, geohashes) and the highest updated_at read.
+    """
+    stmt = select(PDV.id, PDV.client_id, PDV.lat, PDV.lon, PDV.geohash, PDV.updated_at)
+    if updated_since is not None:
+        stmt = stmt.where(PDV.updated_at >= updated_since)
+    rows = session.execute(stmt).all()
+    if not rows:
+        return [[], [], [], [], []], None
+    columns = list(zip(*rows))
+    return [list(column) for column in columns[:5]], max(columns[5])
+
+
+def mark_pdv_index_stale():
+    """ Refresh the PDV index on its next use, with the PDVs updated since it was loaded.
+    Called when an import finishes.
+    """
+    global _pdv_index_stale
+    _pdv_index_stale = True
+
+
+def refresh_pdv_index(session) -> PDVIndex:
+    """ Load the PDV index, or merge the PDVs updated since the last load.
+    """
+    global _pdv_index, _pdv_index_stale, _pdv_index_refreshed_at
+    # Marked before reading, an import that finishes while reading marks it stale again
+    _pdv_index_stale = False
+    _pdv_index_refreshed_at = time.monotonic()
+    pdv_index = _pdv_index
+    try:
+        if pdv_index is None:
+            columns, watermark = load_pdv_points(session)
+            pdv_index = PDVIndex(*columns, watermark=watermark)
+        else:
+            columns, watermark = load_pdv_points(session, pdv_index.watermark)
+            if columns[0]:
+                pdv_index = pdv_index.merge(*columns, watermark=watermark)
+    except Exception:
+        _pdv_index_stale = True
+        raise
+    _pdv_index = pdv_index
+    return pdv_index
+
+
+def get_pdv_index(session) -> PDVIndex:
+    """ Get the PDV index, refreshing it when an import finished or it is older than PDV_INDEX_TTL.
+    Only one request refreshes it, the others use the previous index meanwhile. The lock is
+    never waited for, so an AsyncSession (session.run_sync) does not block the event loop.
+    """
+    pdv_index = _pdv_index
+    if pdv_index is not None and not _pdv_index_stale and time.monotonic() - _pdv_index_refreshed_at < PDV_INDEX_TTL:
+        return pdv_index
+
+    if _pdv_index_lock.acquire(blocking=False):
+        try:
+            return refresh_pdv_index(session)
+        finally:
+            _pdv_index_lock.release()
+    if pdv_index is None:
+        # The first load is still running in another request
+        columns, watermark = load_pdv_points(session)
+        return PDVIndex(*columns, watermark=watermark)
+    return pdv_index
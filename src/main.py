@@ -2,12 +2,20 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from api.db.config import DATABASE_ASYNC
 from api.db.session import init_db
 # Routing
 from api.marketminds.routing.main import router as marketmind_router
-from api.marketminds.routing.otros import otros_router
-from api.marketminds.routing.pdv import pdv_router
-from api.marketminds.routing.provincias_departamentos import prov_router
+
+if DATABASE_ASYNC:
+    # async def handlers with AsyncSession, same paths and responses
+    from api.marketminds.routing.otros_async import otros_async_router as otros_router
+    from api.marketminds.routing.pdv_async import pdv_async_router as pdv_router
+    from api.marketminds.routing.provincias_departamentos_async import prov_async_router as prov_router
+else:
+    from api.marketminds.routing.otros import otros_router
+    from api.marketminds.routing.pdv import pdv_router
+    from api.marketminds.routing.provincias_departamentos import prov_router
 
 
 @asynccontextmanager
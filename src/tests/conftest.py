@@ -0,0 +1,71 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# The API engines are created when api.db is imported: point them to a SQLite file first
+TEST_DATABASE_DIR = tempfile.mkdtemp(prefix="marketminds-tests-")
+atexit.register(shutil.rmtree, TEST_DATABASE_DIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DATABASE_DIR}/api.db"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DATABASE_DIR}/api.db"
+
+import pytest  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine  # noqa: E402
+
+from api.helpers.cache import invalidate_response_cache  # noqa: E402
+from api.import_dataset.synthetic import generate_dataset  # noqa: E402
+from api.import_dataset.tools import import_dataset  # noqa: E402
+from api.marketminds import segments, spatial  # noqa: E402
+from api.marketminds.poi_types import reset_poi_type_names  # noqa: E402
+
+# Rows of the synthetic dataset shared by the tests, a few chunks of TEST_CHUNKSIZE
+TEST_DATASET_ROWS = 1500
+TEST_CHUNKSIZE = 400
+
+
+@pytest.fixture(scope="session")
+def dataset_path(tmp_path_factory) -> str:
+    """ A synthetic dataset, generated once per test session.
+    """
+    return generate_dataset(str(tmp_path_factory.mktemp("datasets") / "mdt.csv"), TEST_DATASET_ROWS, seed=0)
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """ Create SQLite engines on new database files with every table, disposed after the test.
+    """
+    engines = []
+
+    def make(name: str = "test"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        SQLModel.metadata.create_all(engine)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine()
+
+
+@pytest.fixture(autouse=True)
+def reset_process_state():
+    """ Drop the process-wide caches and in-memory indexes, each test uses its own database.
+    """
+    invalidate_response_cache()
+    reset_poi_type_names()
+    spatial._pdv_index = None
+    segments._segment_index = None
+    yield
+    spatial._pdv_index = None
+    segments._segment_index = None
+
+
+def run_import(engine, file_path: str, **import_kwargs) -> dict:
+    """ Import a dataset into a test database, without the key index file.
+    """
+    return import_dataset(file_path=file_path, key_index_path=None, session=Session(engine), **import_kwargs)
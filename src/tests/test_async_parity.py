@@ -0,0 +1,97 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlmodel import SQLModel
+
+from api.db import async_session, session
+from api.helpers.cache import invalidate_response_cache
+from api.marketminds import segments, spatial
+from api.marketminds.models import PDV, Client
+from api.marketminds.routing.otros import otros_router
+from api.marketminds.routing.otros_async import otros_async_router
+from api.marketminds.routing.pdv import pdv_router
+from api.marketminds.routing.pdv_async import pdv_async_router
+from api.marketminds.routing.provincias_departamentos import prov_router
+from api.marketminds.routing.provincias_departamentos_async import prov_async_router
+
+from tests.conftest import TEST_CHUNKSIZE, run_import
+
+BASE_PREFIX = "/api/marketminds"
+
+
+def make_app(*routers) -> FastAPI:
+    app = FastAPI()
+    for router in routers:
+        app.include_router(router, prefix=BASE_PREFIX)
+    return app
+
+
+@pytest.fixture(scope="module")
+def api_database(dataset_path) -> dict:
+    """ Import the dataset into the database of the API engines (DATABASE_URL / ASYNC_DATABASE_URL).
+    :return: Values of the imported data to build the requests.
+    """
+    assert session.engine.dialect.name == "sqlite"
+    assert async_session.async_engine.dialect.driver == "aiosqlite"
+    SQLModel.metadata.drop_all(session.engine)
+    SQLModel.metadata.create_all(session.engine)
+    run_import(session.engine, dataset_path, chunksize=TEST_CHUNKSIZE)
+    with session.engine.connect() as connection:
+        pdv = connection.execute(select(PDV.id, PDV.lat, PDV.lon, PDV.client_id).order_by(PDV.id)).first()
+        pdv_ids = connection.execute(select(PDV.id).order_by(PDV.id).limit(3)).scalars().all()
+        client_id = connection.execute(select(Client.id)).scalar()
+    return {"pdv": pdv, "pdv_ids": pdv_ids, "client_id": client_id}
+
+
+def get_requests(data: dict) -> list[tuple]:
+    pdv = data["pdv"]
+    point = {"lat": pdv.lat, "lon": pdv.lon}
+    bbox = {"min_lat": pdv.lat - 2, "min_lon": pdv.lon - 2, "max_lat": pdv.lat + 2, "max_lon": pdv.lon + 2}
+    return [
+        ("GET", "/provincias", {}),
+        ("GET", "/provincias", {"limit": 5}),
+        ("GET", "/provincias/1", {}),
+        ("GET", "/provincias-departamentos", {}),
+        ("GET", "/departamentos", {"limit": 10}),
+        ("GET", "/clientes", {}),
+        ("GET", "/clientes/stream", {"format": "json"}),
+        ("GET", "/sucursales", {"client_id": data["client_id"]}),
+        ("GET", "/pdv", {"limit": 50}),
+        ("GET", "/pdv/stream", {}),
+        ("GET", "/pdv/0", {}),
+        ("GET", "/pdv/nearest", {**point, "k": 10}),
+        ("GET", "/pdv/within-radius", {**point, "radius_km": 50}),
+        ("GET", "/pdv/within-bbox", bbox),
+        ("GET", "/pdv/heatmap", {"precision": 3, "include_pois": True, **bbox}),
+        ("GET", "/pois-types", {}),
+        ("GET", f"/pois-for-pdv/{pdv.id}", {}),
+        ("POST", "/pois-for-pdv/batch", [str(pdv_id) for pdv_id in data["pdv_ids"]]),
+        ("POST", "/pdv/segments", {"client_id": [pdv.client_id], "provincia_id": [1]}),
+    ]
+
+
+def reset_api_state():
+    """ Drop the response cache and the indexes, so each app reads the database itself.
+    """
+    invalidate_response_cache()
+    spatial._pdv_index = None
+    segments._segment_index = None
+
+
+def test_async_routers_return_the_same_bodies_as_the_sync_ones(api_database):
+    sync_app = make_app(otros_router, pdv_router, prov_router)
+    async_app = make_app(otros_async_router, pdv_async_router, prov_async_router)
+
+    with TestClient(sync_app) as sync_client, TestClient(async_app) as async_client:
+        for method, path, params in get_requests(api_database):
+            kwargs = {"json": params} if method == "POST" else {"params": params}
+            responses = []
+            for client in (sync_client, async_client):
+                reset_api_state()
+                responses.append(client.request(method, BASE_PREFIX + path, **kwargs))
+            sync_response, async_response = responses
+
+            assert sync_response.status_code == async_response.status_code, path
+            assert sync_response.content == async_response.content, path
+            assert sync_response.headers["content-type"] == async_response.headers["content-type"], path
@@ -0,0 +1,197 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from api.db.session import get_session
+from api.helpers import cache
+from api.helpers.cache import cached_json_response, invalidate_response_cache
+from api.import_dataset.tools import save_records
+from api.marketminds.models import Provincia
+from main import app
+
+PROVINCIAS_URL = "/api/marketminds/provincias"
+
+
+class Clock:
+    """ Replacement of time.monotonic that only moves when the test says so.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+@pytest.fixture
+def counter_client() -> tuple[TestClient, list]:
+    """ Client of an app with a cached route that returns how many times its content was built.
+    """
+    builds = []
+    counter_app = FastAPI()
+
+    @counter_app.get("/counter")
+    def get_counter(request: Request):
+        def get_content():
+            builds.append(dict(request.query_params))
+            return {"builds": len(builds)}
+
+        return cached_json_response(request, get_content)
+
+    return TestClient(counter_app), builds
+
+
+def test_matching_etag_returns_304_without_building_the_content(counter_client):
+    client, builds = counter_client
+    response = client.get("/counter")
+    etag = response.headers["etag"]
+
+    not_modified = client.get("/counter", headers={"If-None-Match": etag})
+    listed = client.get("/counter", headers={"If-None-Match": f'"other", {etag}'})
+    any_etag = client.get("/counter", headers={"If-None-Match": "*"})
+    other = client.get("/counter", headers={"If-None-Match": '"0-other"'})
+
+    assert response.status_code == 200
+    assert response.json() == {"builds": 1}
+    assert response.headers["cache-control"] == "no-cache"
+    assert [not_modified.status_code, listed.status_code, any_etag.status_code] == [304, 304, 304]
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert other.status_code == 200
+    assert other.json() == {"builds": 1}
+    assert len(builds) == 1
+
+
+def test_query_parameters_are_part_of_the_key_in_any_order(counter_client):
+    client, builds = counter_client
+
+    first = client.get("/counter?a=1&b=2")
+    same = client.get("/counter?b=2&a=1")
+    other = client.get("/counter?a=1&b=3")
+
+    assert first.content == same.content
+    assert other.json() == {"builds": 2}
+    assert builds == [{"a": "1", "b": "2"}, {"a": "1", "b": "3"}]
+
+
+def test_invalidation_starts_a_new_data_version(counter_client):
+    client, builds = counter_client
+    etag = client.get("/counter").headers["etag"]
+
+    invalidate_response_cache()
+    response = client.get("/counter", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json() == {"builds": 2}
+    assert response.headers["etag"] != etag
+
+
+def test_responses_expire_after_the_ttl(counter_client, clock):
+    client, builds = counter_client
+    client.get("/counter")
+
+    clock.now += cache.RESPONSE_CACHE_TTL - 1
+    assert client.get("/counter").json() == {"builds": 1}
+    clock.now += 1
+    assert client.get("/counter").json() == {"builds": 2}
+    assert client.get("/counter").json() == {"builds": 2}
+
+
+def test_the_least_recently_used_response_is_dropped_over_the_cap(counter_client, monkeypatch):
+    client, builds = counter_client
+    monkeypatch.setattr(cache, "RESPONSE_CACHE_MAX_ENTRIES", 2)
+    client.get("/counter?page=1")
+    client.get("/counter?page=2")
+    # Page 1 is used again, so page 2 is the least recently used when page 3 is added
+    client.get("/counter?page=1")
+    client.get("/counter?page=3")
+
+    client.get("/counter?page=1")
+    client.get("/counter?page=2")
+
+    assert [build["page"] for build in builds] == ["1", "2", "3", "2"]
+
+
+def test_the_cached_bodies_are_bounded_by_their_total_size(counter_client, monkeypatch):
+    client, builds = counter_client
+    body_size = len(client.get("/counter?page=1").content)
+    monkeypatch.setattr(cache, "RESPONSE_CACHE_MAX_BYTES", 2 * body_size)
+    client.get("/counter?page=2")
+    client.get("/counter?page=3")
+
+    client.get("/counter?page=3")
+    client.get("/counter?page=2")
+    client.get("/counter?page=1")
+
+    assert [build["page"] for build in builds] == ["1", "2", "3", "1"]
+    assert cache._cache_bytes == 2 * body_size
+    invalidate_response_cache()
+    assert cache._cache_bytes == 0
+
+
+def test_bodies_over_the_size_limit_are_not_cached(counter_client, monkeypatch):
+    client, builds = counter_client
+    monkeypatch.setattr(cache, "RESPONSE_CACHE_MAX_BODY_BYTES", 5)
+
+    first = client.get("/counter")
+    second = client.get("/counter", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.json() == {"builds": 1}
+    assert second.status_code == 200
+    assert second.json() == {"builds": 2}
+    assert len(builds) == 2
+    assert cache._cache_bytes == 0
+
+
+def test_content_built_while_an_import_commits_is_not_cached():
+    builds = []
+    race_app = FastAPI()
+
+    @race_app.get("/race")
+    def get_race(request: Request):
+        def get_content():
+            builds.append(1)
+            if len(builds) == 1:
+                # An import commits while the content is read
+                invalidate_response_cache()
+            return {"builds": len(builds)}
+
+        return cached_json_response(request, get_content)
+
+    client = TestClient(race_app)
+
+    assert client.get("/race").json() == {"builds": 1}
+    assert client.get("/race").json() == {"builds": 2}
+    assert client.get("/race").json() == {"builds": 2}
+
+
+def test_saving_import_records_invalidates_the_cached_responses(engine):
+    def get_test_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_test_session
+    try:
+        client = TestClient(app)
+        before = client.get(PROVINCIAS_URL)
+        assert before.json() == []
+        assert client.get(PROVINCIAS_URL).headers["etag"] == before.headers["etag"]
+
+        with Session(engine) as session:
+            save_records(session, {Provincia: [{"id": 1, "name": "Salta"}]})
+        after = client.get(PROVINCIAS_URL, headers={"If-None-Match": before.headers["etag"]})
+    finally:
+        app.dependency_overrides.pop(get_session)
+
+    assert after.status_code == 200
+    assert after.json() == [{"id": 1, "name": "Salta", "departamentos_count": 0}]
@@ -0,0 +1,267 @@
+import math
+
+import pandas as pd
+import pytest
+from sqlalchemy import select, update
+from sqlmodel import SQLModel, create_engine
+
+from api.import_dataset import tools
+from api.import_dataset.columnar import PDV_KEY
+from api.import_dataset.progress import ImportCancelled, ImportProgress
+from api.marketminds.models import PDV, Departamento, ImportCheckpoint, POISType, Provincia
+
+from tests.conftest import TEST_CHUNKSIZE, run_import
+
+# Import bookkeeping, not data: compared separately when it matters
+BOOKKEEPING_TABLES = {"importedfile", "importcheckpoint", "pdvhash"}
+# Tables with autoincrement ids, compared by their other columns
+SURROGATE_ID_TABLES = {"provincia", "departamento", "poistype", "poiandpdv"}
+
+
+def dump_tables(engine) -> dict[str, list]:
+    """ Read every data table without timestamps or autoincrement ids, with the foreign keys to
+    those tables replaced by names, so databases filled by different imports can be compared.
+    """
+    with engine.connect() as connection:
+        provincias = dict(connection.execute(select(Provincia.id, Provincia.name)).all())
+        departamentos = {
+            departamento_id: (provincias[provincia_id], name)
+            for departamento_id, provincia_id, name in connection.execute(
+                select(Departamento.id, Departamento.provincia_id, Departamento.name)
+            )
+        }
+        names = {
+            "provincia_id": provincias,
+            "departamento_id": departamentos,
+            "pois_type_id": dict(connection.execute(select(POISType.id, POISType.name)).all()),
+        }
+
+        tables = {}
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name in BOOKKEEPING_TABLES:
+                continue
+            columns = [
+                column for column in table.columns
+                if column.name not in ("created_at", "updated_at")
+                and not (column.name == "id" and table.name in SURROGATE_ID_TABLES)
+            ]
+            rows = [
+                tuple(normalize_value(column.name, value, names) for column, value in zip(columns, row))
+                for row in connection.execute(select(*columns))
+            ]
+            tables[table.name] = sorted(rows, key=repr)
+    return tables
+
+
+def normalize_value(column_name: str, value, names: dict):
+    if value is None:
+        return None
+    if column_name in names:
+        return names[column_name][value]
+    if isinstance(value, float):
+        # Rollup averages are summed in a different order by each import
+        return None if math.isnan(value) else round(value, 9)
+    return value
+
+
+def assert_same_tables(engine, expected_tables: dict):
+    tables = dump_tables(engine)
+    for table_name, rows in expected_tables.items():
+        assert tables[table_name] == rows, f"{table_name} differs"
+
+
+class CancelAfterChunks(ImportProgress):
+    """ Progress that cancels the import after some chunks are saved.
+    """
+
+    def __init__(self, chunks: int):
+        super().__init__()
+        self.chunks = chunks
+
+    def add_rows(self, rows: int):
+        super().add_rows(rows)
+        self.chunks -= 1
+        if self.chunks == 0:
+            self.cancel()
+
+
+@pytest.fixture(scope="module")
+def full_import_tables(tmp_path_factory, dataset_path) -> dict:
+    """ The tables of a chunked ORM import of the dataset, the reference of the other modes.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('reference') / 'reference.db'}")
+    SQLModel.metadata.create_all(engine)
+    run_import(engine, dataset_path, chunksize=TEST_CHUNKSIZE)
+    tables = dump_tables(engine)
+    engine.dispose()
+    assert len(tables["pdv"]) > 1000
+    assert len(tables["poiandpdv"]) > 1000
+    assert len(tables["geohashrollup"]) > 0
+    return tables
+
+
+@pytest.mark.parametrize("import_kwargs", [
+    {},
+    {"chunksize": TEST_CHUNKSIZE, "bulk": True},
+    {"chunksize": TEST_CHUNKSIZE, "incremental": True},
+    {"workers": 2},
+], ids=["single-chunk", "bulk", "incremental", "workers"])
+def test_import_modes_produce_the_same_tables(make_engine, dataset_path, full_import_tables, import_kwargs):
+    engine = make_engine()
+    run_import(engine, dataset_path, **import_kwargs)
+
+    assert_same_tables(engine, full_import_tables)
+
+
+def test_import_again_adds_nothing(engine, dataset_path, full_import_tables):
+    run_import(engine, dataset_path, chunksize=TEST_CHUNKSIZE)
+    resp = run_import(engine, dataset_path, chunksize=TEST_CHUNKSIZE)
+
+    assert resp["registros_added"]["pdv"] == 0
+    assert resp["registros_added"]["poi"] == 0
+    assert_same_tables(engine, full_import_tables)
+
+
+def test_checkpoint_resume_produces_the_same_tables(engine, dataset_path, full_import_tables):
+    with pytest.raises(ImportCancelled):
+        run_import(engine, dataset_path, chunksize=TEST_CHUNKSIZE, checkpoint=True, progress=CancelAfterChunks(2))
+    # The first row of the file is skipped by the import
+    saved_rows = 2 * TEST_CHUNKSIZE - 1
+    with engine.connect() as connection:
+        assert connection.execute(select(ImportCheckpoint.rows)).scalar_one() == saved_rows
+
+    resp = run_import(engine, dataset_path, chunksize=TEST_CHUNKSIZE, checkpoint=True)
+
+    assert resp["resumed_from_row"] == saved_rows
+    assert_same_tables(engine, full_import_tables)
+    with engine.connect() as connection:
+        assert connection.execute(select(ImportCheckpoint)).first() is None
+
+
+def write_changed_dataset(dataset_path: str, changed_path: str, changed_pdvs: int = 100, new_pdvs: int = 50) -> set:
+    """ Write a copy of the dataset where some PDVs changed in all their rows and some are new.
+    :return: The ids of the changed PDVs.
+    """
+    df = pd.read_csv(dataset_path, dtype=str, keep_default_na=False)
+    # The first row is skipped by the import
+    pdv_ids = df[PDV_KEY].iloc[1:].drop_duplicates()
+    changed_ids = set(pdv_ids.iloc[:changed_pdvs])
+    changed = df[PDV_KEY].isin(changed_ids)
+    df.loc[changed, "donde_se_encuentra_ubicado"] = "Ruta"
+    df.loc[changed, "indique_la_cantidad_de_pasillos"] = "9"
+    df.loc[changed, "pois_escuelas"] = "7.0"
+    df.loc[changed, "pois_bus_stop"] = "0.0"
+
+    new_rows = df[df[PDV_KEY].isin(set(pdv_ids.iloc[-new_pdvs:]))].copy()
+    new_rows[PDV_KEY] = new_rows[PDV_KEY] + "-new"
+    pd.concat([df, new_rows]).to_csv(changed_path, index=False)
+    return changed_ids
+
+
+def test_incremental_import_of_a_changed_file_matches_a_full_import(make_engine, dataset_path, tmp_path):
+    changed_path = str(tmp_path / "changed.csv")
+    changed_ids = write_changed_dataset(dataset_path, changed_path)
+    full_engine = make_engine("full")
+    run_import(full_engine, changed_path, chunksize=TEST_CHUNKSIZE)
+
+    engine = make_engine("incremental")
+    run_import(engine, dataset_path, chunksize=TEST_CHUNKSIZE, incremental=True)
+    pois_before = {poi[:2] for poi in dump_tables(engine)["poiandpdv"]}
+    resp = run_import(engine, changed_path, chunksize=TEST_CHUNKSIZE, incremental=True)
+
+    full_tables = dump_tables(full_engine)
+    assert_same_tables(engine, full_tables)
+    registros_added = resp["registros_added"]
+    assert registros_added["pdv"] == 50
+    assert registros_added["pdv_updated"] == len(changed_ids)
+    # (pois_type_id, pdv_id) pairs: only the new ones count as added
+    pois_after = {poi[:2] for poi in full_tables["poiandpdv"]}
+    changed_pois_before = {poi for poi in pois_before if poi[1] in changed_ids}
+    assert registros_added["poi"] == len(pois_after - pois_before)
+    assert registros_added["poi_updated"] == len(changed_pois_before & pois_after)
+    assert registros_added["poi_deleted"] == len(pois_before - pois_after)
+    assert registros_added["poi_updated"] > 0 and registros_added["poi_deleted"] > 0
+
+    resp = run_import(engine, changed_path, chunksize=TEST_CHUNKSIZE, incremental=True)
+    assert resp["message"] == "El archivo ya fue importado, no hay cambios"
+
+
+def test_incremental_import_detects_a_change_in_a_later_row_of_a_pdv(make_engine, dataset_path, tmp_path):
+    df = pd.read_csv(dataset_path, dtype=str, keep_default_na=False)
+    # The first row is skipped by the import
+    rows = df.iloc[1:]
+    pdv_id = rows[PDV_KEY][rows[PDV_KEY].duplicated()].iloc[-1]
+    last_row = df.index[df[PDV_KEY] == pdv_id][-1]
+    df.loc[last_row, "pois_escuelas"] = "7.0"
+    changed_path = str(tmp_path / "changed.csv")
+    df.to_csv(changed_path, index=False)
+    full_engine = make_engine("full")
+    run_import(full_engine, changed_path, chunksize=TEST_CHUNKSIZE)
+
+    engine = make_engine("incremental")
+    run_import(engine, dataset_path, chunksize=TEST_CHUNKSIZE, incremental=True)
+    resp = run_import(engine, changed_path, chunksize=TEST_CHUNKSIZE, incremental=True)
+
+    assert resp["registros_added"]["pdv_updated"] == 1
+    assert_same_tables(engine, dump_tables(full_engine))
+
+
+@pytest.mark.parametrize("import_kwargs", [
+    {},
+    {"chunksize": TEST_CHUNKSIZE, "bulk": True},
+    {"chunksize": TEST_CHUNKSIZE, "checkpoint": True},
+    {"workers": 2},
+], ids=["single-chunk", "bulk", "checkpoint", "workers"])
+def test_incremental_import_after_any_import_of_the_same_rows_changes_nothing(engine, dataset_path, tmp_path, import_kwargs):
+    run_import(engine, dataset_path, **import_kwargs)
+    # Same rows with another checksum, an identical file is not imported again
+    new_path = tmp_path / "new.csv"
+    new_path.write_bytes(open(dataset_path, "rb").read() + b"\n")
+
+    resp = run_import(engine, str(new_path), chunksize=TEST_CHUNKSIZE, incremental=True)
+
+    assert resp["registros_added"]["pdv"] == 0
+    assert resp["registros_added"]["pdv_updated"] == 0
+    assert resp["registros_added"]["poi"] == 0
+
+
+@pytest.mark.parametrize("import_kwargs", [
+    {"chunksize": TEST_CHUNKSIZE},
+    {"chunksize": TEST_CHUNKSIZE, "incremental": True},
+    {"workers": 2},
+], ids=["full", "incremental", "workers"])
+def test_import_fills_the_departamento_of_existing_pdvs(engine, dataset_path, full_import_tables, tmp_path, import_kwargs):
+    run_import(engine, dataset_path, **import_kwargs)
+    # PDVs imported before they were linked to their departamento
+    with engine.begin() as connection:
+        pdvs = connection.execute(update(PDV).values(departamento_id=None)).rowcount
+    # Same rows with another checksum, an identical file is not imported again
+    new_path = tmp_path / "new.csv"
+    new_path.write_bytes(open(dataset_path, "rb").read() + b"\n")
+
+    resp = run_import(engine, str(new_path), **import_kwargs)
+
+    assert resp["registros_added"]["pdv_departamento"] == pdvs
+    assert_same_tables(engine, full_import_tables)
+    resp = run_import(engine, dataset_path, **{**import_kwargs, "incremental": False})
+    assert resp["registros_added"]["pdv_departamento"] == 0
+
+
+def test_an_identical_incremental_import_reads_nothing(engine, dataset_path, tmp_path, monkeypatch):
+    df = pd.read_csv(dataset_path, dtype=str, keep_default_na=False)
+    pdv_id = df[PDV_KEY].iloc[1]
+    df.loc[df[PDV_KEY] == pdv_id, "pv_departamento"] = ""
+    file_path = str(tmp_path / "without_departamento.csv")
+    df.to_csv(file_path, index=False)
+    run_import(engine, file_path, chunksize=TEST_CHUNKSIZE, incremental=True)
+
+    reads = []
+    for name in ("read_dataset", "read_geo_pairs"):
+        read = getattr(tools, name)
+        monkeypatch.setattr(tools, name, lambda *args, read=read, name=name, **kwargs: reads.append(name) or read(*args, **kwargs))
+    resp = run_import(engine, file_path, chunksize=TEST_CHUNKSIZE, incremental=True)
+
+    assert resp["message"] == "El archivo ya fue importado, no hay cambios"
+    assert reads == []
+    with engine.connect() as connection:
+        assert connection.execute(select(PDV.departamento_id).where(PDV.id == pdv_id)).scalar_one() is None
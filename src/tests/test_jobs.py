@@ -0,0 +1,66 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.import_dataset import jobs
+from api.marketminds.models import get_utc_now
+from main import app
+
+
+@pytest.fixture
+def import_started(monkeypatch):
+    """ Replace the import of the jobs with one that waits until the test lets it finish.
+    """
+    started, finish = threading.Event(), threading.Event()
+
+    def import_dataset(**import_kwargs):
+        started.set()
+        assert finish.wait(10)
+        return {"status": 200, "message": "ok", "import_kwargs": import_kwargs}
+
+    monkeypatch.setattr(jobs, "import_dataset", import_dataset)
+    monkeypatch.setattr(jobs, "import_jobs", {})
+    yield started
+    finish.set()
+
+
+def test_import_dataset_returns_the_job_without_waiting(import_started):
+    client = TestClient(app)
+
+    response = client.get("/api/marketminds/import-dataset/", params={"bulk": True})
+
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in (jobs.JOB_PENDING, jobs.JOB_RUNNING)
+    assert import_started.wait(10)
+    assert response.headers["location"].endswith(f"/api/marketminds/import-jobs/{job['id']}")
+    status = client.get(response.headers["location"]).json()
+    assert status["id"] == job["id"]
+    assert status["result"] is None
+    assert jobs.import_jobs[job["id"]].import_kwargs["chunksize"] == jobs.DEFAULT_JOB_CHUNKSIZE
+
+
+def make_finished_job(finished_ago: timedelta) -> jobs.ImportJob:
+    job = jobs.ImportJob({"file_path": "dataset.csv"})
+    job.status = jobs.JOB_COMPLETED
+    job.finished_at = get_utc_now() - finished_ago
+    jobs.import_jobs[job.id] = job
+    return job
+
+
+def test_finished_jobs_are_evicted_after_the_ttl_or_the_cap(monkeypatch):
+    monkeypatch.setattr(jobs, "import_jobs", {})
+    monkeypatch.setattr(jobs, "MAX_FINISHED_JOBS", 3)
+    expired = make_finished_job(jobs.FINISHED_JOB_TTL + timedelta(minutes=1))
+    finished = [make_finished_job(timedelta(minutes=minutes)) for minutes in (50, 40, 30, 20)]
+    running = jobs.ImportJob({"file_path": "dataset.csv"})
+    running.status = jobs.JOB_RUNNING
+    jobs.import_jobs[running.id] = running
+
+    job_ids = {job.id for job in jobs.list_import_jobs()}
+
+    assert expired.id not in job_ids
+    # The oldest finished job is over the cap, the running one is always kept
+    assert job_ids == {job.id for job in finished[1:]} | {running.id}
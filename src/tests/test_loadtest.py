@@ -0,0 +1,41 @@
+import itertools
+import threading
+
+from api.marketminds import loadtest
+
+
+def fail_every(monkeypatch, every: int):
+    """ Replace the requests of the load test: every n-th one fails, the others take 1 ms.
+    """
+    count, lock = itertools.count(1), threading.Lock()
+
+    def timed_get(url: str, timeout: float) -> tuple[float, bool]:
+        with lock:
+            number = next(count)
+        return 0.001, number % every != 0
+
+    monkeypatch.setattr(loadtest, "timed_get", timed_get)
+
+
+def test_errors_are_counted_in_the_total_throughput_and_fail_the_level(monkeypatch):
+    fail_every(monkeypatch, 4)
+
+    level = loadtest.run_level("http://test", concurrency=2, requests_count=100, timeout=1)
+
+    assert level["errors"] == 25
+    assert level["error_rate"] == 0.25
+    assert level["failed"]
+    ok_share = level["ok_requests_per_second"] / level["requests_per_second"]
+    assert abs(ok_share - 0.75) < 0.01
+    assert "FAILED" in loadtest.format_results([level])
+
+
+def test_a_level_passes_below_the_max_error_rate(monkeypatch, capsys):
+    fail_every(monkeypatch, 200)
+
+    exit_code = loadtest.main(["http://test", "--concurrency", "1", "2", "--requests", "200", "--json"])
+
+    assert exit_code == 0
+    assert "\"failed\": false" in capsys.readouterr().out
+    fail_every(monkeypatch, 50)
+    assert loadtest.main(["http://test", "--concurrency", "1", "--requests", "100", "--max-error-rate", "0"]) == 1
@@ -0,0 +1,110 @@
+import pytest
+from sqlalchemy import Column, Float, MetaData, String, Table, insert, inspect, text
+
+from api.db.migrations import NEW_COLUMN_SUFFIX, PDV_FLOAT_COLUMNS, run_migrations
+from api.marketminds.models import PDV, get_utc_now
+
+OLD_VALUES = ["12.0", "2,5", "3", "nan", "más de 10", None]
+
+
+def get_pdv_column_types(engine) -> dict:
+    return {column["name"]: column["type"] for column in inspect(engine).get_columns("pdv")}
+
+
+@pytest.fixture
+def old_engine(engine):
+    """ A database where the PDV survey counts are VARCHAR, as before they were numbers.
+    """
+    with engine.begin() as connection:
+        for name in PDV_FLOAT_COLUMNS:
+            connection.execute(text(f"ALTER TABLE pdv DROP COLUMN {name}"))
+            connection.execute(text(f"ALTER TABLE pdv ADD COLUMN {name} VARCHAR"))
+        for index, value in enumerate(OLD_VALUES):
+            connection.execute(
+                text(
+                    "INSERT INTO pdv (id, cod_pdv, lat, lon, geohash, created_at, updated_at, bandejas, m2)"
+                    " VALUES (:id, 'PDV', 0, 0, '', '2024-01-01', '2024-01-01', :value, :value)"
+                ),
+                {"id": str(index), "value": value},
+            )
+    return engine
+
+
+def get_converted_values(engine, name: str) -> list:
+    with engine.connect() as connection:
+        return connection.execute(text(f"SELECT {name} FROM pdv ORDER BY id")).scalars().all()
+
+
+def test_pdv_survey_counts_are_converted_to_float(old_engine):
+    assert all(isinstance(get_pdv_column_types(old_engine)[name], String) for name in PDV_FLOAT_COLUMNS)
+
+    run_migrations(old_engine)
+
+    column_types = get_pdv_column_types(old_engine)
+    assert all(isinstance(column_types[name], Float) for name in PDV_FLOAT_COLUMNS)
+    assert get_converted_values(old_engine, "bandejas") == [12.0, 2.5, 3.0, None, None, None]
+    assert get_converted_values(old_engine, "m2") == [12.0, 2.5, 3.0, None, None, None]
+
+    # Already migrated: nothing changes
+    run_migrations(old_engine)
+    assert get_converted_values(old_engine, "bandejas") == [12.0, 2.5, 3.0, None, None, None]
+
+
+def test_conversion_stopped_halfway_is_finished(old_engine):
+    with old_engine.begin() as connection:
+        # Stopped after dropping the old column, before renaming the new one
+        connection.execute(text(f"ALTER TABLE pdv ADD COLUMN bandejas{NEW_COLUMN_SUFFIX} FLOAT"))
+        connection.execute(text(f"UPDATE pdv SET bandejas{NEW_COLUMN_SUFFIX} = 1"))
+        connection.execute(text("ALTER TABLE pdv DROP COLUMN bandejas"))
+
+    run_migrations(old_engine)
+
+    column_types = get_pdv_column_types(old_engine)
+    assert f"bandejas{NEW_COLUMN_SUFFIX}" not in column_types
+    assert isinstance(column_types["bandejas"], Float)
+    assert get_converted_values(old_engine, "bandejas") == [1.0] * len(OLD_VALUES)
+    assert get_converted_values(old_engine, "m2") == [12.0, 2.5, 3.0, None, None, None]
+
+
+def test_new_database_needs_no_migration(engine):
+    column_types = get_pdv_column_types(engine)
+
+    run_migrations(engine)
+
+    assert {name: str(column_type) for name, column_type in get_pdv_column_types(engine).items()} == {
+        name: str(column_type) for name, column_type in column_types.items()
+    }
+
+
+@pytest.fixture
+def engine_without_departamento(engine):
+    """ A database where the PDV table has no departamento_id, as before PDVs were linked to it.
+    SQLite cannot drop a column with an index or a foreign key, so the table is created again.
+    """
+    old_metadata = MetaData()
+    old_pdv = Table("pdv", old_metadata, *[
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in PDV.__table__.columns
+        if column.name != "departamento_id"
+    ])
+    now = get_utc_now()
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE pdv"))
+        old_metadata.create_all(connection)
+        connection.execute(insert(old_pdv), [
+            {"id": str(index), "cod_pdv": "PDV", "lat": 0, "lon": 0, "geohash": "", "created_at": now, "updated_at": now}
+            for index in range(3)
+        ])
+    return engine
+
+
+def test_pdv_departamento_column_is_added(engine_without_departamento):
+    engine = engine_without_departamento
+
+    run_migrations(engine)
+    run_migrations(engine)
+
+    assert "departamento_id" in get_pdv_column_types(engine)
+    indexes = {index["name"]: index["column_names"] for index in inspect(engine).get_indexes("pdv")}
+    assert indexes["ix_pdv_departamento_id"] == ["departamento_id"]
+    assert get_converted_values(engine, "departamento_id") == [None, None, None]
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from api.db.session import get_session
+from api.helpers import pagination
+from api.marketminds.models import Client, Sucursal, get_utc_now
+from main import app
+
+SUCURSALES_URL = "/api/marketminds/sucursales"
+
+
+@pytest.fixture
+def client(engine):
+    """ Client of the API on a database with 7 sucursales: the odd ones of client c1, updated a day
+    ago, the even ones of client c2, updated now.
+    """
+    now = get_utc_now()
+    with Session(engine) as session:
+        session.add_all([Client(id="c1", name="Cliente 1"), Client(id="c2", name="Cliente 2")])
+        session.add_all([
+            Sucursal(
+                id=f"s{number:02}",
+                name=f"Sucursal {number}",
+                client_id="c1" if number % 2 else "c2",
+                updated_at=now - timedelta(days=1) if number % 2 else now,
+            )
+            for number in range(1, 8)
+        ])
+        session.commit()
+
+    def get_test_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_test_session
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_session)
+
+
+def get_ids(records: list[dict]) -> list[str]:
+    return [record["id"] for record in records]
+
+
+def test_without_cursor_and_limit_every_record_is_returned_as_an_array(client):
+    response = client.get(SUCURSALES_URL)
+
+    assert response.status_code == 200
+    assert get_ids(response.json()) == [f"s{number:02}" for number in range(1, 8)]
+    assert get_ids(client.get(SUCURSALES_URL, params={"client_id": "c2"}).json()) == ["s02", "s04", "s06"]
+
+
+def test_pages_follow_the_cursor_until_the_last_page(client):
+    pages = [client.get(SUCURSALES_URL, params={"limit": 3}).json()]
+    while pages[-1]["next_cursor"] is not None:
+        pages.append(client.get(SUCURSALES_URL, params={"limit": 3, "cursor": pages[-1]["next_cursor"]}).json())
+
+    assert [get_ids(page["results"]) for page in pages] == [["s01", "s02", "s03"], ["s04", "s05", "s06"], ["s07"]]
+    assert [page["next_cursor"] for page in pages] == ["s03", "s06", None]
+
+
+def test_a_full_last_page_has_no_next_cursor(client):
+    # 4 records of c1: the extra row of the query tells that the second page is the last one
+    first = client.get(SUCURSALES_URL, params={"limit": 2, "client_id": "c1"}).json()
+    last = client.get(SUCURSALES_URL, params={"limit": 2, "client_id": "c1", "cursor": first["next_cursor"]}).json()
+
+    assert first == {"results": first["results"], "next_cursor": "s03"}
+    assert get_ids(last["results"]) == ["s05", "s07"]
+    assert last["next_cursor"] is None
+
+
+def test_filters_apply_to_every_page(client):
+    updated_since = (get_utc_now() - timedelta(hours=1)).isoformat()
+    params = {"limit": 2, "updated_since": updated_since}
+    first = client.get(SUCURSALES_URL, params=params).json()
+    last = client.get(SUCURSALES_URL, params={**params, "cursor": first["next_cursor"]}).json()
+
+    assert get_ids(first["results"]) == ["s02", "s04"]
+    assert get_ids(last["results"]) == ["s06"]
+    assert last["next_cursor"] is None
+
+
+def test_a_cursor_without_limit_returns_a_page_of_the_default_size(client, monkeypatch):
+    monkeypatch.setattr(pagination, "DEFAULT_PAGE_SIZE", 2)
+
+    page = client.get(SUCURSALES_URL, params={"cursor": "s02"}).json()
+
+    assert get_ids(page["results"]) == ["s03", "s04"]
+    assert page["next_cursor"] == "s04"
+
+
+def test_a_cursor_after_the_last_record_returns_an_empty_page(client):
+    page = client.get(SUCURSALES_URL, params={"limit": 3, "cursor": "s07"}).json()
+
+    assert page == {"results": [], "next_cursor": None}
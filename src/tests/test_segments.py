@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from api.marketminds.segments import (
+    PDV_BOOLEAN_COLUMNS,
+    PDV_SEGMENT_COLUMNS,
+    SPARSE_RATIO,
+    PDVSegmentIndex,
+    decode_bitmap,
+)
+
+COLUMNS = PDV_SEGMENT_COLUMNS + PDV_BOOLEAN_COLUMNS
+PDVS = 2000
+
+
+def make_values(rng, count: int) -> dict:
+    """ Random segment values: common and rare clients and provincias, booleans with NULLs.
+    """
+    return {
+        "client_id": rng.choice(["big", "medium", "rare", None], count, p=[0.6, 0.3, 0.02, 0.08]).tolist(),
+        "provincia_id": rng.choice([1, 2, 3, 24, None], count, p=[0.5, 0.3, 0.15, 0.01, 0.04]).tolist(),
+        **{
+            column: rng.choice([True, False, None], count, p=[0.3, 0.69, 0.01]).tolist()
+            for column in PDV_BOOLEAN_COLUMNS
+        },
+    }
+
+
+def make_rows(ids: list, values: dict) -> dict:
+    return {"id": list(ids), **values}
+
+
+def take(rows: dict, positions) -> dict:
+    return {column: [column_values[position] for position in positions] for column, column_values in rows.items()}
+
+
+def assert_same_index(index: PDVSegmentIndex, expected: PDVSegmentIndex):
+    """ Same ids and, for every (column, value), the same PDVs, compressed the same way.
+    """
+    assert index.ids.tolist() == expected.ids.tolist()
+    size = len(expected)
+    for key in set(index.bitmaps) | set(expected.bitmaps):
+        empty = np.array([], dtype=np.int32)
+        bits = decode_bitmap(index.bitmaps.get(key, empty), size)
+        expected_bits = decode_bitmap(expected.bitmaps.get(key, empty), size)
+        assert np.array_equal(bits, expected_bits), key
+        if bits.any():
+            sparse = bits.sum() < size * SPARSE_RATIO
+            assert (index.bitmaps[key].dtype == np.int32) == sparse, key
+    assert index.count(index.all_pdvs) == size
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merged_index_equals_a_built_one(seed):
+    rng = np.random.default_rng(seed)
+    # Random ids, so the new PDVs are inserted between the existing ones
+    ids = [f"{number}-{seed}" for number in rng.permutation(10 * PDVS)[:PDVS]]
+    rows = make_rows(ids, make_values(rng, PDVS))
+    first = rng.permutation(PDVS)[:PDVS // 2]
+    index = PDVSegmentIndex.build(take(rows, first))
+
+    # The rest in two merges, together with existing PDVs that change their values
+    rest = np.setdiff1d(np.arange(PDVS), first)
+    for batch in np.array_split(rng.permutation(rest), 2):
+        changed = rng.choice(first, 100, replace=False)
+        changed_values = make_values(rng, len(changed))
+        for column in COLUMNS:
+            for position, value in zip(changed, changed_values[column]):
+                rows[column][position] = value
+        merged_positions = np.concatenate([batch, changed])
+        index = index.merge(take(rows, rng.permutation(merged_positions)), watermark=None)
+        first = np.concatenate([first, batch])
+
+    assert_same_index(index, PDVSegmentIndex.build(rows))
+
+
+def test_bitmaps_move_between_sparse_and_packed():
+    ids = [f"{number:05}" for number in range(0, PDVS * 2, 2)]
+    # 1% rare: sparse, half big: packed
+    client_ids = ["rare" if number % 100 == 0 else "big" if number % 2 else "other" for number in range(PDVS)]
+    rows = make_rows(ids, {
+        "client_id": client_ids,
+        "provincia_id": [1] * PDVS,
+        **{column: [None] * PDVS for column in PDV_BOOLEAN_COLUMNS},
+    })
+    index = PDVSegmentIndex.build(rows)
+    assert index.bitmaps[("client_id", "rare")].dtype == np.int32
+    assert index.bitmaps[("client_id", "big")].dtype == np.uint8
+
+    # Most big PDVs become rare, and new PDVs (odd ids, between the others) are rare too
+    changed = [position for position in range(PDVS) if client_ids[position] == "big"][:-20]
+    new_ids = [f"{number:05}" for number in range(1, 400, 2)]
+    update = make_rows([ids[position] for position in changed] + new_ids, {
+        "client_id": ["rare"] * (len(changed) + len(new_ids)),
+        "provincia_id": [2] * len(changed) + [None] * len(new_ids),
+        **{column: [True] * (len(changed) + len(new_ids)) for column in PDV_BOOLEAN_COLUMNS},
+    })
+    merged = index.merge(update, watermark=None)
+
+    for position in changed:
+        rows["client_id"][position] = "rare"
+        rows["provincia_id"][position] = 2
+        for column in PDV_BOOLEAN_COLUMNS:
+            rows[column][position] = True
+    for column in COLUMNS:
+        rows[column] += update[column][len(changed):]
+    rows["id"] += new_ids
+    expected = PDVSegmentIndex.build(rows)
+
+    assert_same_index(merged, expected)
+    assert merged.bitmaps[("client_id", "rare")].dtype == np.uint8
+    assert merged.bitmaps[("client_id", "big")].dtype == np.int32
+    page = merged.get_page(merged.query({"client_id": ["big"]}), limit=1000)
+    assert page["results"] == sorted(ids[position] for position in range(PDVS) if position % 2)[-20:]
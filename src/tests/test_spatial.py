@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from api.marketminds.spatial import PDVIndex, get_distances_km, get_radius_bboxes
+
+POINTS = 3000
+
+
+@pytest.fixture(scope="module")
+def points() -> dict:
+    """ Random points around Argentina, around the antimeridian and anywhere, of three clients.
+    """
+    rng = np.random.default_rng(0)
+    thirds = POINTS // 3
+    lats = np.concatenate([
+        rng.uniform(-55, -22, thirds),
+        rng.uniform(-20, 20, thirds),
+        rng.uniform(-89, 89, POINTS - 2 * thirds),
+    ])
+    lons = np.concatenate([
+        rng.uniform(-73, -53, thirds),
+        (rng.uniform(170, 190, thirds) + 180) % 360 - 180,
+        rng.uniform(-180, 180, POINTS - 2 * thirds),
+    ])
+    return {
+        "ids": [f"pdv-{index}" for index in range(POINTS)],
+        "client_ids": [f"c{index % 3}" for index in range(POINTS)],
+        "lats": lats,
+        "lons": lons,
+        "geohashes": [""] * POINTS,
+    }
+
+
+@pytest.fixture(scope="module")
+def pdv_index(points) -> PDVIndex:
+    return PDVIndex(**points)
+
+
+QUERY_POINTS = [(-34.6, -58.4), (-38, -65), (0, 179.95), (5, -179.9), (-10, 180), (88, 10), (-89, -120)]
+
+
+def get_ids(pdv_index: PDVIndex, positions: np.ndarray) -> list:
+    return pdv_index.ids[positions].tolist()
+
+
+def brute_force_distances(points: dict, lat: float, lon: float, client_id=None) -> dict:
+    distances = get_distances_km(lat, lon, points["lats"], points["lons"])
+    return {
+        pdv_id: distance
+        for pdv_id, client, distance in zip(points["ids"], points["client_ids"], distances)
+        if client_id is None or client == client_id
+    }
+
+
+@pytest.mark.parametrize("bbox", [
+    (-40, -70, -30, -60),
+    (-5, 175, 5, 180),
+    (-5, -180, 5, -175),
+    (-90, -180, 90, 180),
+    (10, 10, 10.5, 10.5),
+])
+def test_bbox_positions_match_a_brute_force_scan(points, pdv_index, bbox):
+    min_lat, min_lon, max_lat, max_lon = bbox
+    lats, lons = points["lats"], points["lons"]
+    inside = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+
+    positions = pdv_index.get_bbox_positions(*bbox)
+
+    assert sorted(get_ids(pdv_index, positions)) == sorted(np.asarray(points["ids"])[inside].tolist())
+
+
+@pytest.mark.parametrize("lat, lon", QUERY_POINTS)
+@pytest.mark.parametrize("radius_km", [1, 50, 300, 2000])
+@pytest.mark.parametrize("client_id", [None, "c1"])
+def test_radius_positions_match_a_brute_force_scan(points, pdv_index, lat, lon, radius_km, client_id):
+    expected = {
+        pdv_id: distance
+        for pdv_id, distance in brute_force_distances(points, lat, lon, client_id).items()
+        if distance <= radius_km
+    }
+
+    positions, distances = pdv_index.get_radius_positions(lat, lon, radius_km, client_id)
+
+    assert sorted(get_ids(pdv_index, positions)) == sorted(expected)
+    assert np.all(np.diff(distances) >= 0)
+
+
+@pytest.mark.parametrize("lat, lon", QUERY_POINTS)
+@pytest.mark.parametrize("k", [1, 10, 100])
+@pytest.mark.parametrize("client_id", [None, "c2"])
+def test_nearest_positions_are_the_exact_k_nearest(points, pdv_index, lat, lon, k, client_id):
+    expected = sorted(brute_force_distances(points, lat, lon, client_id).items(), key=lambda item: item[1])[:k]
+
+    positions, distances = pdv_index.get_nearest_positions(lat, lon, k, client_id)
+
+    assert get_ids(pdv_index, positions) == [pdv_id for pdv_id, _ in expected]
+    np.testing.assert_allclose(distances, [distance for _, distance in expected])
+
+
+def test_points_across_the_antimeridian_are_found():
+    pdv_index = PDVIndex(["east", "west", "far"], ["c", "c", "c"], [0, 0, 0], [179.99, -179.99, 170], ["", "", ""])
+
+    positions, distances = pdv_index.get_radius_positions(0, 179.999, 5)
+    nearest, _ = pdv_index.get_nearest_positions(0, -179.999, 2)
+
+    assert get_ids(pdv_index, positions) == ["east", "west"]
+    assert distances[1] < 5
+    assert get_ids(pdv_index, nearest) == ["west", "east"]
+
+
+def test_radius_bboxes_are_split_at_the_antimeridian():
+    east_box, west_box = get_radius_bboxes(0, 179.9, 50)
+
+    assert east_box[1] < 179.9 and east_box[3] == 180
+    assert west_box[1] == -180 and -180 < west_box[3] < -179
+    assert len(get_radius_bboxes(0, 0, 50)) == 1
+    assert get_radius_bboxes(89.9, 0, 50) == [(pytest.approx(89.9 - 50 / 111.19, abs=1e-3), -180, 90, 180)]
+
+
+def test_merged_index_answers_like_a_rebuilt_one(points, pdv_index):
+    half = POINTS // 2
+    moved_lats = np.array(points["lats"][:100]) * -1
+    columns = ["ids", "client_ids", "lats", "lons", "geohashes"]
+    first = PDVIndex(**{column: points[column][:half] for column in columns})
+    # The rest of the points, and the first 100 moved
+    merged = first.merge(
+        [*points["ids"][half:], *points["ids"][:100]],
+        [*points["client_ids"][half:], *points["client_ids"][:100]],
+        np.concatenate([points["lats"][half:], moved_lats]),
+        np.concatenate([points["lons"][half:], points["lons"][:100]]),
+        [*points["geohashes"][half:], *points["geohashes"][:100]],
+        watermark=None,
+    )
+    rebuilt = PDVIndex(**{**points, "lats": np.concatenate([moved_lats, points["lats"][100:]])})
+
+    assert len(merged) == len(rebuilt) == POINTS
+    for lat, lon in QUERY_POINTS:
+        merged_positions, _ = merged.get_nearest_positions(lat, lon, 20)
+        rebuilt_positions, _ = rebuilt.get_nearest_positions(lat, lon, 20)
+        assert get_ids(merged, merged_positions) == get_ids(rebuilt, rebuilt_positions)
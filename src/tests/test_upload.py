@@ -0,0 +1,51 @@
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from api.import_dataset import jobs, upload
+from api.import_dataset.columnar import PDV_KEY
+from api.marketminds.routing import main as routing_main
+from main import app
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """ Client of the API that saves the uploads in a temporary folder and does not import them.
+    """
+    monkeypatch.setattr(upload, "UPLOADS_PATH", str(tmp_path / "uploads"))
+    monkeypatch.setattr(routing_main, "start_import_job", lambda **import_kwargs: jobs.ImportJob(import_kwargs))
+    return TestClient(app)
+
+
+def write_parquet(path) -> str:
+    pd.DataFrame({PDV_KEY: ["1", "2"], "pv_pcia": ["Salta", "Salta"]}).to_parquet(path)
+    return str(path)
+
+
+def test_parquet_upload_is_accepted_with_pyarrow(client, tmp_path):
+    with open(write_parquet(tmp_path / "dataset.parquet"), "rb") as f:
+        response = client.post("/api/marketminds/import-dataset/upload/", files={"file": f})
+
+    assert response.status_code == 202
+
+
+def test_parquet_upload_without_pyarrow_returns_415(client, tmp_path, monkeypatch):
+    parquet_path = write_parquet(tmp_path / "dataset.parquet")
+    # A None entry makes the import raise ImportError
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+
+    with open(parquet_path, "rb") as f:
+        response = client.post("/api/marketminds/import-dataset/upload/", files={"file": f})
+
+    assert response.status_code == 415
+    assert "pyarrow" in response.json()["error"]
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+
+def test_the_api_starts_without_pyarrow():
+    code = "import sys; sys.modules['pyarrow'] = None; import main; assert 'pyarrow.parquet' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd=upload.__file__.rsplit("/api/", 1)[0], check=True)